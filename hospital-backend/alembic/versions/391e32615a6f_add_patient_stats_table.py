@@ -0,0 +1,76 @@
+"""Add patient_stats summary table
+
+Revision ID: 391e32615a6f
+Revises: bb21efec7e22
+Create Date: 2026-10-19 16:48:20.553901
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '391e32615a6f'
+down_revision: Union[str, Sequence[str], None] = 'bb21efec7e22'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    print("Stage 1: Creating patient_stats table...")
+    op.create_table(
+        'patient_stats',
+        sa.Column('patient_id', sa.Integer(), nullable=False),
+        sa.Column('hospital_id', sa.Integer(), nullable=False),
+        sa.Column('last_visit_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('visit_count', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('open_prescriptions', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.ForeignKeyConstraint(['patient_id'], ['patients.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['hospital_id'], ['hospitals.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('patient_id'),
+    )
+
+    print("Stage 2: Computing stats for existing patients...")
+    op.execute(
+        """
+        INSERT INTO patient_stats (patient_id, hospital_id, visit_count, last_visit_at, open_prescriptions)
+        SELECT p.id, p.hospital_id,
+               coalesce(v.visit_count, 0), v.last_visit_at, coalesce(o.open_prescriptions, 0)
+        FROM patients AS p
+        LEFT JOIN (
+            SELECT patient_id, count(*) AS visit_count, max(appointment_time) AS last_visit_at
+            FROM appointments WHERE status = 'COMPLETED' GROUP BY patient_id
+        ) AS v ON v.patient_id = p.id
+        LEFT JOIN (
+            SELECT patient_id, count(*) AS open_prescriptions
+            FROM prescriptions WHERE status IN ('CREATED', 'PARTIALLY_DISPENSED') GROUP BY patient_id
+        ) AS o ON o.patient_id = p.id
+        """
+    )
+
+    print("Stage 3: Creating indexes...")
+    op.create_index(
+        'ix_patient_stats_hospital_last_visit', 'patient_stats',
+        ['hospital_id', sa.text('last_visit_at DESC NULLS LAST')], unique=False
+    )
+    op.create_index(
+        'ix_patient_stats_hospital_visit_count', 'patient_stats', ['hospital_id', 'visit_count'], unique=False
+    )
+    op.create_index(
+        'ix_patient_stats_hospital_open', 'patient_stats', ['hospital_id'], unique=False,
+        postgresql_where=sa.text('open_prescriptions > 0')
+    )
+    op.create_index('ix_patient_stats_updated_at', 'patient_stats', ['updated_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_patient_stats_updated_at', table_name='patient_stats')
+    op.drop_index('ix_patient_stats_hospital_open', table_name='patient_stats')
+    op.drop_index('ix_patient_stats_hospital_visit_count', table_name='patient_stats')
+    op.drop_index('ix_patient_stats_hospital_last_visit', table_name='patient_stats')
+    op.drop_table('patient_stats')
@@ -0,0 +1,65 @@
+"""Add pharmacy stock balance and ledger tables
+
+Revision ID: 5b9d3e2f71ac
+Revises: c8e1f04a7d39
+Create Date: 2026-10-19 12:05:33.460217
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5b9d3e2f71ac'
+down_revision: Union[str, Sequence[str], None] = 'c8e1f04a7d39'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'medicinestocks',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('hospital_id', sa.Integer(), nullable=False),
+        sa.Column('medicine_id', sa.Integer(), nullable=False),
+        sa.Column('quantity', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('low_stock_threshold', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.CheckConstraint('quantity >= 0', name='ck_medicinestocks_quantity_non_negative'),
+        sa.ForeignKeyConstraint(['hospital_id'], ['hospitals.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['medicine_id'], ['medicines.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('hospital_id', 'medicine_id', name='_stock_hospital_medicine_uc'),
+    )
+    op.create_index(op.f('ix_medicinestocks_id'), 'medicinestocks', ['id'], unique=False)
+
+    op.create_table(
+        'stockmovements',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('hospital_id', sa.Integer(), nullable=False),
+        sa.Column('medicine_id', sa.Integer(), nullable=False),
+        sa.Column('delta', sa.Integer(), nullable=False),
+        sa.Column('reason', sa.String(), nullable=False),
+        sa.Column('line_item_id', sa.Integer(), nullable=True),
+        sa.Column('user_id', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.ForeignKeyConstraint(['hospital_id'], ['hospitals.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['medicine_id'], ['medicines.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['line_item_id'], ['prescriptionlineitems.id'], ondelete='SET NULL'),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='SET NULL'),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index(op.f('ix_stockmovements_id'), 'stockmovements', ['id'], unique=False)
+    op.create_index(op.f('ix_stockmovements_medicine_id'), 'stockmovements', ['medicine_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_stockmovements_medicine_id'), table_name='stockmovements')
+    op.drop_index(op.f('ix_stockmovements_id'), table_name='stockmovements')
+    op.drop_table('stockmovements')
+    op.drop_index(op.f('ix_medicinestocks_id'), table_name='medicinestocks')
+    op.drop_table('medicinestocks')
@@ -0,0 +1,40 @@
+"""Add claim lease columns to prescriptions
+
+Revision ID: 6ef2f85327bd
+Revises: 1227c9fc9437
+Create Date: 2026-10-19 09:12:40.118342
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6ef2f85327bd'
+down_revision: Union[str, Sequence[str], None] = '1227c9fc9437'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('prescriptions', sa.Column('claimed_by_id', sa.Integer(), nullable=True))
+    op.add_column('prescriptions', sa.Column('claim_expires_at', sa.DateTime(timezone=True), nullable=True))
+    op.create_foreign_key(
+        'fk_prescriptions_claimed_by_id', 'prescriptions', 'users',
+        ['claimed_by_id'], ['id'], ondelete='SET NULL'
+    )
+    op.create_index(
+        'ix_prescriptions_hospital_status_id', 'prescriptions',
+        ['hospital_id', 'status', 'id'], unique=False
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_prescriptions_hospital_status_id', table_name='prescriptions')
+    op.drop_constraint('fk_prescriptions_claimed_by_id', 'prescriptions', type_='foreignkey')
+    op.drop_column('prescriptions', 'claim_expires_at')
+    op.drop_column('prescriptions', 'claimed_by_id')
@@ -0,0 +1,46 @@
+"""Add updated_at to appointments and visits for incremental exports
+
+Revision ID: 72fadfd4f1da
+Revises: f83266f2dfd1
+Create Date: 2026-10-19 18:05:44.918305
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '72fadfd4f1da'
+down_revision: Union[str, Sequence[str], None] = 'f83266f2dfd1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # now() is evaluated once for the whole ADD COLUMN, so existing rows are
+    # not rewritten
+    print("Stage 1: Adding updated_at to appointments and visits...")
+    for table in ('appointments', 'visits'):
+        op.add_column(
+            table,
+            sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        )
+
+    print("Stage 2: Indexing updated_at (concurrently)...")
+    with op.get_context().autocommit_block():
+        for table in ('appointments', 'visits', 'prescriptions'):
+            op.execute(
+                f"CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_{table}_updated_at ON {table} (updated_at)"
+            )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for table in ('appointments', 'visits', 'prescriptions'):
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS ix_{table}_updated_at")
+    op.drop_column('visits', 'updated_at')
+    op.drop_column('appointments', 'updated_at')
@@ -0,0 +1,41 @@
+"""Add created_at to patients
+
+Revision ID: 882631e5a78b
+Revises: d4b543a0168c
+Create Date: 2026-10-19 22:08:13.551904
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '882631e5a78b'
+down_revision: Union[str, Sequence[str], None] = 'd4b543a0168c'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # now() is evaluated once, so existing rows get the migration time without a table rewrite
+    print("Stage 1: Adding patients.created_at...")
+    op.add_column(
+        'patients',
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    )
+
+    print("Stage 2: Building ix_patients_hospital_created_at (concurrently)...")
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_patients_hospital_created_at "
+            "ON patients (hospital_id, created_at)"
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_patients_hospital_created_at', table_name='patients')
+    op.drop_column('patients', 'created_at')
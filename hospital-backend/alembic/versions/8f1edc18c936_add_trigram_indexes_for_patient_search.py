@@ -0,0 +1,47 @@
+"""Add trigram indexes for patient search
+
+Revision ID: 8f1edc18c936
+Revises: e37a0c5b9f14
+Create Date: 2026-10-19 14:52:37.410218
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8f1edc18c936'
+down_revision: Union[str, Sequence[str], None] = 'e37a0c5b9f14'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Must match crud_patient.PHONE_DIGITS
+PHONE_DIGITS = "regexp_replace(phone_number, '\\D', '', 'g')"
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    print("Stage 1: Enabling pg_trgm and btree_gin...")
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    # btree_gin lets hospital_id share the GIN index with the trigram column
+    op.execute("CREATE EXTENSION IF NOT EXISTS btree_gin")
+
+    # Built concurrently so registering patients isn't blocked on large tables
+    print("Stage 2: Building trigram indexes on patients (concurrently)...")
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_patients_hospital_full_name_trgm "
+            "ON patients USING gin (hospital_id, full_name gin_trgm_ops)"
+        )
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_patients_hospital_phone_digits_trgm "
+            f"ON patients USING gin (hospital_id, ({PHONE_DIGITS}) gin_trgm_ops)"
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_patients_hospital_phone_digits_trgm', table_name='patients')
+    op.drop_index('ix_patients_hospital_full_name_trgm', table_name='patients')
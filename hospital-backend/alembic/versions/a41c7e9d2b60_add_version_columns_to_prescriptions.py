@@ -0,0 +1,36 @@
+"""Add version columns to prescriptions and line items
+
+Revision ID: a41c7e9d2b60
+Revises: 6ef2f85327bd
+Create Date: 2026-10-19 10:02:17.553901
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a41c7e9d2b60'
+down_revision: Union[str, Sequence[str], None] = '6ef2f85327bd'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('prescriptions', sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+    op.add_column('prescriptionlineitems', sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+    # The status aggregate and the per-line conditional updates both filter on prescription_id
+    op.create_index(
+        op.f('ix_prescriptionlineitems_prescription_id'), 'prescriptionlineitems',
+        ['prescription_id'], unique=False
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_prescriptionlineitems_prescription_id'), table_name='prescriptionlineitems')
+    op.drop_column('prescriptionlineitems', 'version')
+    op.drop_column('prescriptions', 'version')
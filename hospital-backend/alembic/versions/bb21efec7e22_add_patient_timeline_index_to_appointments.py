@@ -0,0 +1,32 @@
+"""Add patient timeline index to appointments
+
+Revision ID: bb21efec7e22
+Revises: c249f1c25483
+Create Date: 2026-10-19 16:12:45.081377
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'bb21efec7e22'
+down_revision: Union[str, Sequence[str], None] = 'c249f1c25483'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_appointments_patient_status_time "
+            "ON appointments (patient_id, status, appointment_time DESC)"
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_appointments_patient_status_time', table_name='appointments')
@@ -0,0 +1,106 @@
+"""Add normalized phone number to patients
+
+Revision ID: c249f1c25483
+Revises: 8f1edc18c936
+Create Date: 2026-10-19 15:37:12.604813
+
+"""
+import re
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c249f1c25483'
+down_revision: Union[str, Sequence[str], None] = '8f1edc18c936'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 5000
+DEFAULT_COUNTRY_CODE = '91'
+
+
+def normalize_phone(raw):
+    """ Frozen copy of app.core.phone.normalize_phone as of this revision. """
+    if not raw:
+        return None
+    raw = raw.strip()
+    digits = re.sub(r"\D", "", raw)
+    if raw.startswith("+"):
+        pass
+    elif digits.startswith("00"):
+        digits = digits[2:]
+    elif len(digits) == 11 and digits.startswith("0"):
+        digits = DEFAULT_COUNTRY_CODE + digits[1:]
+    elif len(digits) == 10:
+        digits = DEFAULT_COUNTRY_CODE + digits
+    if len(digits) < 7 or len(digits) > 15:
+        return None
+    return f"+{digits}"
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    print("Stage 1: Adding phone_normalized column...")
+    op.add_column('patients', sa.Column('phone_normalized', sa.String(), nullable=True))
+
+    # Each batch commits on its own so the backfill never holds row locks on
+    # the whole table. Within a hospital the oldest patient keeps a number;
+    # later rows that normalize to the same number are left NULL and reported.
+    print(f"Stage 2: Backfilling phone_normalized in batches of {BATCH_SIZE}...")
+    conn = op.get_bind()
+    with op.get_context().autocommit_block():
+        taken = set()
+        last_id, updated, duplicates, invalid = 0, 0, [], 0
+        while True:
+            rows = conn.execute(
+                sa.text(
+                    "SELECT id, hospital_id, phone_number FROM patients "
+                    "WHERE id > :last_id ORDER BY id LIMIT :batch"
+                ),
+                {'last_id': last_id, 'batch': BATCH_SIZE},
+            ).all()
+            if not rows:
+                break
+            last_id = rows[-1].id
+
+            ids, values = [], []
+            for row in rows:
+                normalized = normalize_phone(row.phone_number)
+                if normalized is None:
+                    invalid += 1
+                    continue
+                if (row.hospital_id, normalized) in taken:
+                    duplicates.append(row.id)
+                    continue
+                taken.add((row.hospital_id, normalized))
+                ids.append(row.id)
+                values.append(normalized)
+            if ids:
+                conn.execute(
+                    sa.text(
+                        "UPDATE patients SET phone_normalized = data.phone "
+                        "FROM unnest(CAST(:ids AS integer[]), CAST(:phones AS text[])) AS data(id, phone) "
+                        "WHERE patients.id = data.id"
+                    ),
+                    {'ids': ids, 'phones': values},
+                )
+                updated += len(ids)
+        print(f"  normalized {updated} numbers, {invalid} not normalizable")
+        if duplicates:
+            print(f"  {len(duplicates)} patients share a normalized number with an older patient "
+                  f"and were left NULL: {duplicates[:50]}{' ...' if len(duplicates) > 50 else ''}")
+
+        print("Stage 3: Creating unique (hospital_id, phone_normalized) index (concurrently)...")
+        op.execute(
+            "CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS ix_patients_hospital_phone_normalized "
+            "ON patients (hospital_id, phone_normalized)"
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_patients_hospital_phone_normalized', table_name='patients')
+    op.drop_column('patients', 'phone_normalized')
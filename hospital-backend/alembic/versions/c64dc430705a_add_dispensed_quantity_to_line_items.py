@@ -0,0 +1,47 @@
+"""Add dispensed quantity to prescription line items
+
+Revision ID: c64dc430705a
+Revises: d5d1ffbe2ffe
+Create Date: 2026-10-19 20:14:05.318427
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c64dc430705a'
+down_revision: Union[str, Sequence[str], None] = 'd5d1ffbe2ffe'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    print("Stage 1: Adding dispensed_quantity...")
+    op.add_column(
+        'prescriptionlineitems',
+        sa.Column('dispensed_quantity', sa.Integer(), server_default='0', nullable=False),
+    )
+
+    print("Stage 2: Backfilling from the stock ledger...")
+    op.execute(
+        """
+        UPDATE prescriptionlineitems AS li
+        SET dispensed_quantity = m.quantity
+        FROM (
+            SELECT line_item_id, -sum(delta) AS quantity
+            FROM stockmovements
+            WHERE reason = 'dispense' AND line_item_id IS NOT NULL
+            GROUP BY line_item_id
+        ) AS m
+        WHERE li.id = m.line_item_id
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('prescriptionlineitems', 'dispensed_quantity')
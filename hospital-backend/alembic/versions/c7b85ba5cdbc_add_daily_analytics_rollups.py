@@ -0,0 +1,95 @@
+"""Add daily analytics rollup tables
+
+Revision ID: c7b85ba5cdbc
+Revises: 72fadfd4f1da
+Create Date: 2026-10-19 18:42:17.035562
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c7b85ba5cdbc'
+down_revision: Union[str, Sequence[str], None] = '72fadfd4f1da'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Must match crud_medicine.normalize_medicine_name
+NORMALIZED_NAME = "lower(regexp_replace(btrim(li.medicine_name), '\\s+', ' ', 'g'))"
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    print("Stage 1: Creating rollup tables...")
+    op.create_table(
+        'doctor_daily_stats',
+        sa.Column('hospital_id', sa.Integer(), nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('doctor_id', sa.Integer(), nullable=False),
+        sa.Column('appointments', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('completed', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('no_shows', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('cancelled', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('prescriptions', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.ForeignKeyConstraint(['hospital_id'], ['hospitals.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['doctor_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('hospital_id', 'day', 'doctor_id'),
+    )
+    op.create_table(
+        'medicine_daily_stats',
+        sa.Column('hospital_id', sa.Integer(), nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('medicine_name', sa.String(), nullable=False),
+        sa.Column('prescribed', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('dispensed', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('substituted', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.ForeignKeyConstraint(['hospital_id'], ['hospitals.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('hospital_id', 'day', 'medicine_name'),
+    )
+
+    print("Stage 2: Computing rollups from existing appointments...")
+    op.execute(
+        """
+        INSERT INTO doctor_daily_stats
+            (hospital_id, day, doctor_id, appointments, completed, no_shows, cancelled, prescriptions)
+        SELECT u.hospital_id, date(a.appointment_time), a.doctor_id,
+               count(*),
+               count(*) FILTER (WHERE a.status = 'COMPLETED'),
+               count(*) FILTER (WHERE a.status = 'NO_SHOW'),
+               count(*) FILTER (WHERE a.status = 'CANCELLED'),
+               count(p.id)
+        FROM appointments AS a
+        JOIN users AS u ON u.id = a.doctor_id
+        LEFT JOIN visits AS v ON v.appointment_id = a.id
+        LEFT JOIN prescriptions AS p ON p.visit_id = v.id
+        WHERE u.hospital_id IS NOT NULL
+        GROUP BY u.hospital_id, date(a.appointment_time), a.doctor_id
+        """
+    )
+
+    print("Stage 3: Computing rollups from existing prescriptions...")
+    op.execute(
+        f"""
+        INSERT INTO medicine_daily_stats (hospital_id, day, medicine_name, prescribed, dispensed, substituted)
+        SELECT p.hospital_id, date(a.appointment_time), {NORMALIZED_NAME},
+               count(*),
+               count(*) FILTER (WHERE li.status IN ('GIVEN', 'PARTIALLY_GIVEN')),
+               count(*) FILTER (WHERE li.status = 'SUBSTITUTED')
+        FROM prescriptions AS p
+        JOIN prescriptionlineitems AS li ON li.prescription_id = p.id
+        JOIN visits AS v ON v.id = p.visit_id
+        JOIN appointments AS a ON a.id = v.appointment_id
+        GROUP BY p.hospital_id, date(a.appointment_time), {NORMALIZED_NAME}
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('medicine_daily_stats')
+    op.drop_table('doctor_daily_stats')
@@ -0,0 +1,83 @@
+"""Add per-hospital medicine catalog and link line items to it
+
+Revision ID: c8e1f04a7d39
+Revises: a41c7e9d2b60
+Create Date: 2026-10-19 11:20:51.907214
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c8e1f04a7d39'
+down_revision: Union[str, Sequence[str], None] = 'a41c7e9d2b60'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Must match crud_medicine.normalize_medicine_name
+NORMALIZED_NAME = "lower(regexp_replace(btrim(li.medicine_name), '\\s+', ' ', 'g'))"
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    print("Stage 1: Creating medicines table...")
+    op.create_table(
+        'medicines',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('hospital_id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(), nullable=False),
+        sa.Column('name_normalized', sa.String(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.ForeignKeyConstraint(['hospital_id'], ['hospitals.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('hospital_id', 'name_normalized', name='_medicine_hospital_name_uc'),
+    )
+    op.create_index(op.f('ix_medicines_id'), 'medicines', ['id'], unique=False)
+
+    op.add_column('prescriptionlineitems', sa.Column('medicine_id', sa.Integer(), nullable=True))
+    op.create_foreign_key(
+        'fk_prescriptionlineitems_medicine_id', 'prescriptionlineitems', 'medicines',
+        ['medicine_id'], ['id'], ondelete='SET NULL'
+    )
+    op.create_index(
+        op.f('ix_prescriptionlineitems_medicine_id'), 'prescriptionlineitems', ['medicine_id'], unique=False
+    )
+
+    # Stage 2: Seed the catalog from historical line items, keeping the most
+    # recently used spelling of each medicine as its display name.
+    print("Stage 2: Seeding medicines from historical prescription line items...")
+    op.execute(
+        f"""
+        INSERT INTO medicines (hospital_id, name, name_normalized)
+        SELECT DISTINCT ON (p.hospital_id, {NORMALIZED_NAME})
+               p.hospital_id, btrim(li.medicine_name), {NORMALIZED_NAME}
+        FROM prescriptionlineitems AS li
+        JOIN prescriptions AS p ON p.id = li.prescription_id
+        WHERE btrim(li.medicine_name) <> ''
+        ORDER BY p.hospital_id, {NORMALIZED_NAME}, li.id DESC
+        """
+    )
+
+    print("Stage 3: Linking line items to catalog entries...")
+    op.execute(
+        f"""
+        UPDATE prescriptionlineitems AS li
+        SET medicine_id = m.id
+        FROM prescriptions AS p, medicines AS m
+        WHERE li.prescription_id = p.id
+          AND m.hospital_id = p.hospital_id
+          AND m.name_normalized = {NORMALIZED_NAME}
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_prescriptionlineitems_medicine_id'), table_name='prescriptionlineitems')
+    op.drop_constraint('fk_prescriptionlineitems_medicine_id', 'prescriptionlineitems', type_='foreignkey')
+    op.drop_column('prescriptionlineitems', 'medicine_id')
+    op.drop_index(op.f('ix_medicines_id'), table_name='medicines')
+    op.drop_table('medicines')
@@ -0,0 +1,51 @@
+"""Add unlogged socket presence tables
+
+Revision ID: d4b543a0168c
+Revises: c64dc430705a
+Create Date: 2026-10-19 20:31:44.907216
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd4b543a0168c'
+down_revision: Union[str, Sequence[str], None] = 'c64dc430705a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'socket_workers',
+        sa.Column('worker_id', sa.String(), nullable=False),
+        sa.Column('last_seen', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.PrimaryKeyConstraint('worker_id'),
+        prefixes=['UNLOGGED'],
+    )
+    op.create_table(
+        'socket_sessions',
+        sa.Column('sid', sa.String(), nullable=False),
+        sa.Column('worker_id', sa.String(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('hospital_id', sa.Integer(), nullable=True),
+        sa.Column('role', sa.String(), nullable=False),
+        sa.Column('connected_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.ForeignKeyConstraint(['worker_id'], ['socket_workers.worker_id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('sid'),
+        prefixes=['UNLOGGED'],
+    )
+    op.create_index('ix_socket_sessions_hospital_role', 'socket_sessions', ['hospital_id', 'role'], unique=False)
+    op.create_index('ix_socket_sessions_worker_id', 'socket_sessions', ['worker_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_socket_sessions_worker_id', table_name='socket_sessions')
+    op.drop_index('ix_socket_sessions_hospital_role', table_name='socket_sessions')
+    op.drop_table('socket_sessions')
+    op.drop_table('socket_workers')
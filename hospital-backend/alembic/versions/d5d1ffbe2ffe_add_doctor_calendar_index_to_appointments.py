@@ -0,0 +1,32 @@
+"""Add doctor calendar index to appointments
+
+Revision ID: d5d1ffbe2ffe
+Revises: c7b85ba5cdbc
+Create Date: 2026-10-19 19:10:52.640193
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd5d1ffbe2ffe'
+down_revision: Union[str, Sequence[str], None] = 'c7b85ba5cdbc'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_appointments_doctor_time "
+            "ON appointments (doctor_id, appointment_time)"
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_appointments_doctor_time', table_name='appointments')
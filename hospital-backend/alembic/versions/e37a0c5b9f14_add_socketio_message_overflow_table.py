@@ -0,0 +1,37 @@
+"""Add unlogged socketio_messages overflow table
+
+Revision ID: e37a0c5b9f14
+Revises: 5b9d3e2f71ac
+Create Date: 2026-10-19 13:41:08.226794
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e37a0c5b9f14'
+down_revision: Union[str, Sequence[str], None] = '5b9d3e2f71ac'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'socketio_messages',
+        sa.Column('id', sa.BigInteger(), nullable=False),
+        sa.Column('payload', sa.Text(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        prefixes=['UNLOGGED'],
+    )
+    op.create_index(op.f('ix_socketio_messages_created_at'), 'socketio_messages', ['created_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_socketio_messages_created_at'), table_name='socketio_messages')
+    op.drop_table('socketio_messages')
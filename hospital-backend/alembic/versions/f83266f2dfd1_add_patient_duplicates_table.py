@@ -0,0 +1,62 @@
+"""Add patient_duplicates table for duplicate detection
+
+Revision ID: f83266f2dfd1
+Revises: 391e32615a6f
+Create Date: 2026-10-19 17:31:08.264117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f83266f2dfd1'
+down_revision: Union[str, Sequence[str], None] = '391e32615a6f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    print("Stage 1: Enabling fuzzystrmatch (soundex blocking keys)...")
+    op.execute("CREATE EXTENSION IF NOT EXISTS fuzzystrmatch")
+
+    print("Stage 2: Creating patient_duplicates table...")
+    op.create_table(
+        'patient_duplicates',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('hospital_id', sa.Integer(), nullable=False),
+        sa.Column('patient_a_id', sa.Integer(), nullable=False),
+        sa.Column('patient_b_id', sa.Integer(), nullable=False),
+        sa.Column('score', sa.Float(), nullable=False),
+        sa.Column('same_phone', sa.Boolean(), nullable=False),
+        sa.Column('status', sa.Enum('PENDING', 'DISMISSED', name='duplicatestatus'), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.ForeignKeyConstraint(['hospital_id'], ['hospitals.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['patient_a_id'], ['patients.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['patient_b_id'], ['patients.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('patient_a_id', 'patient_b_id', name='_patient_duplicate_pair_uc'),
+    )
+
+    print("Stage 3: Creating indexes...")
+    op.create_index(op.f('ix_patient_duplicates_id'), 'patient_duplicates', ['id'], unique=False)
+    op.create_index(
+        op.f('ix_patient_duplicates_patient_b_id'), 'patient_duplicates', ['patient_b_id'], unique=False
+    )
+    op.create_index(
+        'ix_patient_duplicates_hospital_status_score', 'patient_duplicates',
+        ['hospital_id', 'status', sa.text('score DESC')], unique=False
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_patient_duplicates_hospital_status_score', table_name='patient_duplicates')
+    op.drop_index(op.f('ix_patient_duplicates_patient_b_id'), table_name='patient_duplicates')
+    op.drop_index(op.f('ix_patient_duplicates_id'), table_name='patient_duplicates')
+    op.drop_table('patient_duplicates')
+    sa.Enum(name='duplicatestatus').drop(op.get_bind(), checkfirst=True)
@@ -49,6 +49,7 @@ def require_role(required_roles: List[models.user.UserRole]):
 
 # ... other imports
 from app import crud, schemas
+from app.audit import audit_writer
 
 # ...
 
@@ -61,15 +62,14 @@ async def log_action(
     entity_id: Optional[int] = None,
     details: Optional[dict] = None,
 ):
-    """ A dependency to log an audit trail entry. """
-    log_entry = schemas.AuditLogCreate(
+    """ A dependency to log an audit trail entry (queued; see app.audit). """
+    audit_writer.record(
         user_id=current_user.id,
         action=action,
         entity=entity,
         entity_id=entity_id,
         details=details or {}
     )
-    await crud.audit_log.create(db, obj_in=log_entry)
 
 # You can then use this in endpoints. For example, in appointments.py:
 #
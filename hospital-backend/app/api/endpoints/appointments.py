@@ -1,11 +1,19 @@
+from collections import defaultdict
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
+from sqlalchemy import select, func, tuple_
 from sqlalchemy.orm import selectinload
 # --- ADD THE MISSING IMPORT ON THE LINE BELOW ---
 from datetime import date 
-from app.socket_manager import notify_user, notify_pharmacy
+from app.socket_manager import notify_user, notify_pharmacy, notify_nurses, event_payload
+from app.medicine_index import medicine_index
+from app.patient_index import patient_index
+from app.appointment_calendar import appointment_calendar
+from app.audit import audit_writer
+from app.core.config import settings
+from app.crud.crud_medicine import normalize_medicine_name
+from app.crud.crud_analytics import line_counts
 
 from app import schemas, crud, db
 from app.db import models
@@ -16,6 +24,16 @@ from app.db.models.prescription import PrescriptionStatus, DispenseLineStatus
 router = APIRouter()
 
 
+def _status_event(appointment: models.Appointment) -> dict:
+    """ `appointment_status_changed` payload for the nurses' room; read before commit expires the row. """
+    return {
+        "appointment_id": appointment.id,
+        "status": appointment.status.value,
+        "doctor_id": appointment.doctor_id,
+        "patient_id": appointment.patient_id,
+    }
+
+
 @router.post(
     "/",
     response_model=schemas.Appointment,
@@ -35,18 +53,23 @@ async def create_appointment(
     db_obj = models.Appointment(**appointment_data)
 
     db.add(db_obj)
+    await crud.analytics.apply_doctor_day(
+        db, doctor_id=db_obj.doctor_id, appointment_time=db_obj.appointment_time, appointments=1
+    )
     await db.commit()
     await db.refresh(db_obj)
     
     await db.refresh(db_obj, attribute_names=['patient', 'doctor', 'visit'])
     
     appointment = db_obj 
+    appointment_calendar.invalidate(appointment.doctor_id, appointment.appointment_time)
 
-    await notify_user(
-        appointment.doctor_id,
-        "new_appointment",
-        {"appointment_id": appointment.id, "patient_name": appointment.patient.full_name},
+    payload = event_payload(
+        "appointment", schemas.Appointment, appointment,
+        appointment_id=appointment.id, patient_name=appointment.patient.full_name,
     )
+    await notify_user(appointment.doctor_id, "new_appointment", payload)
+    await notify_nurses(current_user.hospital_id, "new_appointment", payload)
     return appointment
 
 # In app/api/endpoints/appointments.py
@@ -118,9 +141,15 @@ async def update_appointment_status(
     if not (current_user.role in [models.UserRole.NURSE, models.UserRole.ADMIN] or appointment.doctor_id == current_user.id):
         raise HTTPException(status_code=403, detail="Not authorized to modify this appointment")
     
+    await crud.analytics.apply_status_change(
+        db, doctor_id=appointment.doctor_id, appointment_time=appointment.appointment_time,
+        old_status=appointment.status, new_status=status,
+    )
     appointment.status = status
     await db.commit()
     await db.refresh(appointment)
+    appointment_calendar.invalidate(appointment.doctor_id, appointment.appointment_time)
+    await notify_nurses(current_user.hospital_id, "appointment_status_changed", _status_event(appointment))
     return appointment
 
 
@@ -132,13 +161,12 @@ async def cancel_appointment(
 ):
     appointment = await update_appointment_status(id, models.appointment.AppointmentStatus.CANCELLED, db, current_user)
     
-    log_entry = schemas.AuditLogCreate(
+    audit_writer.record(
         user_id=current_user.id, 
         action="APPOINTMENT_CANCELLED", 
         entity="Appointment", 
         entity_id=id
     )
-    await crud.audit_log.create(db, obj_in=log_entry)
     
     return appointment
 
@@ -177,6 +205,10 @@ async def start_consultation(
     if appointment.visit:
         raise HTTPException(status_code=400, detail="Consultation has already been started.")
 
+    await crud.analytics.apply_status_change(
+        db, doctor_id=appointment.doctor_id, appointment_time=appointment.appointment_time,
+        old_status=appointment.status, new_status=models.appointment.AppointmentStatus.IN_CONSULTATION,
+    )
     appointment.status = models.appointment.AppointmentStatus.IN_CONSULTATION
     new_visit = models.Visit()
     appointment.visit = new_visit
@@ -196,6 +228,8 @@ async def start_consultation(
     )
     
     updated_appointment = final_result.scalars().first()
+    appointment_calendar.invalidate(updated_appointment.doctor_id, updated_appointment.appointment_time)
+    await notify_nurses(current_user.hospital_id, "appointment_status_changed", _status_event(updated_appointment))
     return updated_appointment
 
 @router.put(
@@ -244,7 +278,12 @@ async def save_visit_details(
             detail="Cannot edit a visit with a fully dispensed prescription."
         )
 
-    # mark appointment complete
+    # mark appointment complete; only the first save counts as a new visit
+    first_completion = appointment.status != models.appointment.AppointmentStatus.COMPLETED
+    await crud.analytics.apply_status_change(
+        db, doctor_id=appointment.doctor_id, appointment_time=appointment.appointment_time,
+        old_status=appointment.status, new_status=models.appointment.AppointmentStatus.COMPLETED,
+    )
     appointment.status = models.appointment.AppointmentStatus.COMPLETED
 
     # update visit details
@@ -253,8 +292,34 @@ async def save_visit_details(
     for key, value in visit_data.items():
         setattr(visit, key, value)
 
-    # handle prescription logic
+    # handle prescription logic; medicine_deltas[name] = (prescribed, dispensed, substituted)
+    medicine_deltas = defaultdict(lambda: (0, 0, 0))
+
+    def count_lines(items, sign):
+        for item in items:
+            prescribed, dispensed, substituted = medicine_deltas[item.medicine_name]
+            item_dispensed, item_substituted = line_counts(getattr(item, "status", None))
+            medicine_deltas[item.medicine_name] = (
+                prescribed + sign, dispensed + sign * item_dispensed, substituted + sign * item_substituted
+            )
+
+    new_medicines = []
+    new_prescription_event = None
     if payload.prescription_details and payload.prescription_details.line_items:
+        # Link every line item to the hospital's medicine catalog, growing it as needed
+        medicine_ids, created_medicines = await crud.medicine.resolve_names(
+            db,
+            hospital_id=current_user.hospital_id,
+            names=[item.medicine_name for item in payload.prescription_details.line_items],
+        )
+        new_medicines = [(m.hospital_id, m.id, m.name) for m in created_medicines]
+
+        def build_line_item(item):
+            return models.PrescriptionLineItem(
+                **item.dict(),
+                medicine_id=medicine_ids.get(normalize_medicine_name(item.medicine_name)),
+            )
+
         if not existing_prescription:
             # --- CREATE PRESCRIPTION ---
             new_prescription = models.Prescription(
@@ -262,20 +327,21 @@ async def save_visit_details(
                 patient_id=appointment.patient_id,
                 doctor_id=current_user.id,
                 hospital_id=current_user.hospital_id,   # ✅ FIX
+                patient=appointment.patient,
             )
             for item in payload.prescription_details.line_items:
-                new_prescription.line_items.append(
-                    models.PrescriptionLineItem(**item.dict())
-                )
+                new_prescription.line_items.append(build_line_item(item))
+            count_lines(payload.prescription_details.line_items, 1)
             db.add(new_prescription)
             await db.flush()  # ✅ ensure new_prescription.id is generated
 
-            await notify_pharmacy(
-                "new_prescription",
-                {
-                    "prescription_id": new_prescription.id,
-                    "patient_name": appointment.patient.full_name,
-                },
+            # Serialize now while everything is loaded; emit once committed
+            new_prescription_event = (
+                current_user.hospital_id,
+                event_payload(
+                    "prescription", schemas.Prescription, new_prescription,
+                    prescription_id=new_prescription.id, patient_name=appointment.patient.full_name,
+                ),
             )
         else:
             # --- UPDATE PRESCRIPTION ---
@@ -284,19 +350,55 @@ async def save_visit_details(
                 if item.status != DispenseLineStatus.NOT_GIVEN
             ]
             new_items_from_payload = [
-                models.PrescriptionLineItem(**item.dict()) 
+                build_line_item(item)
                 for item in payload.prescription_details.line_items
             ]
+            count_lines([i for i in existing_prescription.line_items if i not in dispensed_items], -1)
+            count_lines(payload.prescription_details.line_items, 1)
             existing_prescription.line_items = dispensed_items + new_items_from_payload
     else:
         if existing_prescription:
             # keep only dispensed items if no new line items are provided
+            count_lines(
+                [i for i in existing_prescription.line_items if i.status == DispenseLineStatus.NOT_GIVEN], -1
+            )
             existing_prescription.line_items = [
                 item for item in existing_prescription.line_items 
                 if item.status != DispenseLineStatus.NOT_GIVEN
             ]
 
+    opened_prescription = new_prescription_event is not None
+    if first_completion or opened_prescription:
+        await crud.patient_stats.apply(
+            db,
+            patient_id=appointment.patient_id,
+            hospital_id=current_user.hospital_id,
+            visits=1 if first_completion else 0,
+            last_visit_at=appointment.appointment_time if first_completion else None,
+            open_prescriptions=1 if opened_prescription else 0,
+        )
+
+    if opened_prescription:
+        await crud.analytics.apply_doctor_day(
+            db, doctor_id=appointment.doctor_id, appointment_time=appointment.appointment_time, prescriptions=1
+        )
+    await crud.analytics.apply_medicines(
+        db, hospital_id=current_user.hospital_id, appointment_time=appointment.appointment_time,
+        deltas=medicine_deltas,
+    )
+
+    visit_record = (current_user.hospital_id, appointment.patient_id, appointment.appointment_time.date())
+    calendar_key = (appointment.doctor_id, appointment.appointment_time)
+    status_event = _status_event(appointment) if first_completion else None
     await db.commit()
+    patient_index.record_visit(*visit_record)
+    appointment_calendar.invalidate(*calendar_key)
+    for hospital_id, medicine_id, name in new_medicines:
+        medicine_index.add(hospital_id, medicine_id, name)
+    if new_prescription_event:
+        await notify_pharmacy(new_prescription_event[0], "new_prescription", new_prescription_event[1])
+    if status_event:
+        await notify_nurses(current_user.hospital_id, "appointment_status_changed", status_event)
     
     return schemas.Msg(msg="Visit details saved successfully.")
 # In app/api/endpoints/appointments.py
@@ -304,6 +406,28 @@ async def save_visit_details(
 # ... (keep all your existing imports and endpoints)
 
 # --- ADD THIS ENTIRE NEW ENDPOINT ---
+def _filter_nurse_view(
+    query,
+    current_user: models.User,
+    appointment_date: Optional[date],
+    doctor_id: Optional[int],
+    patient_gender: Optional[str],
+):
+    """ Hospital scope and filters shared by the nurses' list and its facet counts. """
+    query = query.join(models.Appointment.patient) # Join patient to filter on gender
+    query = query.join(models.Appointment.doctor).filter(models.User.hospital_id == current_user.hospital_id)
+    # Apply filters
+    if appointment_date:
+        query = query.filter(func.date(models.Appointment.appointment_time) == appointment_date)
+    
+    if doctor_id:
+        query = query.filter(models.Appointment.doctor_id == doctor_id)
+        
+    if patient_gender:
+        query = query.filter(models.Patient.sex == patient_gender)
+    return query
+
+
 @router.get(
     "/all",
     response_model=List[schemas.Appointment],
@@ -314,11 +438,15 @@ async def read_all_appointments_for_nurses(
     appointment_date: Optional[date] = None,
     doctor_id: Optional[int] = None,
     patient_gender: Optional[str] = None,
+    skip: int = 0,
+    limit: Optional[int] = Query(None, ge=1, le=500),
     current_user: models.User = Depends(deps.get_current_user) 
 ):
     """
     (Nurses Only) Get a comprehensive list of all appointments with powerful filters.
     - Eager loads all consultation details for a read-only view.
+    - Paginated with `skip`/`limit`; counts come from `GET /facets`. Without
+      `limit` every matching appointment is returned, as before.
     """
     query = select(models.Appointment).options(
         selectinload(models.Appointment.patient),
@@ -327,17 +455,101 @@ async def read_all_appointments_for_nurses(
             selectinload(models.Visit.prescription).selectinload(models.Prescription.line_items),
             selectinload(models.Visit.notes).selectinload(models.ClinicalNote.author_doctor)
         )
-    ).join(models.Appointment.patient) # Join patient to filter on gender
-    query = query.join(models.Appointment.doctor).filter(models.User.hospital_id == current_user.hospital_id)
-    # Apply filters
-    if appointment_date:
-        query = query.filter(func.date(models.Appointment.appointment_time) == appointment_date)
-    
-    if doctor_id:
-        query = query.filter(models.Appointment.doctor_id == doctor_id)
-        
-    if patient_gender:
-        query = query.filter(models.Patient.sex == patient_gender)
+    )
+    query = _filter_nurse_view(query, current_user, appointment_date, doctor_id, patient_gender)
     
-    result = await db.execute(query.order_by(models.Appointment.appointment_time.desc()))
-    return result.scalars().all()
\ No newline at end of file
+    result = await db.execute(
+        query.order_by(models.Appointment.appointment_time.desc(), models.Appointment.id.desc())
+        .offset(skip)
+        .limit(limit)
+    )
+    return result.scalars().all()
+
+
+@router.get(
+    "/facets",
+    response_model=schemas.AppointmentFacets,
+    dependencies=[Depends(deps.require_role([models.UserRole.NURSE]))]
+)
+async def read_appointment_facets(
+    db: AsyncSession = Depends(deps.get_db),
+    appointment_date: Optional[date] = None,
+    doctor_id: Optional[int] = None,
+    patient_gender: Optional[str] = None,
+    current_user: models.User = Depends(deps.get_current_user),
+):
+    """
+    (Nurses Only) Appointment counts per status, per doctor and per patient
+    sex, under the same filters as `GET /all`, in one GROUPING SETS query.
+    """
+    status_col = models.Appointment.status
+    doctor_cols = (models.Appointment.doctor_id, models.User.full_name)
+    sex_col = models.Patient.sex
+    query = select(
+        status_col,
+        *doctor_cols,
+        sex_col,
+        func.count().label("count"),
+        func.grouping(status_col).label("by_status"),
+        func.grouping(models.Appointment.doctor_id).label("by_doctor"),
+    ).select_from(models.Appointment)
+    query = _filter_nurse_view(query, current_user, appointment_date, doctor_id, patient_gender)
+    query = query.group_by(func.grouping_sets(status_col, tuple_(*doctor_cols), sex_col))
+
+    facets = {"total": 0, "status": [], "doctor": [], "sex": []}
+    for row in (await db.execute(query)).all():
+        # grouping() is 0 for the column(s) the row is grouped by
+        if row.by_status == 0:
+            facets["status"].append({"value": row.status.value, "count": row.count})
+            facets["total"] += row.count
+        elif row.by_doctor == 0:
+            facets["doctor"].append(
+                {"doctor_id": row.doctor_id, "doctor_name": row.full_name, "count": row.count}
+            )
+        else:
+            facets["sex"].append({"value": row.sex, "count": row.count})
+    for key in ("status", "doctor", "sex"):
+        facets[key].sort(key=lambda facet: facet["count"], reverse=True)
+    return facets
+
+
+@router.get(
+    "/calendar",
+    response_model=schemas.AppointmentCalendar,
+    dependencies=[Depends(deps.require_role([models.UserRole.DOCTOR, models.UserRole.NURSE, models.UserRole.ADMIN]))]
+)
+async def read_appointment_calendar(
+    from_date: date = Query(..., alias="from"),
+    to_date: date = Query(..., alias="to"),
+    doctor_id: Optional[int] = None,
+    slot_minutes: int = Query(30, ge=5, le=240),
+    include_entries: bool = False,
+    db: AsyncSession = Depends(deps.get_db),
+    current_user: models.User = Depends(deps.get_current_user),
+):
+    """
+    A doctor's calendar for `from`..`to` (inclusive, at most CALENDAR_MAX_DAYS):
+    per-day totals and status counts, and counts per `slot_minutes` slot.
+    With `include_entries`, also the appointments themselves (without visit
+    details). Doctors default to their own calendar.
+    """
+    if to_date < from_date:
+        raise HTTPException(status_code=400, detail="to must not be before from.")
+    if (to_date - from_date).days >= settings.CALENDAR_MAX_DAYS:
+        raise HTTPException(status_code=400, detail=f"Range is limited to {settings.CALENDAR_MAX_DAYS} days.")
+
+    if doctor_id is None:
+        if current_user.role != models.UserRole.DOCTOR:
+            raise HTTPException(status_code=400, detail="doctor_id is required.")
+        doctor_id = current_user.id
+    elif doctor_id != current_user.id:
+        doctor = await crud.user.get(db, id=doctor_id)
+        if not doctor or doctor.role != models.UserRole.DOCTOR or doctor.hospital_id != current_user.hospital_id:
+            raise HTTPException(status_code=404, detail="Doctor not found")
+
+    entries = await appointment_calendar.entries(db, doctor_id=doctor_id, start=from_date, end=to_date)
+    return {
+        "doctor_id": doctor_id,
+        "days": appointment_calendar.summarize(entries, start=from_date, end=to_date, slot_minutes=slot_minutes),
+        "entries": entries if include_entries else None,
+    }
@@ -0,0 +1,126 @@
+from datetime import date, timedelta
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.orm import aliased
+
+from app.api import deps
+from app.db import models
+from app.export import stream_rows
+
+router = APIRouter()
+
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+def _check_range(current_user: models.User, start: date, end: date):
+    if not current_user.hospital_id:
+        raise HTTPException(status_code=403, detail="User is not associated with a hospital.")
+    if end < start:
+        raise HTTPException(status_code=400, detail="end must not be before start.")
+
+
+def _export_response(query, name: str, start: date, end: date, format: str, gzip: bool) -> StreamingResponse:
+    filename = f"{name}_{start.isoformat()}_{end.isoformat()}.{format}"
+    media_type = MEDIA_TYPES[format]
+    if gzip:
+        filename += ".gz"
+        media_type = "application/gzip"
+    return StreamingResponse(
+        stream_rows(query, format=format, gzip=gzip),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+@router.get(
+    "/appointments",
+    dependencies=[Depends(deps.require_role([models.UserRole.ADMIN]))]
+)
+async def export_appointments(
+    start: date,
+    end: date,
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    gzip: bool = False,
+    current_user: models.User = Depends(deps.get_current_user),
+):
+    """
+    (Admin) The hospital's appointments from `start` to `end` (inclusive), one
+    flat row each, streamed as NDJSON or CSV and optionally gzipped.
+    """
+    _check_range(current_user, start, end)
+    doctor = aliased(models.User)
+    query = (
+        select(
+            models.Appointment.id.label("appointment_id"),
+            models.Appointment.appointment_time,
+            models.Appointment.status,
+            models.Appointment.visit_purpose,
+            models.Appointment.patient_id,
+            models.Patient.full_name.label("patient_name"),
+            models.Appointment.doctor_id,
+            doctor.full_name.label("doctor_name"),
+            models.Visit.diagnosis_summary,
+        )
+        .join(doctor, doctor.id == models.Appointment.doctor_id)
+        .join(models.Patient, models.Patient.id == models.Appointment.patient_id)
+        .outerjoin(models.Visit, models.Visit.appointment_id == models.Appointment.id)
+        .filter(
+            doctor.hospital_id == current_user.hospital_id,
+            models.Appointment.appointment_time >= start,
+            models.Appointment.appointment_time < end + timedelta(days=1),
+        )
+        .order_by(models.Appointment.appointment_time, models.Appointment.id)
+    )
+    return _export_response(query, "appointments", start, end, format, gzip)
+
+
+@router.get(
+    "/prescriptions",
+    dependencies=[Depends(deps.require_role([models.UserRole.ADMIN]))]
+)
+async def export_prescriptions(
+    start: date,
+    end: date,
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    gzip: bool = False,
+    current_user: models.User = Depends(deps.get_current_user),
+):
+    """
+    (Admin) The hospital's prescriptions written from `start` to `end`
+    (inclusive), one row per line item, streamed as NDJSON or CSV and
+    optionally gzipped.
+    """
+    _check_range(current_user, start, end)
+    doctor = aliased(models.User)
+    line = models.PrescriptionLineItem
+    query = (
+        select(
+            models.Prescription.id.label("prescription_id"),
+            models.Prescription.created_at,
+            models.Prescription.status,
+            models.Prescription.patient_id,
+            models.Patient.full_name.label("patient_name"),
+            models.Prescription.doctor_id,
+            doctor.full_name.label("doctor_name"),
+            line.id.label("line_item_id"),
+            line.medicine_name,
+            line.dose,
+            line.frequency,
+            line.duration_days,
+            line.status.label("line_status"),
+            line.substitution_info,
+        )
+        .join(line, line.prescription_id == models.Prescription.id)
+        .outerjoin(models.Patient, models.Patient.id == models.Prescription.patient_id)
+        .outerjoin(doctor, doctor.id == models.Prescription.doctor_id)
+        .filter(
+            models.Prescription.hospital_id == current_user.hospital_id,
+            models.Prescription.created_at >= start,
+            models.Prescription.created_at < end + timedelta(days=1),
+        )
+        .order_by(models.Prescription.id, line.id)
+    )
+    return _export_response(query, "prescriptions", start, end, format, gzip)
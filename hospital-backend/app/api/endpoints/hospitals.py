@@ -1,4 +1,5 @@
-from typing import List
+from datetime import date
+from typing import List, Optional
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from app import crud, schemas, db
@@ -7,6 +8,9 @@ from app.db import models
 
 router = APIRouter()
 
+# Longest range GET /{id}/analytics serves in one request
+ANALYTICS_MAX_DAYS = 366
+
 # --- ADD THIS NEW SCHEMA in `app/schemas/__init__.py` or a new `hospital.py` schema file ---
 # We need a new schema for the payload
 class HospitalWithAdminCreate(schemas.HospitalCreate):
@@ -143,4 +147,58 @@ async def delete_hospital(
     # linked to it via foreign keys with cascade rules should also be deleted.
     await crud.hospital.remove(db, id=id)
     
-    return schemas.Msg(msg=f"Hospital '{hospital.name}' and all its data have been deleted.")
\ No newline at end of file
+    return schemas.Msg(msg=f"Hospital '{hospital.name}' and all its data have been deleted.")
+
+@router.get(
+    "/{id}/analytics",
+    response_model=schemas.HospitalAnalytics,
+    dependencies=[Depends(deps.require_role([models.UserRole.ADMIN, models.UserRole.SUPER_ADMIN]))]
+)
+async def read_hospital_analytics(
+    id: int,
+    start: date,
+    end: date,
+    doctor_id: Optional[int] = None,
+    db: AsyncSession = Depends(deps.get_db),
+    current_user: models.User = Depends(deps.get_current_user),
+):
+    """
+    Appointments, no-shows and prescriptions per doctor per day, plus the most
+    prescribed medicines, for `start`..`end` (inclusive). Served from the
+    daily rollup tables only. Admins can only read their own hospital.
+    """
+    if current_user.role != models.UserRole.SUPER_ADMIN and current_user.hospital_id != id:
+        raise HTTPException(status_code=403, detail="Not authorized to view this hospital.")
+    if end < start:
+        raise HTTPException(status_code=400, detail="end must not be before start.")
+    if (end - start).days >= ANALYTICS_MAX_DAYS:
+        raise HTTPException(status_code=400, detail=f"Range is limited to {ANALYTICS_MAX_DAYS} days.")
+
+    doctor_days = await crud.analytics.get_doctor_days(db, hospital_id=id, start=start, end=end, doctor_id=doctor_id)
+    medicines = await crud.analytics.get_medicine_totals(db, hospital_id=id, start=start, end=end)
+
+    totals = {}
+    for row in doctor_days:
+        summary = totals.setdefault(row.doctor_id, {
+            "doctor_id": row.doctor_id, "appointments": 0, "completed": 0,
+            "no_shows": 0, "cancelled": 0, "prescriptions": 0, "days": 0,
+        })
+        for key in ("appointments", "completed", "no_shows", "cancelled", "prescriptions"):
+            summary[key] += getattr(row, key)
+        summary["days"] += row.appointments > 0
+    doctors = []
+    for summary in totals.values():
+        days = summary.pop("days")
+        doctors.append(schemas.DoctorSummary(
+            **summary,
+            no_show_rate=summary["no_shows"] / summary["appointments"] if summary["appointments"] else None,
+            avg_consultations_per_day=summary["completed"] / days if days else None,
+        ))
+
+    return schemas.HospitalAnalytics(
+        start=start,
+        end=end,
+        doctors=doctors,
+        doctor_days=doctor_days,
+        medicines=[schemas.MedicineSummary(**row._mapping) for row in medicines],
+    )
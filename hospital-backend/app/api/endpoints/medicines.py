@@ -0,0 +1,102 @@
+from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import schemas, crud
+from app.api import deps
+from app.db import models
+from app.medicine_index import medicine_index
+
+router = APIRouter()
+
+
+@router.get(
+    "/suggest",
+    response_model=List[schemas.Medicine],
+    dependencies=[Depends(deps.require_role([models.UserRole.DOCTOR, models.UserRole.MEDICAL_SHOP]))],
+)
+async def suggest_medicines(
+    q: str,
+    limit: int = Query(10, ge=1, le=50),
+    db: AsyncSession = Depends(deps.get_db),
+    current_user: models.User = Depends(deps.get_current_user),
+):
+    """
+    Autocomplete medicine names from this hospital's catalog.
+    Served from an in-memory index; the database is only read to refresh it.
+    """
+    return await medicine_index.suggest(db, hospital_id=current_user.hospital_id, q=q, limit=limit)
+
+
+@router.post(
+    "/",
+    response_model=schemas.Medicine,
+    dependencies=[Depends(deps.require_role([models.UserRole.DOCTOR, models.UserRole.MEDICAL_SHOP, models.UserRole.ADMIN]))],
+)
+async def create_medicine(
+    medicine_in: schemas.MedicineCreate,
+    db: AsyncSession = Depends(deps.get_db),
+    current_user: models.User = Depends(deps.get_current_user),
+):
+    """ Add a medicine to this hospital's catalog (returns the existing entry if already present). """
+    if not current_user.hospital_id:
+        raise HTTPException(status_code=403, detail="User is not associated with a hospital.")
+    hospital_id = current_user.hospital_id
+    ids, created = await crud.medicine.resolve_names(db, hospital_id=hospital_id, names=[medicine_in.name])
+    if not ids:
+        raise HTTPException(status_code=400, detail="Medicine name cannot be empty.")
+    new_entries = [(m.id, m.name) for m in created]
+    await db.commit()
+    for medicine_id, name in new_entries:
+        medicine_index.add(hospital_id, medicine_id, name)
+    return await crud.medicine.get(db, id=next(iter(ids.values())))
+
+
+@router.get(
+    "/stock",
+    response_model=List[schemas.StockLevel],
+    dependencies=[Depends(deps.require_role([models.UserRole.MEDICAL_SHOP, models.UserRole.ADMIN]))],
+)
+async def read_stock_levels(
+    low_only: bool = False,
+    db: AsyncSession = Depends(deps.get_db),
+    current_user: models.User = Depends(deps.get_current_user),
+):
+    """ Current stock for this hospital. `low_only` lists medicines at or below their threshold. """
+    return await crud.stock.get_levels(db, hospital_id=current_user.hospital_id, low_only=low_only)
+
+
+@router.post(
+    "/{id}/stock",
+    response_model=schemas.StockLevel,
+    dependencies=[Depends(deps.require_role([models.UserRole.MEDICAL_SHOP, models.UserRole.ADMIN]))],
+)
+async def adjust_stock(
+    id: int,
+    adjustment: schemas.StockAdjustment,
+    db: AsyncSession = Depends(deps.get_db),
+    current_user: models.User = Depends(deps.get_current_user),
+):
+    """ Restock (positive delta) or write off (negative delta) a medicine. """
+    medicine = await crud.medicine.get(db, id=id)
+    if not medicine or medicine.hospital_id != current_user.hospital_id:
+        raise HTTPException(status_code=404, detail="Medicine not found in this hospital")
+
+    stock = await crud.stock.adjust(
+        db,
+        hospital_id=current_user.hospital_id,
+        medicine_id=id,
+        adjustment=adjustment,
+        user_id=current_user.id,
+    )
+    if stock is None:
+        raise HTTPException(status_code=400, detail="Not enough stock for this write-off.")
+    level = schemas.StockLevel(
+        medicine_id=id,
+        medicine_name=medicine.name,
+        quantity=stock.quantity,
+        low_stock_threshold=stock.low_stock_threshold,
+        is_low=stock.quantity <= stock.low_stock_threshold,
+    )
+    await db.commit()
+    return level
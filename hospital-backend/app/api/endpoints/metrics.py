@@ -0,0 +1,19 @@
+from fastapi import APIRouter, Depends
+
+from app.api import deps
+from app.db import models
+from app.metrics import metrics
+
+router = APIRouter()
+
+
+@router.get(
+    "/",
+    dependencies=[Depends(deps.require_role([models.UserRole.SUPER_ADMIN, models.UserRole.ADMIN]))],
+)
+async def read_metrics():
+    """
+    (Admin) Counters and gauges for the worker that serves this request,
+    including Socket.IO send queue depths and emit coalescing.
+    """
+    return metrics.snapshot()
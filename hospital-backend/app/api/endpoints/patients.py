@@ -1,13 +1,25 @@
-from typing import List, Optional
-from datetime import date
-from fastapi import APIRouter, Depends, HTTPException, status
+import base64
+import os
+import re
+import uuid
+from typing import List, Optional, Tuple
+from datetime import date, datetime
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Request, status
+from fastapi.responses import FileResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, or_, func
-from sqlalchemy.orm import selectinload
+from sqlalchemy import select, func, tuple_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import selectinload, contains_eager
 
 from app import schemas, crud
 from app.api import deps
+from app.audit import audit_writer
+from app.core.phone import normalize_phone
 from app.db import models
+from app.db.session import AsyncSessionLocal
+from app.patient_import import PatientImport, iter_csv_rows, iter_lines, iter_ndjson_rows
+from app.patient_index import patient_index
+from app.socket_manager import notify_user
 
 router = APIRouter()
 
@@ -29,12 +41,13 @@ async def create_patient(
     if not current_user.hospital_id:
         raise HTTPException(status_code=403, detail="Creator is not associated with a hospital and cannot create patients.")
 
-    # Validation: Check for duplicate phone number WITHIN THE SAME HOSPITAL
-    existing_patient = await db.scalar(
-        select(models.Patient).filter(
-            models.Patient.phone_number == patient_in.phone_number,
-            models.Patient.hospital_id == current_user.hospital_id
-        )
+    if normalize_phone(patient_in.phone_number) is None:
+        raise HTTPException(status_code=400, detail="Invalid phone number.")
+
+    # Validation: Check for duplicate phone number WITHIN THE SAME HOSPITAL,
+    # comparing normalized numbers so "+91 98..." and "98..." are the same
+    existing_patient = await crud.patient.get_by_phone(
+        db, phone_number=patient_in.phone_number, hospital_id=current_user.hospital_id
     )
     if existing_patient:
          raise HTTPException(
@@ -49,15 +62,102 @@ async def create_patient(
     )
     
     db.add(new_patient_db_object)
-    await db.commit()
+    try:
+        await db.flush()
+        await crud.patient_stats.apply(
+            db, patient_id=new_patient_db_object.id, hospital_id=current_user.hospital_id
+        )
+        await db.commit()
+    except IntegrityError:
+        # Registered concurrently by someone else
+        await db.rollback()
+        raise HTTPException(
+            status_code=400,
+            detail="A patient with this phone number already exists in this hospital.",
+        )
     await db.refresh(new_patient_db_object)
+    patient_index.add(new_patient_db_object.hospital_id, new_patient_db_object)
     
     return new_patient_db_object
 
 
+@router.post(
+    "/import",
+    response_model=schemas.PatientImportResult,
+    dependencies=[Depends(deps.require_role([models.UserRole.NURSE, models.UserRole.DOCTOR]))],
+)
+async def import_patients(
+    request: Request,
+    db: AsyncSession = Depends(deps.get_db),
+    current_user: models.User = Depends(deps.get_current_user),
+    format: Optional[str] = Query(None, pattern="^(csv|ndjson)$"),
+):
+    """
+    Bulk-register patients into the user's hospital from a CSV (with a header
+    row) or NDJSON request body, read as it streams in. Columns/keys are
+    full_name, phone_number, date_of_birth and sex.
+
+    Patients whose phone number already exists in the hospital (or earlier in
+    the file) are skipped. Progress goes to the user's socket room as
+    `import_progress` after each chunk; rejected rows can be downloaded from
+    `/import/{import_id}/errors`.
+    """
+    if not current_user.hospital_id:
+        raise HTTPException(status_code=403, detail="Creator is not associated with a hospital and cannot create patients.")
+
+    if format is None:
+        content_type = request.headers.get("content-type", "")
+        format = "ndjson" if "ndjson" in content_type or "jsonl" in content_type else "csv"
+
+    # Captured up front: the import commits after every chunk
+    user_id, hospital_id = current_user.id, current_user.hospital_id
+    patient_import = PatientImport(db, hospital_id=hospital_id, import_id=uuid.uuid4().hex)
+    parse = iter_ndjson_rows if format == "ndjson" else iter_csv_rows
+    try:
+        async for line_no, row, raw in parse(iter_lines(request.stream())):
+            if await patient_import.add(line_no, row, raw):
+                await notify_user(user_id, "import_progress", {**patient_import.summary, "done": False})
+        await patient_import.flush()
+    finally:
+        patient_import.close()
+        if patient_import.inserted:
+            patient_index.invalidate(hospital_id)
+
+    await notify_user(user_id, "import_progress", {**patient_import.summary, "done": True})
+    return patient_import.summary
+
+
+@router.get(
+    "/import/{import_id}/errors",
+    dependencies=[Depends(deps.require_role([models.UserRole.NURSE, models.UserRole.DOCTOR]))],
+)
+async def download_import_errors(
+    import_id: str,
+    current_user: models.User = Depends(deps.get_current_user),
+):
+    """
+    The rejected rows of an import as CSV (line, error, row).
+    """
+    if not re.fullmatch(r"[0-9a-f]{32}", import_id) or not current_user.hospital_id:
+        raise HTTPException(status_code=404, detail="Import errors not found")
+    path = PatientImport.error_file_path(current_user.hospital_id, import_id)
+    if not os.path.exists(path):
+        raise HTTPException(status_code=404, detail="Import errors not found")
+    return FileResponse(path, media_type="text/csv", filename=f"patient_import_{import_id}_errors.csv")
+
+
+# Sort keys for the patient list; the stats ones are served by patient_stats indexes
+PATIENT_SORTS = {
+    "name": (models.Patient.full_name,),
+    "last_visit": (models.PatientStats.last_visit_at.desc().nullslast(), models.Patient.id),
+    "visit_count": (models.PatientStats.visit_count.desc(), models.Patient.id),
+    "open_prescriptions": (models.PatientStats.open_prescriptions.desc(), models.Patient.id),
+}
+
+
 @router.get(
     "/",
-    response_model=List[schemas.Patient],
+    response_model=List[schemas.PatientWithStats],
     dependencies=[Depends(deps.require_role([models.UserRole.DOCTOR, models.UserRole.NURSE]))]
 )
 async def read_all_patients(
@@ -65,35 +165,199 @@ async def read_all_patients(
     current_user: models.User = Depends(deps.get_current_user),
     search: Optional[str] = None,
     appointment_date: Optional[date] = None,
+    sort: Optional[str] = Query(None, pattern="^(name|last_visit|visit_count|open_prescriptions)$"),
+    has_open_prescriptions: Optional[bool] = None,
+    visited_since: Optional[date] = None,
     skip: int = 0,
     limit: int = 100,
 ):
     """
     Get a list of patients with filters, restricted to the user's own hospital.
+    Each patient carries its `stats` (last visit, visit count, open
+    prescriptions), which can also be sorted and filtered on.
     """
     # CRITICAL SECURITY FILTER
     query = select(models.Patient).filter(
         models.Patient.hospital_id == current_user.hospital_id
     )
 
-    if search:
-        search_term = f"%{search}%"
+    uses_stats = sort not in (None, "name") or has_open_prescriptions is not None or visited_since
+    if uses_stats:
+        # Every patient has a stats row, so an inner join lets Postgres start
+        # from the patient_stats indexes
+        query = query.join(models.Patient.stats).filter(
+            models.PatientStats.hospital_id == current_user.hospital_id
+        )
+    else:
+        query = query.outerjoin(models.Patient.stats)
+    query = query.options(contains_eager(models.Patient.stats))
+
+    if has_open_prescriptions is not None:
         query = query.filter(
-            or_(
-                models.Patient.full_name.ilike(search_term),
-                models.Patient.phone_number.ilike(search_term),
-            )
+            models.PatientStats.open_prescriptions > 0 if has_open_prescriptions
+            else models.PatientStats.open_prescriptions == 0
         )
+    if visited_since:
+        query = query.filter(models.PatientStats.last_visit_at >= visited_since)
 
     if appointment_date:
-        query = query.join(models.Patient.appointments).filter(
-            func.date(models.Appointment.appointment_time) == appointment_date
-        ).distinct()
+        # EXISTS rather than JOIN + DISTINCT, which can't order by similarity
+        query = query.filter(
+            models.Patient.appointments.any(
+                func.date(models.Appointment.appointment_time) == appointment_date
+            )
+        )
+
+    if sort:
+        query = query.order_by(*PATIENT_SORTS[sort])
+    if search and search.strip():
+        # Ranked best match first (after `sort`, if given), using the trigram indexes
+        query = crud.patient.apply_search(query, search)
+    elif not sort:
+        query = query.order_by(models.Patient.full_name)
+
+    result = await db.execute(query.offset(skip).limit(limit))
+    return result.scalars().all()
+
+
+@router.get(
+    "/lookup",
+    response_model=List[schemas.PatientLookup],
+    dependencies=[Depends(deps.require_role([models.UserRole.DOCTOR, models.UserRole.NURSE]))]
+)
+async def lookup_patients(
+    q: str,
+    db: AsyncSession = Depends(deps.get_db),
+    current_user: models.User = Depends(deps.get_current_user),
+    limit: int = Query(10, ge=1, le=50),
+):
+    """
+    Patient picker typeahead: name or phone prefix (typo-tolerant), served
+    from the in-memory patient index.
+    """
+    if not current_user.hospital_id:
+        raise HTTPException(status_code=403, detail="User is not associated with a hospital.")
+    return await patient_index.lookup(db, hospital_id=current_user.hospital_id, q=q, limit=limit)
+
+
+async def _scan_duplicates(hospital_id: int):
+    # Runs after the response is sent, so it needs its own session
+    async with AsyncSessionLocal() as db:
+        await crud.patient_duplicate.scan(db, hospital_id=hospital_id)
+        await db.commit()
+
+
+@router.post(
+    "/duplicates/scan",
+    response_model=schemas.Msg,
+    status_code=status.HTTP_202_ACCEPTED,
+    dependencies=[Depends(deps.require_role([models.UserRole.ADMIN]))]
+)
+async def scan_duplicate_patients(
+    background_tasks: BackgroundTasks,
+    current_user: models.User = Depends(deps.get_current_user),
+):
+    """
+    (Admin) Look for likely duplicate patients in the hospital in the
+    background. Results appear in `GET /duplicates`.
+    """
+    if not current_user.hospital_id:
+        raise HTTPException(status_code=403, detail="User is not associated with a hospital.")
+    background_tasks.add_task(_scan_duplicates, current_user.hospital_id)
+    return schemas.Msg(msg="Duplicate scan started.")
+
+
+@router.get(
+    "/duplicates",
+    response_model=List[schemas.PatientDuplicate],
+    dependencies=[Depends(deps.require_role([models.UserRole.ADMIN, models.UserRole.NURSE]))]
+)
+async def read_duplicate_patients(
+    db: AsyncSession = Depends(deps.get_db),
+    current_user: models.User = Depends(deps.get_current_user),
+    skip: int = 0,
+    limit: int = Query(100, le=500),
+):
+    """
+    Pending possible-duplicate pairs in the user's hospital, most likely first.
+    """
+    return await crud.patient_duplicate.get_pending(
+        db, hospital_id=current_user.hospital_id, skip=skip, limit=limit
+    )
+
+
+@router.post(
+    "/duplicates/{id}/dismiss",
+    response_model=schemas.Msg,
+    dependencies=[Depends(deps.require_role([models.UserRole.ADMIN, models.UserRole.NURSE]))]
+)
+async def dismiss_duplicate_patients(
+    id: int,
+    db: AsyncSession = Depends(deps.get_db),
+    current_user: models.User = Depends(deps.get_current_user),
+):
+    """ Mark a pair as not the same person; later scans leave it dismissed. """
+    pair = await crud.patient_duplicate.get(db, id=id)
+    if not pair or pair.hospital_id != current_user.hospital_id:
+        raise HTTPException(status_code=404, detail="Duplicate pair not found")
+    pair.status = models.DuplicateStatus.DISMISSED
+    await db.commit()
+    return schemas.Msg(msg="Duplicate pair dismissed.")
+
 
+@router.post(
+    "/{id}/merge",
+    response_model=schemas.Patient,
+    dependencies=[Depends(deps.require_role([models.UserRole.ADMIN, models.UserRole.NURSE]))]
+)
+async def merge_patients(
+    id: int,
+    merge_in: schemas.PatientMergeRequest,
+    db: AsyncSession = Depends(deps.get_db),
+    current_user: models.User = Depends(deps.get_current_user),
+):
+    """
+    Merge patient `duplicate_id` into this patient: its appointments and
+    prescriptions move over and it is deleted, all in one transaction.
+    """
+    if merge_in.duplicate_id == id:
+        raise HTTPException(status_code=400, detail="A patient cannot be merged into itself.")
+
+    # Lock both, in id order, so concurrent merges of the same patients queue up
     result = await db.execute(
-        query.order_by(models.Patient.full_name).offset(skip).limit(limit)
+        select(models.Patient)
+        .filter(
+            models.Patient.id.in_([id, merge_in.duplicate_id]),
+            models.Patient.hospital_id == current_user.hospital_id,
+        )
+        .order_by(models.Patient.id)
+        .with_for_update()
     )
-    return result.scalars().all()
+    patients = {p.id: p for p in result.scalars().all()}
+    if len(patients) != 2:
+        raise HTTPException(status_code=404, detail="Patient not found")
+    survivor, duplicate = patients[id], patients[merge_in.duplicate_id]
+
+    user_id, hospital_id = current_user.id, current_user.hospital_id
+    duplicate_details = {
+        "full_name": duplicate.full_name,
+        "phone_number": duplicate.phone_number,
+    }
+    moved = await crud.patient.merge(db, survivor=survivor, duplicate=duplicate)
+
+    # The audit entry commits together with the merge
+    log_entry = schemas.AuditLogCreate(
+        user_id=user_id,
+        action="PATIENT_MERGED",
+        entity="Patient",
+        entity_id=id,
+        details={"duplicate_id": merge_in.duplicate_id, **duplicate_details, **moved},
+    )
+    audit_writer.record_sync(db, log_entry)
+    await db.commit()
+    patient_index.invalidate(hospital_id)
+
+    return await crud.patient.get(db, id=id)
 
 
 @router.get(
@@ -107,18 +371,15 @@ async def search_patients_by_phone(
 ):
     """
     Searches patients by an exact phone number ONLY within the user's hospital.
+    Formatting and country code don't matter: "+91 98765 43210" finds "9876543210".
     """
     if not current_user.hospital_id:
         raise HTTPException(status_code=403, detail="User is not associated with a hospital.")
 
-    query = select(models.Patient).filter(
-        models.Patient.phone_number == phone_number,
-        models.Patient.hospital_id == current_user.hospital_id
+    patient = await crud.patient.get_by_phone(
+        db, phone_number=phone_number, hospital_id=current_user.hospital_id
     )
-    
-    result = await db.execute(query)
-    patients = result.scalars().all() 
-    return patients
+    return [patient] if patient else []
 
 
 @router.get("/{id}", response_model=schemas.Patient)
@@ -135,6 +396,121 @@ async def read_patient(
         raise HTTPException(status_code=404, detail="Patient not found in this hospital")
     return patient
 
+def _encode_cursor(appointment_time: datetime, appointment_id: int) -> str:
+    raw = f"{appointment_time.isoformat()}|{appointment_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def _decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        appointment_time, appointment_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(appointment_time), int(appointment_id)
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor.")
+
+
+@router.get(
+    "/{id}/timeline",
+    response_model=schemas.AppointmentTimelinePage,
+    dependencies=[Depends(deps.require_role([models.UserRole.DOCTOR, models.UserRole.NURSE]))]
+)
+async def get_patient_timeline(
+    id: int,
+    db: AsyncSession = Depends(deps.get_db),
+    current_user: models.User = Depends(deps.get_current_user),
+    cursor: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+):
+    """
+    A page of the patient's completed visits, newest first, as compact
+    entries (date, doctor, diagnosis summary). Keyset-paginated: pass the
+    returned `next_cursor` to get the next, older page. Expand a single visit
+    with `/{id}/appointment-history/{appointment_id}`.
+    """
+    patient = await db.get(models.Patient, id)
+    if not patient or patient.hospital_id != current_user.hospital_id:
+        raise HTTPException(status_code=404, detail="Patient not found in this hospital.")
+
+    query = (
+        select(
+            models.Appointment.id,
+            models.Appointment.appointment_time,
+            models.Appointment.visit_purpose,
+            models.Appointment.doctor_id,
+            models.User.full_name.label("doctor_name"),
+            models.Visit.diagnosis_summary,
+            models.Prescription.id.isnot(None).label("has_prescription"),
+        )
+        .join(models.User, models.User.id == models.Appointment.doctor_id)
+        .outerjoin(models.Visit, models.Visit.appointment_id == models.Appointment.id)
+        .outerjoin(models.Prescription, models.Prescription.visit_id == models.Visit.id)
+        .filter(
+            models.Appointment.patient_id == id,
+            models.Appointment.status == models.appointment.AppointmentStatus.COMPLETED,
+        )
+        .order_by(models.Appointment.appointment_time.desc(), models.Appointment.id.desc())
+        .limit(limit + 1)
+    )
+    if cursor:
+        before_time, before_id = _decode_cursor(cursor)
+        query = query.filter(
+            tuple_(models.Appointment.appointment_time, models.Appointment.id) < (before_time, before_id)
+        )
+
+    rows = (await db.execute(query)).all()
+    items = [schemas.AppointmentTimelineEntry(**row._mapping) for row in rows[:limit]]
+    next_cursor = None
+    if len(rows) > limit:
+        last = items[-1]
+        next_cursor = _encode_cursor(last.appointment_time, last.id)
+    return schemas.AppointmentTimelinePage(items=items, next_cursor=next_cursor)
+
+
+@router.get(
+    "/{id}/appointment-history/{appointment_id}",
+    response_model=schemas.Appointment,
+    dependencies=[Depends(deps.require_role([models.UserRole.DOCTOR, models.UserRole.NURSE]))]
+)
+async def get_patient_appointment_detail(
+    id: int,
+    appointment_id: int,
+    db: AsyncSession = Depends(deps.get_db),
+    current_user: models.User = Depends(deps.get_current_user)
+):
+    """
+    One completed visit from the patient's timeline, with its doctor, visit
+    notes and prescription fully loaded.
+    """
+    patient = await db.get(models.Patient, id)
+    if not patient or patient.hospital_id != current_user.hospital_id:
+        raise HTTPException(status_code=404, detail="Patient not found in this hospital.")
+
+    result = await db.execute(
+        select(models.Appointment)
+        .filter(
+            models.Appointment.id == appointment_id,
+            models.Appointment.patient_id == id,
+            models.Appointment.status == models.appointment.AppointmentStatus.COMPLETED,
+        )
+        .options(
+            selectinload(models.Appointment.patient),
+            selectinload(models.Appointment.doctor),
+            selectinload(models.Appointment.visit).options(
+                selectinload(models.Visit.prescription).options(
+                    selectinload(models.Prescription.line_items),
+                    selectinload(models.Prescription.patient)
+                ),
+                selectinload(models.Visit.notes)
+                .selectinload(models.ClinicalNote.author_doctor)
+            )
+        )
+    )
+    appointment = result.scalars().first()
+    if not appointment:
+        raise HTTPException(status_code=404, detail="Visit not found for this patient.")
+    return appointment
+
+
 # In app/api/endpoints/patients.py
 
 # In app/api/endpoints/patients.py
@@ -155,6 +531,7 @@ async def get_patient_appointment_history(
     """
     Get a list of all past APPOINTMENTS for a specific patient, including
     all visit and prescription details for a complete history view.
+    Unpaginated; prefer `/{id}/timeline` for patients with many visits.
     """
     # Security check: Ensure the patient belongs to the current user's hospital.
     patient = await db.get(models.Patient, id)
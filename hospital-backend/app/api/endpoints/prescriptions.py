@@ -1,14 +1,19 @@
+from collections import defaultdict
 from typing import List
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from sqlalchemy.orm import selectinload
+from sqlalchemy.orm.exc import StaleDataError
 
+from app import crud
+from app.core.config import settings
 from app.db import models
 from app.db.models.prescription import PrescriptionStatus, DispenseLineStatus
 from app import schemas
 from app.api import deps
-from app.socket_manager import notify_user
+from app.socket_manager import notify_user, notify_pharmacy, event_payload
+from app.crud.crud_stock import InsufficientStockError
 
 router = APIRouter()
 
@@ -41,7 +46,18 @@ async def get_pharmacy_queue(
         )
         .order_by(models.Prescription.id.desc())
     )
-    return result.scalars().all()
+    prescriptions = result.scalars().all()
+
+    # Flag stock for every line in the queue with a single lookup
+    quantities = await crud.stock.get_quantities(
+        db,
+        hospital_id=current_user.hospital_id,
+        medicine_ids=[item.medicine_id for p in prescriptions for item in p.line_items],
+    )
+    for p in prescriptions:
+        for item in p.line_items:
+            item.stock_quantity = quantities.get(item.medicine_id)
+    return prescriptions
 
 
 # --- Pharmacy Stats Endpoint ---
@@ -92,6 +108,149 @@ async def get_pharmacy_stats(
     )
 
 
+@router.post(
+    "/claim",
+    response_model=List[schemas.Prescription],
+    dependencies=[Depends(deps.require_role([models.UserRole.MEDICAL_SHOP]))],
+)
+async def claim_prescriptions(
+    claim_in: schemas.PrescriptionClaimRequest,
+    db: AsyncSession = Depends(deps.get_db),
+    current_user: models.User = Depends(deps.get_current_user),
+):
+    """
+    Claim the next unclaimed prescriptions in this hospital's queue.
+    Claims are leases: they expire after PHARMACY_CLAIM_LEASE_SECONDS and
+    calling this again renews the caller's outstanding claims.
+    """
+    if claim_in.limit < 1 or claim_in.limit > settings.PHARMACY_CLAIM_MAX_BATCH:
+        raise HTTPException(
+            status_code=400,
+            detail=f"limit must be between 1 and {settings.PHARMACY_CLAIM_MAX_BATCH}.",
+        )
+    return await crud.prescription.claim_next(
+        db,
+        hospital_id=current_user.hospital_id,
+        user_id=current_user.id,
+        limit=claim_in.limit,
+        lease_seconds=settings.PHARMACY_CLAIM_LEASE_SECONDS,
+    )
+
+
+@router.put(
+    "/dispense-batch",
+    response_model=List[schemas.BatchDispenseResult],
+    dependencies=[Depends(deps.require_role([models.UserRole.MEDICAL_SHOP]))],
+)
+async def dispense_prescriptions_batch(
+    items: List[schemas.BatchDispenseItem],
+    db: AsyncSession = Depends(deps.get_db),
+    current_user: models.User = Depends(deps.get_current_user),
+):
+    """
+    Dispense many prescriptions in one transaction with set-based statements
+    (see crud.prescription.dispense_many). Every item must carry the `version`
+    the client last loaded. A conflict, stock shortfall or missing
+    prescription is reported in its result entry without undoing the others.
+    Doctors get one event each.
+    """
+    if len(items) > settings.PHARMACY_DISPENSE_BATCH_MAX:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {settings.PHARMACY_DISPENSE_BATCH_MAX} prescriptions per batch.",
+        )
+    if len({item.prescription_id for item in items}) != len(items):
+        raise HTTPException(status_code=400, detail="Each prescription may appear only once per batch.")
+
+    now = datetime.now(timezone.utc)
+    claimed_elsewhere = set((await db.execute(
+        select(models.Prescription.id).filter(
+            models.Prescription.id.in_([item.prescription_id for item in items]),
+            models.Prescription.hospital_id == current_user.hospital_id,
+            models.Prescription.claimed_by_id.isnot(None),
+            models.Prescription.claimed_by_id != current_user.id,
+            models.Prescription.claim_expires_at > now,
+        )
+    )).scalars().all())
+
+    hospital_id = current_user.hospital_id
+    try:
+        updated, errors, low_stock = await crud.prescription.dispense_many(
+            db,
+            hospital_id=hospital_id,
+            items=[item for item in items if item.prescription_id not in claimed_elsewhere],
+            user_id=current_user.id,
+        )
+    except StaleDataError:
+        # A set-based UPDATE matched fewer rows than were locked; nothing is applied
+        await db.rollback()
+        raise HTTPException(
+            status_code=409,
+            detail="Prescriptions were updated by someone else. Reload and try again.",
+        )
+    except InsufficientStockError as e:
+        await db.rollback()
+        raise HTTPException(status_code=409, detail=str(e))
+
+    results: List[schemas.BatchDispenseResult] = []
+    updates_by_doctor = defaultdict(list)
+    for item in items:
+        row = updated.get(item.prescription_id)
+        if row is not None:
+            results.append(schemas.BatchDispenseResult(
+                prescription_id=row.id, ok=True, status=row.status, version=row.version
+            ))
+            updates_by_doctor[row.doctor_id].append((row.id, row.status.value))
+            continue
+        error = errors.get(item.prescription_id)
+        if item.prescription_id in claimed_elsewhere:
+            detail = "Prescription is claimed by another pharmacist."
+        elif isinstance(error, StaleDataError):
+            detail = "Prescription was updated by someone else. Reload and try again."
+        elif isinstance(error, InsufficientStockError):
+            detail = str(error)
+        else:
+            detail = "Prescription not found"
+        results.append(schemas.BatchDispenseResult(
+            prescription_id=item.prescription_id, ok=False, error=detail
+        ))
+
+    await db.commit()
+
+    # One query for every dispensed prescription, serialized once for its doctor's event
+    dispensed = {}
+    if updates_by_doctor:
+        dispensed = {
+            p.id: p
+            for p in (await db.execute(
+                select(models.Prescription)
+                .options(
+                    selectinload(models.Prescription.line_items),
+                    selectinload(models.Prescription.patient),
+                )
+                .filter(models.Prescription.id.in_([
+                    pid for doctor_updates in updates_by_doctor.values() for pid, _ in doctor_updates
+                ]))
+            )).scalars().all()
+        }
+    for doctor_id, doctor_updates in updates_by_doctor.items():
+        payloads = [
+            event_payload(
+                "prescription", schemas.Prescription, dispensed[pid],
+                prescription_id=pid, status=status,
+            )
+            for pid, status in doctor_updates
+        ]
+        if len(payloads) == 1:
+            await notify_user(doctor_id, "dispense_update", payloads[0])
+        else:
+            await notify_user(doctor_id, "dispense_update_batch", {"updates": payloads})
+    for alert in low_stock:
+        await notify_pharmacy(hospital_id, "low_stock", alert)
+
+    return results
+
+
 @router.put(
     "/{id}/dispense",
     response_model=schemas.Prescription,
@@ -100,59 +259,79 @@ async def get_pharmacy_stats(
 async def dispense_prescription(
     id: int,
     updates: List[schemas.DispenseUpdate],
+    version: int,
     db: AsyncSession = Depends(deps.get_db),
     # Added current_user to send notifications
     current_user: models.User = Depends(deps.get_current_user), 
 ):
     """
     Pharmacy marks prescription line items as given, substituted, etc.
+    `version` is the prescription version the client last loaded (required);
+    per-line `version`s are checked too when sent. A mismatch returns 409.
     """
-    # --- THE FIX IS HERE ---
-    # We must explicitly load ALL relationships that the response_model needs.
-    query = (
+    head = (await db.execute(
+        select(
+            models.Prescription.claimed_by_id,
+            models.Prescription.claim_expires_at,
+        ).filter(
+            models.Prescription.id == id,
+            models.Prescription.hospital_id == current_user.hospital_id,
+        )
+    )).first()
+
+    if not head:
+        raise HTTPException(status_code=404, detail="Prescription not found")
+    if (
+        head.claimed_by_id not in (None, current_user.id)
+        and head.claim_expires_at
+        and head.claim_expires_at > datetime.now(timezone.utc)
+    ):
+        raise HTTPException(status_code=409, detail="Prescription is claimed by another pharmacist.")
+
+    hospital_id = current_user.hospital_id
+    try:
+        updated, low_stock = await crud.prescription.dispense(
+            db,
+            prescription_id=id,
+            hospital_id=hospital_id,
+            expected_version=version,
+            updates=updates,
+            user_id=current_user.id,
+        )
+    except StaleDataError:
+        await db.rollback()
+        raise HTTPException(
+            status_code=409,
+            detail="Prescription was updated by someone else. Reload and try again.",
+        )
+    except InsufficientStockError as e:
+        await db.rollback()
+        raise HTTPException(status_code=409, detail=str(e))
+    except LookupError:
+        await db.rollback()
+        raise HTTPException(status_code=404, detail="Prescription not found")
+    await db.commit()
+
+    result = await db.execute(
         select(models.Prescription)
         .options(
             selectinload(models.Prescription.line_items),
-            selectinload(models.Prescription.patient) # Eager load the patient
+            selectinload(models.Prescription.patient),
         )
         .filter(models.Prescription.id == id)
     )
-    result = await db.execute(query)
     prescription = result.scalars().first()
-    # -----------------------
-
-    if not prescription:
-        raise HTTPException(status_code=404, detail="Prescription not found")
-
-    line_item_map = {item.id: item for item in prescription.line_items}
-    
-    for update in updates:
-        if update.line_item_id in line_item_map:
-            line_item = line_item_map[update.line_item_id]
-            line_item.status = update.status
-            line_item.substitution_info = update.substitution_info
-    
-    # Logic to determine the overall prescription status
-    all_statuses = {item.status for item in prescription.line_items}
-    if all(s in [models.prescription.DispenseLineStatus.GIVEN, models.prescription.DispenseLineStatus.SUBSTITUTED] for s in all_statuses):
-        prescription.status = models.prescription.PrescriptionStatus.FULLY_DISPENSED
-    elif any(s != models.prescription.DispenseLineStatus.NOT_GIVEN for s in all_statuses):
-        prescription.status = models.prescription.PrescriptionStatus.PARTIALLY_DISPENSED
-    # Optional: logic for 'Not Available' status if all are 'Not Given'
-    
-    await db.commit()
-    await db.refresh(prescription) # Refresh to get latest DB state after commit
-
-    # Ensure relationships are loaded on the refreshed object for the final return
-    # This can sometimes be necessary after a refresh
-    await db.refresh(prescription, attribute_names=['patient', 'line_items'])
-
 
     await notify_user(
-        prescription.doctor_id,
+        updated.doctor_id,
         "dispense_update",
-        {"prescription_id": prescription.id, "status": prescription.status.value},
+        event_payload(
+            "prescription", schemas.Prescription, prescription,
+            prescription_id=updated.id, status=updated.status.value,
+        ),
     )
+    for alert in low_stock:
+        await notify_pharmacy(hospital_id, "low_stock", alert)
 
     return prescription
 
@@ -185,7 +364,7 @@ async def read_prescription(
 # In app/api/endpoints/prescriptions.py
 # Make sure to import these at the top of the file
 import asyncio
-from datetime import date, datetime, timedelta
+from datetime import date, datetime, timedelta, timezone
 from sqlalchemy import func
 
 # ... (keep all your existing endpoints) ...
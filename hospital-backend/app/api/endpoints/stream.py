@@ -0,0 +1,119 @@
+import json
+from typing import List, Optional
+
+from fastapi import APIRouter, Header, HTTPException, Query, Request, status
+from fastapi.responses import StreamingResponse
+
+from app.core.config import settings
+from app.db import models
+from app.event_stream import format_event_id, format_sse, parse_event_id
+from app.metrics import metrics
+from app.socket_manager import (
+    authenticate_token, event_buffer, pharmacy_room, stream_hub, user_room,
+)
+
+router = APIRouter()
+
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "Connection": "keep-alive",
+    "X-Accel-Buffering": "no",  # stop nginx from buffering the stream
+}
+
+
+async def _stream_user(token: Optional[str], authorization: Optional[str], role: models.UserRole) -> models.User:
+    # EventSource can't set headers, so the token may also come as ?token=
+    if not token and authorization and authorization.lower().startswith("bearer "):
+        token = authorization[7:]
+    user = await authenticate_token(token)
+    if user is None:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Could not validate credentials")
+    if user.role != role:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="The user doesn't have the required privileges"
+        )
+    return user
+
+
+def _open_stream(request: Request, rooms: List[str], last_event_id: Optional[str]) -> StreamingResponse:
+    epoch, cursor = parse_event_id(last_event_id)
+    same_epoch = epoch == event_buffer.epoch
+
+    async def events():
+        # Collect the replay and subscribe without awaiting in between, so no
+        # event can slip past both. Done here rather than in the endpoint so
+        # the subscription is always released by the `finally` below.
+        replay, resync = [], []
+        for room in rooms:
+            if room not in cursor:
+                cursor[room] = event_buffer.last_seq(room)
+                continue
+            missed = event_buffer.since(room, cursor[room]) if same_epoch else None
+            if missed is None:
+                resync.append(room)
+                cursor[room] = event_buffer.last_seq(room)
+            else:
+                replay.extend((room, seq, event, payload) for seq, event, payload in missed)
+        subscriber = stream_hub.subscribe(rooms, cursor, settings.SSE_MAX_QUEUED_EVENTS)
+        metrics.inc("sse_connects_total")
+
+        try:
+            yield f"retry: {settings.SSE_RETRY_MS}\n\n"
+            for room in resync:
+                yield format_sse("resync_required", json.dumps({"room": room}), format_event_id(event_buffer.epoch, cursor))
+            for room, seq, event, payload in replay:
+                cursor[room] = seq
+                yield format_sse(event, json.dumps(payload, default=str), format_event_id(event_buffer.epoch, cursor))
+
+            while True:
+                item = await subscriber.get(settings.SSE_HEARTBEAT_SECONDS)
+                if subscriber.overflowed:
+                    metrics.inc("sse_overflows_total")
+                    yield format_sse("resync_required", json.dumps({"reason": "slow_consumer"}))
+                    return
+                if item is None:
+                    if await request.is_disconnected():
+                        return
+                    yield ": keepalive\n\n"
+                    continue
+                room, seq, event, data = item
+                if seq <= cursor.get(room, 0):
+                    continue  # already sent as part of the replay
+                cursor[room] = seq
+                yield format_sse(event, data, format_event_id(event_buffer.epoch, cursor))
+        finally:
+            stream_hub.unsubscribe(subscriber)
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers=SSE_HEADERS)
+
+
+@router.get("/pharmacy")
+async def stream_pharmacy(
+    request: Request,
+    token: Optional[str] = Query(None),
+    authorization: Optional[str] = Header(None),
+    last_event_id: Optional[str] = Header(None),
+):
+    """
+    (Medical Shop) Server-Sent Events carrying the same events as the
+    pharmacy's Socket.IO rooms, for networks that block WebSockets.
+    Reconnects with `Last-Event-ID` are replayed what they missed.
+    """
+    user = await _stream_user(token, authorization, models.UserRole.MEDICAL_SHOP)
+    if not user.hospital_id:
+        raise HTTPException(status_code=403, detail="Requesting user is not associated with a hospital.")
+    rooms = [user_room(user.id), pharmacy_room(user.hospital_id)]
+    return _open_stream(request, rooms, last_event_id)
+
+
+@router.get("/doctor")
+async def stream_doctor(
+    request: Request,
+    token: Optional[str] = Query(None),
+    authorization: Optional[str] = Header(None),
+    last_event_id: Optional[str] = Header(None),
+):
+    """ (Doctor) Server-Sent Events for the doctor's own room, e.g. `dispense_update`. """
+    user = await _stream_user(token, authorization, models.UserRole.DOCTOR)
+    return _open_stream(request, [user_room(user.id)], last_event_id)
@@ -7,6 +7,7 @@ from app import schemas, crud
 from app.api import deps
 from app.db import models
 from app.core.security import get_password_hash
+from app.socket_manager import online_user_ids
 
 router = APIRouter()
 
@@ -90,6 +91,31 @@ async def read_my_staff(
     return result.scalars().all()
 
 
+@router.get("/online", response_model=List[schemas.User])
+async def read_online_users(
+    db: AsyncSession = Depends(deps.get_db),
+    current_user: models.User = Depends(deps.get_current_user),
+    role: Optional[models.UserRole] = None,
+):
+    """
+    Users of the caller's hospital with a live socket connection, e.g.
+    `?role=medical_shop` for the pharmacists who are online now.
+    Sockets on every worker are counted (see socket_manager.online_user_ids).
+    """
+    if not current_user.hospital_id:
+        raise HTTPException(status_code=403, detail="Requesting user is not associated with a hospital.")
+
+    user_ids = await online_user_ids(current_user.hospital_id, role)
+    if not user_ids:
+        return []
+    result = await db.execute(
+        select(models.User)
+        .filter(models.User.id.in_(user_ids), models.User.hospital_id == current_user.hospital_id)
+        .order_by(models.User.full_name)
+    )
+    return result.scalars().all()
+
+
 @router.get("/{id}", response_model=schemas.User)
 async def read_user_by_id(
     id: int, 
@@ -0,0 +1,124 @@
+import time
+from collections import Counter
+from datetime import date, datetime, time as dt_time, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.db import models
+
+
+def week_start(day: date) -> date:
+    return day - timedelta(days=day.weekday())
+
+
+def _local_midnight(day: date) -> datetime:
+    return datetime.combine(day, dt_time.min).astimezone()
+
+
+class AppointmentCalendar:
+    """
+    Slim appointment rows per (doctor, week starting Monday), held in process
+    memory for CALENDAR_CACHE_SECONDS. Weeks missing from the cache are read
+    with one range scan of ix_appointments_doctor_time. Bookings and status
+    changes made by this process drop the affected week at once; changes made
+    by other workers show up when the entry expires.
+    """
+
+    def __init__(self):
+        self._weeks: Dict[Tuple[int, date], Tuple[float, List[dict]]] = {}
+
+    def _get(self, doctor_id: int, week: date) -> Optional[List[dict]]:
+        cached = self._weeks.get((doctor_id, week))
+        if cached is None or time.monotonic() - cached[0] >= settings.CALENDAR_CACHE_SECONDS:
+            return None
+        return cached[1]
+
+    def _put(self, doctor_id: int, week: date, entries: List[dict]):
+        self._weeks.pop((doctor_id, week), None)
+        self._weeks[(doctor_id, week)] = (time.monotonic(), entries)
+        # Dicts keep insertion order, so the first key is the oldest entry
+        while len(self._weeks) > settings.CALENDAR_CACHE_MAX_WEEKS:
+            del self._weeks[next(iter(self._weeks))]
+
+    def invalidate(self, doctor_id: int, appointment_time: datetime) -> None:
+        """ Drop the cached week holding this appointment, after a booking or status change commits. """
+        self._weeks.pop((doctor_id, week_start(appointment_time.astimezone().date())), None)
+
+    async def entries(self, db: AsyncSession, *, doctor_id: int, start: date, end: date) -> List[dict]:
+        """ The doctor's appointments from `start` to `end` (inclusive, local days), by time. """
+        first_week = week_start(start)
+        weeks = [first_week + timedelta(weeks=n) for n in range((week_start(end) - first_week).days // 7 + 1)]
+        by_week = {week: self._get(doctor_id, week) for week in weeks}
+        missing = [week for week, cached in by_week.items() if cached is None]
+        if missing:
+            # One scan covering every missing week (and any cached ones between them)
+            fetched: Dict[date, List[dict]] = {week: [] for week in missing}
+            rows = await db.execute(
+                select(
+                    models.Appointment.id,
+                    models.Appointment.appointment_time,
+                    models.Appointment.status,
+                    models.Appointment.visit_purpose,
+                    models.Appointment.patient_id,
+                    models.Patient.full_name,
+                )
+                .join(models.Patient, models.Patient.id == models.Appointment.patient_id)
+                .filter(
+                    models.Appointment.doctor_id == doctor_id,
+                    models.Appointment.appointment_time >= _local_midnight(missing[0]),
+                    models.Appointment.appointment_time < _local_midnight(missing[-1] + timedelta(days=7)),
+                )
+                .order_by(models.Appointment.appointment_time, models.Appointment.id)
+            )
+            for row in rows:
+                local_time = row.appointment_time.astimezone()
+                week = week_start(local_time.date())
+                if week in fetched:
+                    fetched[week].append({
+                        "id": row.id,
+                        "appointment_time": local_time,
+                        "status": row.status.value,
+                        "visit_purpose": row.visit_purpose,
+                        "patient_id": row.patient_id,
+                        "patient_name": row.full_name,
+                    })
+            for week, week_entries in fetched.items():
+                self._put(doctor_id, week, week_entries)
+            by_week.update(fetched)
+
+        return [
+            entry
+            for week in weeks
+            for entry in by_week[week]
+            if start <= entry["appointment_time"].date() <= end
+        ]
+
+    @staticmethod
+    def summarize(entries: List[dict], *, start: date, end: date, slot_minutes: int) -> List[dict]:
+        """ Per-day totals, status counts and per-slot counts; days without appointments included. """
+        days = {}
+        for n in range((end - start).days + 1):
+            day = start + timedelta(days=n)
+            days[day] = {"day": day, "total": 0, "by_status": Counter(), "slots": Counter()}
+        for entry in entries:
+            local_time = entry["appointment_time"]
+            day = days[local_time.date()]
+            day["total"] += 1
+            day["by_status"][entry["status"]] += 1
+            minutes = (local_time.hour * 60 + local_time.minute) // slot_minutes * slot_minutes
+            day["slots"][local_time.replace(hour=minutes // 60, minute=minutes % 60, second=0, microsecond=0)] += 1
+        return [
+            {
+                "day": day["day"],
+                "total": day["total"],
+                "by_status": dict(day["by_status"]),
+                "slots": [{"start": slot, "count": count} for slot, count in sorted(day["slots"].items())],
+            }
+            for day in days.values()
+        ]
+
+
+appointment_calendar = AppointmentCalendar()
@@ -0,0 +1,154 @@
+import asyncio
+import logging
+from collections import deque
+from datetime import datetime, timezone
+from typing import Deque, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import crud, schemas
+from app.core.config import settings
+from app.db.session import AsyncSessionLocal
+from app.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class AuditWriter:
+    """
+    Write-behind audit log. `record` queues an entry and returns at once; a
+    background task writes queued entries every AUDIT_FLUSH_INTERVAL_MS (or
+    as soon as AUDIT_BATCH_MAX are waiting) as multi-row INSERTs in its own
+    session. The queue holds at most AUDIT_QUEUE_SIZE entries; beyond that,
+    entries are dropped and counted rather than slowing requests down.
+
+    A batch whose INSERT fails goes back to the front of the queue, as far as
+    there is room, and the flusher retries with exponential backoff up to
+    `max_backoff` seconds. Only entries that do not fit back are dropped.
+
+    Entries that must be durable together with the change they describe use
+    `record_sync`, which adds the row to the caller's transaction instead.
+    """
+
+    max_backoff = 30.0
+    # Retries of a failing write on shutdown before the rest is dropped
+    drain_attempts = 3
+
+    def __init__(self, queue_size: int, batch_max: int, interval_ms: int):
+        self.queue_size = queue_size
+        self.batch_max = max(batch_max, 1)
+        self.interval = interval_ms / 1000
+        self._queue: Deque[dict] = deque()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+
+    @property
+    def depth(self) -> int:
+        return len(self._queue)
+
+    def record(
+        self,
+        *,
+        user_id: Optional[int],
+        action: str,
+        entity: Optional[str] = None,
+        entity_id: Optional[int] = None,
+        details: Optional[dict] = None,
+    ) -> None:
+        """ Queue an entry, timestamped now. Never blocks; drops the entry when the queue is full. """
+        if len(self._queue) >= self.queue_size:
+            metrics.inc("audit_log_dropped_total", reason="queue_full")
+            logger.warning("Audit queue full, dropped %s", action, extra={"entity": entity, "entity_id": entity_id})
+            return
+        self._queue.append({
+            "timestamp": datetime.now(timezone.utc),
+            "user_id": user_id,
+            "action": action,
+            "entity": entity,
+            "entity_id": entity_id,
+            "details": details,
+        })
+        if self._wakeup is not None and len(self._queue) >= self.batch_max:
+            self._wakeup.set()
+
+    def record_sync(self, db: AsyncSession, entry: schemas.AuditLogCreate) -> None:
+        """ Add the entry to `db`'s transaction; it is written (or rolled back) with the caller's commit. """
+        crud.audit_log.add(db, obj_in=entry)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._stopping = False
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    def _backoff(self, failures: int) -> float:
+        return min(self.interval * 2 ** failures, self.max_backoff)
+
+    async def _run(self):
+        failures = 0
+        while not self._stopping:
+            if failures:
+                # Don't let a full batch cut the backoff short
+                await asyncio.sleep(self._backoff(failures))
+            else:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.interval)
+                except asyncio.TimeoutError:
+                    pass
+            self._wakeup.clear()
+            while self._queue:
+                if not await self.flush():
+                    failures += 1
+                    break
+                failures = 0
+                if len(self._queue) < self.batch_max:
+                    break
+
+    async def flush(self) -> int:
+        """
+        Write up to AUDIT_BATCH_MAX queued entries in one INSERT. Returns how
+        many were written; on failure the batch is requeued and this returns 0.
+        """
+        batch = [self._queue.popleft() for _ in range(min(self.batch_max, len(self._queue)))]
+        if not batch:
+            return 0
+        try:
+            async with AsyncSessionLocal() as db:
+                await crud.audit_log.insert_many(db, rows=batch)
+                await db.commit()
+        except Exception:
+            logger.exception("Failed to write %d audit log entries", len(batch))
+            # `record` may have filled the queue while the INSERT was running
+            room = max(self.queue_size - len(self._queue), 0)
+            self._queue.extendleft(reversed(batch[:room]))
+            if len(batch) > room:
+                metrics.inc("audit_log_dropped_total", len(batch) - room, reason="write_error")
+            return 0
+        metrics.inc("audit_log_written_total", len(batch))
+        metrics.inc("audit_log_batches_total")
+        return len(batch)
+
+    async def drain(self):
+        """ Stop the flusher and write everything still queued; called on shutdown. """
+        if self._task is not None:
+            # Let a batch that is being written finish rather than cancelling it
+            self._stopping = True
+            self._wakeup.set()
+            await self._task
+            self._task = None
+        failures = 0
+        while self._queue:
+            if await self.flush():
+                failures = 0
+                continue
+            failures += 1
+            if failures >= self.drain_attempts:
+                metrics.inc("audit_log_dropped_total", len(self._queue), reason="write_error")
+                logger.error("Dropped %d audit log entries on shutdown", len(self._queue))
+                self._queue.clear()
+                break
+            await asyncio.sleep(self._backoff(failures))
+
+audit_writer = AuditWriter(settings.AUDIT_QUEUE_SIZE, settings.AUDIT_BATCH_MAX, settings.AUDIT_FLUSH_INTERVAL_MS)
+metrics.register_gauge("audit_log_queue_depth", lambda: audit_writer.depth)
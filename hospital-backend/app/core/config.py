@@ -1,5 +1,8 @@
 # app/core/config.py (CORRECTED & FINAL)
 
+import os
+import tempfile
+from typing import Optional
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
@@ -13,6 +16,82 @@ class Settings(BaseSettings):
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
 
+    # Country code assumed for phone numbers entered without one
+    PHONE_DEFAULT_COUNTRY_CODE: str = "91"
+
+    # Pharmacy work-claiming
+    PHARMACY_CLAIM_LEASE_SECONDS: int = 300
+    PHARMACY_CLAIM_MAX_BATCH: int = 20
+    PHARMACY_DISPENSE_BATCH_MAX: int = 100
+
+    # Socket.IO cross-worker fan-out: "memory", "postgres" or "redis".
+    # SOCKETIO_MANAGER_URL defaults to DATABASE_URL for the postgres backend.
+    SOCKETIO_MANAGER: str = "memory"
+    SOCKETIO_MANAGER_URL: Optional[str] = None
+    SOCKETIO_CHANNEL: str = "socketio"
+    # With a cross-worker manager, presence is shared through the database;
+    # each worker heartbeats this often and is forgotten after three misses
+    SOCKET_PRESENCE_HEARTBEAT_SECONDS: int = 15
+    # Events kept per room for replay to reconnecting clients
+    SOCKET_REPLAY_BUFFER_SIZE: int = 200
+    # Rooms with no events for this long are dropped from the replay buffer,
+    # as are the least recently used beyond SOCKET_REPLAY_MAX_ROOMS
+    SOCKET_REPLAY_ROOM_IDLE_SECONDS: int = 3600
+    SOCKET_REPLAY_MAX_ROOMS: int = 10000
+    # Events embed the full entity up to this size (0 = no limit)
+    SOCKET_EVENT_MAX_PAYLOAD_BYTES: int = 16384
+    SOCKET_COMPRESSION: bool = False
+    SOCKET_COMPRESSION_THRESHOLD: int = 1024
+    # Events to the same room within this window go out as one `event_batch` (0 = off)
+    SOCKET_EMIT_COALESCE_MS: int = 25
+    SOCKET_EMIT_BATCH_MAX: int = 50
+    # Sockets with this many unsent packets stop receiving room events and are
+    # told to resync; at the disconnect depth they are dropped (0 = no limit)
+    SOCKET_SEND_QUEUE_LIMIT: int = 100
+    SOCKET_SEND_QUEUE_DISCONNECT: int = 1000
+
+    # Server-Sent Events fallback (/api/stream/*)
+    SSE_HEARTBEAT_SECONDS: int = 15
+    SSE_RETRY_MS: int = 3000
+    # Events queued for one connection before it is told to resync and closed
+    SSE_MAX_QUEUED_EVENTS: int = 100
+
+    # Structured logging; records beyond the queue size are dropped, not waited on
+    LOG_LEVEL: str = "INFO"
+    LOG_QUEUE_SIZE: int = 10000
+
+    # Audit log write-behind queue (app/audit.py): entries beyond the queue size
+    # are dropped and counted; the flusher writes up to AUDIT_BATCH_MAX rows per INSERT
+    AUDIT_QUEUE_SIZE: int = 10000
+    AUDIT_BATCH_MAX: int = 500
+    AUDIT_FLUSH_INTERVAL_MS: int = 200
+
+    # Medicine catalog suggest index
+    MEDICINE_INDEX_REFRESH_SECONDS: int = 30
+    # Each refresh re-reads medicines created this long before the newest one it
+    # has seen, so rows from transactions that committed late are not missed
+    MEDICINE_INDEX_REFRESH_OVERLAP_SECONDS: int = 300
+    # Patient picker index (GET /api/patients/lookup)
+    PATIENT_INDEX_REFRESH_SECONDS: int = 30
+    # Same idea for patients (by created_at) and last visits (by patient_stats.updated_at)
+    PATIENT_INDEX_REFRESH_OVERLAP_SECONDS: int = 300
+
+    # Appointment calendar (GET /api/appointments/calendar): longest range per
+    # request, and how long a doctor-week stays cached
+    CALENDAR_MAX_DAYS: int = 42
+    CALENDAR_CACHE_SECONDS: int = 60
+    CALENDAR_CACHE_MAX_WEEKS: int = 5000
+
+    # Bulk patient import (POST /api/patients/import): rows per INSERT/commit,
+    # and where per-import error files are written
+    PATIENT_IMPORT_CHUNK_SIZE: int = 1000
+    PATIENT_IMPORT_ERROR_DIR: str = os.path.join(tempfile.gettempdir(), "patient_imports")
+
+    # Streaming exports (/api/exports/*): rows fetched per server-side cursor round trip
+    EXPORT_YIELD_PER: int = 1000
+    # Key for patient pseudonyms in de-identified exports (defaults to SECRET_KEY)
+    EXPORT_PSEUDONYM_KEY: Optional[str] = None
+
     class Config:
         env_file = ".env"
 
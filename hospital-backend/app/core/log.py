@@ -0,0 +1,72 @@
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+from typing import Optional
+
+from app.core.config import settings
+from app.metrics import metrics
+
+# Attributes every LogRecord has; anything else was passed via `extra=`
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "taskName"}
+
+
+class JsonFormatter(logging.Formatter):
+    """ One JSON object per line, with any `extra=` fields at the top level. """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": self.formatTime(record, "%Y-%m-%dT%H:%M:%S%z"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """ Never blocks the event loop: when the queue is full the record is dropped and counted. """
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            metrics.inc("log_records_dropped_total")
+
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def setup_logging():
+    """
+    Route the `app` loggers through a bounded queue to a background thread
+    that writes JSON lines to stderr, so a slow stdout/stderr never stalls
+    request handling.
+    """
+    global _listener
+    if _listener is not None:
+        return
+    log_queue = queue.Queue(maxsize=settings.LOG_QUEUE_SIZE)
+    stream = logging.StreamHandler(sys.stderr)
+    stream.setFormatter(JsonFormatter())
+    _listener = logging.handlers.QueueListener(log_queue, stream, respect_handler_level=True)
+    _listener.start()
+
+    logger = logging.getLogger("app")
+    logger.handlers = [DroppingQueueHandler(log_queue)]
+    logger.setLevel(settings.LOG_LEVEL)
+    logger.propagate = False
+
+
+def stop_logging():
+    """ Flush queued records and stop the writer thread. """
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
@@ -0,0 +1,33 @@
+import re
+from typing import Optional
+
+from app.core.config import settings
+
+# Shorter digit strings are not treated as phone numbers
+MIN_PHONE_DIGITS = 7
+
+
+def normalize_phone(raw: Optional[str], default_country_code: Optional[str] = None) -> Optional[str]:
+    """
+    E.164 form of a phone number (`+919876543210`), or None if `raw` doesn't
+    look like one. Numbers written without a country code are assumed to be
+    in PHONE_DEFAULT_COUNTRY_CODE; a leading trunk `0` is dropped.
+
+        "+91 98765 43210", "098765-43210", "9876543210" -> "+919876543210"
+    """
+    if not raw:
+        return None
+    country_code = default_country_code or settings.PHONE_DEFAULT_COUNTRY_CODE
+    raw = raw.strip()
+    digits = re.sub(r"\D", "", raw)
+    if raw.startswith("+"):
+        pass
+    elif digits.startswith("00"):
+        digits = digits[2:]
+    elif len(digits) == 11 and digits.startswith("0"):
+        digits = country_code + digits[1:]
+    elif len(digits) == 10:
+        digits = country_code + digits
+    if len(digits) < MIN_PHONE_DIGITS or len(digits) > 15:
+        return None
+    return f"+{digits}"
@@ -3,4 +3,9 @@ from .crud_patient import patient
 from .crud_appointment import appointment
 from .crud_prescription import prescription
 from .crud_hospital import hospital # <-- ADD
-from .crud_audit import audit_log # <-- ADD
\ No newline at end of file
+from .crud_audit import audit_log # <-- ADD
+from .crud_medicine import medicine
+from .crud_stock import stock
+from .crud_patient_stats import patient_stats
+from .crud_patient_duplicate import patient_duplicate
+from .crud_analytics import analytics
@@ -0,0 +1,238 @@
+from collections import Counter
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, delete, func, literal, Date, DateTime, cast
+from sqlalchemy.dialects.postgresql import insert
+
+from app.crud.crud_medicine import normalize_medicine_name
+from app.db.models import (
+    Appointment, DoctorDailyStats, MedicineDailyStats, Prescription, PrescriptionLineItem, User, Visit,
+)
+from app.db.models.appointment import AppointmentStatus
+from app.db.models.prescription import DispenseLineStatus
+
+# Appointment statuses with their own counter in doctor_daily_stats
+STATUS_COUNTERS = {
+    AppointmentStatus.COMPLETED: "completed",
+    AppointmentStatus.NO_SHOW: "no_shows",
+    AppointmentStatus.CANCELLED: "cancelled",
+}
+# Line statuses counted as dispensed / substituted in medicine_daily_stats
+DISPENSED_LINE_STATUSES = [DispenseLineStatus.GIVEN, DispenseLineStatus.PARTIALLY_GIVEN]
+SUBSTITUTED_LINE_STATUSES = [DispenseLineStatus.SUBSTITUTED]
+
+# SQL version of crud_medicine.normalize_medicine_name
+def _normalized_name(column):
+    return func.lower(func.regexp_replace(func.btrim(column), r"\s+", " ", "g"))
+
+
+def _day(appointment_time):
+    # Dates are taken by Postgres (session time zone), the same way rebuild() does
+    return cast(literal(appointment_time, DateTime(timezone=True)), Date) if isinstance(appointment_time, datetime) else appointment_time
+
+
+def line_counts(status: Optional[DispenseLineStatus]) -> Tuple[int, int]:
+    """ (dispensed, substituted) contribution of one line item in this status. """
+    return int(status in DISPENSED_LINE_STATUSES), int(status in SUBSTITUTED_LINE_STATUSES)
+
+
+class CRUDAnalytics:
+    """
+    Daily rollups behind GET /api/hospitals/{id}/analytics. Every `apply_*`
+    adds deltas with upserts and does not commit, so the rollup changes
+    in the same transaction as the event it counts.
+    """
+
+    async def apply_doctor_day(
+        self,
+        db: AsyncSession,
+        *,
+        doctor_id: int,
+        appointment_time: datetime,
+        **deltas: int,
+    ) -> None:
+        """ Add `deltas` (appointments, completed, ...) to the doctor's row for that day. """
+        deltas = {k: v for k, v in deltas.items() if v}
+        if not deltas or not doctor_id:
+            return
+        model = DoctorDailyStats
+        stmt = insert(model).from_select(
+            ["hospital_id", "day", "doctor_id", *deltas],
+            select(
+                User.hospital_id, _day(appointment_time), literal(doctor_id),
+                *(literal(max(v, 0)) for v in deltas.values()),
+            ).where(User.id == doctor_id, User.hospital_id.isnot(None)),
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[model.hospital_id, model.day, model.doctor_id],
+            set_={
+                **{k: func.greatest(getattr(model, k) + v, 0) for k, v in deltas.items()},
+                "updated_at": func.now(),
+            },
+        )
+        await db.execute(stmt)
+
+    async def apply_status_change(
+        self,
+        db: AsyncSession,
+        *,
+        doctor_id: int,
+        appointment_time: datetime,
+        old_status: AppointmentStatus,
+        new_status: AppointmentStatus,
+    ) -> None:
+        if old_status == new_status:
+            return
+        deltas = Counter()
+        if old_status in STATUS_COUNTERS:
+            deltas[STATUS_COUNTERS[old_status]] -= 1
+        if new_status in STATUS_COUNTERS:
+            deltas[STATUS_COUNTERS[new_status]] += 1
+        await self.apply_doctor_day(db, doctor_id=doctor_id, appointment_time=appointment_time, **deltas)
+
+    async def apply_medicines(
+        self,
+        db: AsyncSession,
+        *,
+        hospital_id: int,
+        appointment_time: datetime,
+        deltas: Dict[str, Tuple[int, int, int]],
+    ) -> None:
+        """
+        Add (prescribed, dispensed, substituted) deltas per medicine name to
+        the hospital's rows for the consultation day.
+        """
+        model = MedicineDailyStats
+        for name, (prescribed, dispensed, substituted) in deltas.items():
+            if not (prescribed or dispensed or substituted):
+                continue
+            stmt = insert(model).values(
+                hospital_id=hospital_id,
+                day=_day(appointment_time),
+                medicine_name=normalize_medicine_name(name),
+                prescribed=max(prescribed, 0),
+                dispensed=max(dispensed, 0),
+                substituted=max(substituted, 0),
+            )
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[model.hospital_id, model.day, model.medicine_name],
+                set_={
+                    "prescribed": func.greatest(model.prescribed + prescribed, 0),
+                    "dispensed": func.greatest(model.dispensed + dispensed, 0),
+                    "substituted": func.greatest(model.substituted + substituted, 0),
+                    "updated_at": func.now(),
+                },
+            )
+            await db.execute(stmt)
+
+    async def rebuild(self, db: AsyncSession, *, hospital_id: int, start: date, end: date) -> Tuple[int, int]:
+        """
+        Recompute both rollups of one hospital for `start`..`end` (inclusive)
+        from appointments and prescriptions. Returns the (doctor, medicine)
+        row counts written. Does not commit.
+
+        A delta upsert committed between the DELETE and the INSERT recreates
+        its row; the INSERT overwrites it with the recomputed counts instead
+        of failing on the unique key.
+        """
+        since, until = start, end + timedelta(days=1)
+        day = func.date(Appointment.appointment_time)
+        await db.execute(delete(DoctorDailyStats).where(
+            DoctorDailyStats.hospital_id == hospital_id, DoctorDailyStats.day.between(start, end)
+        ))
+        await db.execute(delete(MedicineDailyStats).where(
+            MedicineDailyStats.hospital_id == hospital_id, MedicineDailyStats.day.between(start, end)
+        ))
+
+        doctor_rows = (
+            select(
+                User.hospital_id,
+                day,
+                Appointment.doctor_id,
+                func.count(),
+                *(func.count().filter(Appointment.status == status) for status in STATUS_COUNTERS),
+                func.count(Prescription.id),
+            )
+            .select_from(Appointment)
+            .join(User, User.id == Appointment.doctor_id)
+            .outerjoin(Visit, Visit.appointment_id == Appointment.id)
+            .outerjoin(Prescription, Prescription.visit_id == Visit.id)
+            .where(
+                User.hospital_id == hospital_id,
+                Appointment.appointment_time >= since,
+                Appointment.appointment_time < until,
+            )
+            .group_by(User.hospital_id, day, Appointment.doctor_id)
+        )
+        doctor_columns = ["appointments", *STATUS_COUNTERS.values(), "prescriptions"]
+        stmt = insert(DoctorDailyStats).from_select(["hospital_id", "day", "doctor_id", *doctor_columns], doctor_rows)
+        doctors = await db.execute(stmt.on_conflict_do_update(
+            index_elements=[DoctorDailyStats.hospital_id, DoctorDailyStats.day, DoctorDailyStats.doctor_id],
+            set_={**{k: stmt.excluded[k] for k in doctor_columns}, "updated_at": func.now()},
+        ))
+
+        line = PrescriptionLineItem
+        name = _normalized_name(line.medicine_name)
+        medicine_rows = (
+            select(
+                Prescription.hospital_id,
+                day,
+                name,
+                func.count(),
+                func.count().filter(line.status.in_(DISPENSED_LINE_STATUSES)),
+                func.count().filter(line.status.in_(SUBSTITUTED_LINE_STATUSES)),
+            )
+            .select_from(Prescription)
+            .join(line, line.prescription_id == Prescription.id)
+            .join(Visit, Visit.id == Prescription.visit_id)
+            .join(Appointment, Appointment.id == Visit.appointment_id)
+            .where(
+                Prescription.hospital_id == hospital_id,
+                Appointment.appointment_time >= since,
+                Appointment.appointment_time < until,
+            )
+            .group_by(Prescription.hospital_id, day, name)
+        )
+        medicine_columns = ["prescribed", "dispensed", "substituted"]
+        stmt = insert(MedicineDailyStats).from_select(
+            ["hospital_id", "day", "medicine_name", *medicine_columns], medicine_rows
+        )
+        medicines = await db.execute(stmt.on_conflict_do_update(
+            index_elements=[MedicineDailyStats.hospital_id, MedicineDailyStats.day, MedicineDailyStats.medicine_name],
+            set_={**{k: stmt.excluded[k] for k in medicine_columns}, "updated_at": func.now()},
+        ))
+        return doctors.rowcount, medicines.rowcount
+
+    async def get_doctor_days(
+        self, db: AsyncSession, *, hospital_id: int, start: date, end: date, doctor_id: Optional[int] = None
+    ) -> List[DoctorDailyStats]:
+        query = select(DoctorDailyStats).where(
+            DoctorDailyStats.hospital_id == hospital_id, DoctorDailyStats.day.between(start, end)
+        )
+        if doctor_id:
+            query = query.where(DoctorDailyStats.doctor_id == doctor_id)
+        result = await db.execute(query.order_by(DoctorDailyStats.day, DoctorDailyStats.doctor_id))
+        return result.scalars().all()
+
+    async def get_medicine_totals(
+        self, db: AsyncSession, *, hospital_id: int, start: date, end: date, limit: int = 50
+    ):
+        model = MedicineDailyStats
+        prescribed = func.sum(model.prescribed)
+        result = await db.execute(
+            select(
+                model.medicine_name,
+                prescribed.label("prescribed"),
+                func.sum(model.dispensed).label("dispensed"),
+                func.sum(model.substituted).label("substituted"),
+            )
+            .where(model.hospital_id == hospital_id, model.day.between(start, end))
+            .group_by(model.medicine_name)
+            .order_by(prescribed.desc(), model.medicine_name)
+            .limit(limit)
+        )
+        return result.all()
+
+
+analytics = CRUDAnalytics()
@@ -1,8 +1,22 @@
+from typing import List
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
 from app.crud.base import CRUDBase
 from app.db.models.audit_log import AuditLog
 from app.schemas.audit import AuditLogCreate
 
 class CRUDAuditLog(CRUDBase[AuditLog, AuditLogCreate, None]): # No updates for audit logs
-    pass
 
-audit_log = CRUDAuditLog(AuditLog)
\ No newline at end of file
+    def add(self, db: AsyncSession, *, obj_in: AuditLogCreate) -> AuditLog:
+        """ Add an entry to the caller's transaction; it is written when the caller commits. """
+        db_obj = AuditLog(**obj_in.dict())
+        db.add(db_obj)
+        return db_obj
+
+    async def insert_many(self, db: AsyncSession, *, rows: List[dict]) -> None:
+        """ Write entries as one multi-row INSERT. Does not commit. """
+        if rows:
+            await db.execute(insert(AuditLog).values(rows))
+
+audit_log = CRUDAuditLog(AuditLog)
@@ -0,0 +1,67 @@
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+
+from app.crud.base import CRUDBase
+from app.db.models import Medicine
+from app.schemas.medicine import MedicineCreate
+
+
+def normalize_medicine_name(name: str) -> str:
+    """ Lower-case and collapse whitespace. Mirrored in SQL by the catalog seed migration. """
+    return " ".join(name.lower().split())
+
+
+class CRUDMedicine(CRUDBase[Medicine, MedicineCreate, None]):
+    async def get_multi_by_hospital(
+        self, db: AsyncSession, *, hospital_id: int, created_since: Optional[datetime] = None
+    ) -> List[Medicine]:
+        query = select(self.model).filter(self.model.hospital_id == hospital_id)
+        if created_since is not None:
+            query = query.filter(self.model.created_at >= created_since)
+        result = await db.execute(query.order_by(self.model.id))
+        return result.scalars().all()
+
+    async def resolve_names(
+        self, db: AsyncSession, *, hospital_id: int, names: Iterable[str]
+    ) -> Tuple[Dict[str, int], List[Medicine]]:
+        """
+        Map medicine names to catalog ids, creating missing catalog entries.
+
+        Returns `{normalized_name: medicine_id}` and the rows that were newly
+        inserted, so the caller can add them to the suggest index once its
+        transaction commits. Does not commit.
+        """
+        wanted = {}
+        for name in names:
+            normalized = normalize_medicine_name(name)
+            if normalized:
+                wanted.setdefault(normalized, name.strip())
+        if not wanted:
+            return {}, []
+
+        created = (await db.execute(
+            insert(self.model)
+            .values([
+                {"hospital_id": hospital_id, "name": name, "name_normalized": normalized}
+                for normalized, name in wanted.items()
+            ])
+            .on_conflict_do_nothing(index_elements=["hospital_id", "name_normalized"])
+            .returning(self.model)
+        )).scalars().all()
+
+        ids = {m.name_normalized: m.id for m in created}
+        missing = [n for n in wanted if n not in ids]
+        if missing:
+            existing = await db.execute(
+                select(self.model.name_normalized, self.model.id).filter(
+                    self.model.hospital_id == hospital_id,
+                    self.model.name_normalized.in_(missing),
+                )
+            )
+            ids.update({row.name_normalized: row.id for row in existing})
+        return ids, created
+
+medicine = CRUDMedicine(Medicine)
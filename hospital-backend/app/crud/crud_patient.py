@@ -1,16 +1,91 @@
-from typing import List
+import re
+from typing import Dict, List, Optional
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, or_, func, literal_column, update, delete
+from sqlalchemy.sql import Select
 
+from app.core.phone import normalize_phone
 from app.crud.base import CRUDBase
-from app.db.models import Patient
+from app.crud.crud_patient_stats import patient_stats
+from app.db.models import Appointment, Patient, PatientStats, Prescription
 from app.schemas.patient import PatientCreate, PatientUpdate
 
+# The phone number with every non-digit stripped. Written out as literal SQL
+# (not bound parameters) so Postgres matches it to the expression index
+# ix_patients_hospital_phone_digits_trgm.
+PHONE_DIGITS = literal_column("regexp_replace(patients.phone_number, '\\D', '', 'g')")
+
+
+def _like_escape(term: str) -> str:
+    return term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
 class CRUDPatient(CRUDBase[Patient, PatientCreate, PatientUpdate]):
-    async def get_by_phone(self, db: AsyncSession, *, phone_number: str) -> List[Patient]:
-        result = await db.execute(
-            select(self.model).filter(self.model.phone_number == phone_number)
+    def apply_search(self, query: Select, term: str) -> Select:
+        """
+        Filter `query` to patients matching `term` and order them best match
+        first. Terms that are all digits (ignoring spaces, dashes and `+`) match
+        anywhere in the phone number; anything else matches the name as a
+        substring or, to tolerate typos, by trigram similarity. Both use the
+        trigram GIN indexes on patients.
+        """
+        term = term.strip()
+        digits = re.sub(r"\D", "", term)
+        if digits and not re.sub(r"[\d\s()+-]", "", term):
+            return query.filter(PHONE_DIGITS.like(f"%{_like_escape(digits)}%")).order_by(
+                PHONE_DIGITS.like(f"{_like_escape(digits)}%").desc(),
+                self.model.full_name,
+            )
+        return query.filter(
+            or_(
+                self.model.full_name.ilike(f"%{_like_escape(term)}%"),
+                self.model.full_name.op("%")(term),
+            )
+        ).order_by(func.similarity(self.model.full_name, term).desc(), self.model.full_name)
+
+    async def get_by_phone(self, db: AsyncSession, *, phone_number: str, hospital_id: int) -> Optional[Patient]:
+        """ The hospital's patient with this number, however it is formatted. """
+        normalized = normalize_phone(phone_number)
+        if normalized is None:
+            return None
+        return await db.scalar(
+            select(self.model).filter(
+                self.model.hospital_id == hospital_id,
+                self.model.phone_normalized == normalized,
+            )
         )
-        return result.scalars().all()
+
+    async def merge(self, db: AsyncSession, *, survivor: Patient, duplicate: Patient) -> Dict[str, int]:
+        """
+        Fold `duplicate` into `survivor`: reassign all of its appointments and
+        prescriptions with one UPDATE each, add its stats to the survivor's,
+        fill in demographics the survivor lacks, and delete it. Both patients
+        should be locked by the caller. Does not commit, so the whole merge
+        lands in the caller's transaction.
+        """
+        moved_appointments = (await db.execute(
+            update(Appointment).where(Appointment.patient_id == duplicate.id).values(patient_id=survivor.id)
+        )).rowcount
+        moved_prescriptions = (await db.execute(
+            update(Prescription).where(Prescription.patient_id == duplicate.id).values(patient_id=survivor.id)
+        )).rowcount
+
+        stats = await db.scalar(select(PatientStats).filter(PatientStats.patient_id == duplicate.id))
+        await patient_stats.apply(
+            db,
+            patient_id=survivor.id,
+            hospital_id=survivor.hospital_id,
+            visits=stats.visit_count if stats else 0,
+            last_visit_at=stats.last_visit_at if stats else None,
+            open_prescriptions=stats.open_prescriptions if stats else 0,
+        )
+
+        if survivor.date_of_birth is None:
+            survivor.date_of_birth = duplicate.date_of_birth
+        if survivor.sex is None:
+            survivor.sex = duplicate.sex
+        # patient_stats and patient_duplicates rows go with it (ON DELETE CASCADE)
+        await db.execute(delete(Patient).where(Patient.id == duplicate.id))
+        return {"appointments": moved_appointments, "prescriptions": moved_prescriptions}
 
 patient = CRUDPatient(Patient)
\ No newline at end of file
@@ -0,0 +1,100 @@
+from typing import List
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, text
+from sqlalchemy.orm import selectinload
+
+from app.crud.base import CRUDBase
+from app.db.models import PatientDuplicate, DuplicateStatus
+
+# Candidate pairs are only compared within a block: patients sharing the last
+# ten phone digits, or sharing the soundex of their first and last name. Blocks
+# larger than :max_block (a very common name) are skipped rather than compared
+# pairwise. Pairs are scored in the same statement:
+#   0.6 * trigram similarity of the names
+#   + 0.3 if the phone digits match + 0.1 if the dates of birth match,
+#   halved when both dates of birth are known and differ.
+# Needs pg_trgm and fuzzystrmatch.
+SCAN_SQL = text(
+    """
+    WITH p AS (
+        SELECT id, full_name, date_of_birth,
+               right(regexp_replace(phone_number, '\\D', '', 'g'), 10) AS phone_key,
+               soundex(split_part(lower(trim(full_name)), ' ', 1))
+                   || soundex(regexp_replace(lower(trim(full_name)), '^.*\\s', '')) AS name_key
+        FROM patients
+        WHERE hospital_id = :hospital_id
+    ),
+    keys AS (
+        SELECT id, 'phone' AS kind, phone_key AS key FROM p WHERE length(phone_key) >= 7
+        UNION ALL
+        SELECT id, 'name', name_key FROM p WHERE name_key <> ''
+    ),
+    blocks AS (
+        SELECT id, kind, key, count(*) OVER (PARTITION BY kind, key) AS size FROM keys
+    ),
+    pairs AS (
+        SELECT DISTINCT a.id AS a_id, b.id AS b_id
+        FROM blocks AS a
+        JOIN blocks AS b ON b.kind = a.kind AND b.key = a.key AND b.id > a.id
+        WHERE a.size <= :max_block
+    ),
+    scored AS (
+        SELECT pairs.a_id, pairs.b_id,
+               pa.phone_key = pb.phone_key AS same_phone,
+               (0.6 * similarity(pa.full_name, pb.full_name)
+                + CASE WHEN pa.phone_key = pb.phone_key THEN 0.3 ELSE 0 END
+                + CASE WHEN pa.date_of_birth = pb.date_of_birth THEN 0.1 ELSE 0 END)
+               * CASE WHEN pa.date_of_birth <> pb.date_of_birth THEN 0.5 ELSE 1 END AS score
+        FROM pairs
+        JOIN p AS pa ON pa.id = pairs.a_id
+        JOIN p AS pb ON pb.id = pairs.b_id
+    )
+    INSERT INTO patient_duplicates (hospital_id, patient_a_id, patient_b_id, score, same_phone, status)
+    SELECT :hospital_id, a_id, b_id, score, same_phone, 'PENDING'
+    FROM scored
+    WHERE score >= :min_score
+    ON CONFLICT (patient_a_id, patient_b_id) DO UPDATE
+    SET score = EXCLUDED.score, same_phone = EXCLUDED.same_phone, updated_at = now()
+    WHERE patient_duplicates.status = 'PENDING'
+    """
+)
+
+# Pending pairs the scan above no longer reports (now() is the transaction start)
+PRUNE_SQL = text(
+    """
+    DELETE FROM patient_duplicates
+    WHERE hospital_id = :hospital_id AND status = 'PENDING' AND updated_at < now()
+    """
+)
+
+
+class CRUDPatientDuplicate(CRUDBase[PatientDuplicate, None, None]):
+    async def scan(
+        self, db: AsyncSession, *, hospital_id: int, min_score: float = 0.55, max_block: int = 50
+    ) -> int:
+        """
+        Find a hospital's likely duplicate patients in one set-based pass and
+        store them as pending pairs; pairs already dismissed stay dismissed.
+        Returns the number of pairs found. Does not commit.
+        """
+        result = await db.execute(
+            SCAN_SQL, {"hospital_id": hospital_id, "min_score": min_score, "max_block": max_block}
+        )
+        await db.execute(PRUNE_SQL, {"hospital_id": hospital_id})
+        return result.rowcount
+
+    async def get_pending(
+        self, db: AsyncSession, *, hospital_id: int, skip: int = 0, limit: int = 100
+    ) -> List[PatientDuplicate]:
+        result = await db.execute(
+            select(self.model)
+            .options(selectinload(self.model.patient_a), selectinload(self.model.patient_b))
+            .filter(self.model.hospital_id == hospital_id, self.model.status == DuplicateStatus.PENDING)
+            .order_by(self.model.score.desc(), self.model.id)
+            .offset(skip)
+            .limit(limit)
+        )
+        return result.scalars().all()
+
+
+patient_duplicate = CRUDPatientDuplicate(PatientDuplicate)
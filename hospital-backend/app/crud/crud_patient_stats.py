@@ -0,0 +1,115 @@
+from datetime import datetime
+from typing import Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, func
+from sqlalchemy.dialects.postgresql import insert
+
+from app.crud.base import CRUDBase
+from app.db.models import Appointment, Patient, PatientStats, Prescription
+from app.db.models.appointment import AppointmentStatus
+from app.db.models.prescription import PrescriptionStatus
+
+# Prescriptions still waiting at the pharmacy (crud_prescription.QUEUE_STATUSES)
+OPEN_PRESCRIPTION_STATUSES = [PrescriptionStatus.CREATED, PrescriptionStatus.PARTIALLY_DISPENSED]
+
+
+class CRUDPatientStats(CRUDBase[PatientStats, None, None]):
+    async def apply(
+        self,
+        db: AsyncSession,
+        *,
+        patient_id: int,
+        hospital_id: int,
+        visits: int = 0,
+        last_visit_at: Optional[datetime] = None,
+        open_prescriptions: int = 0,
+    ) -> None:
+        """
+        Add deltas to a patient's summary row, creating it if needed. Deltas
+        commute, so concurrent visits and dispenses for the same patient
+        can't overwrite each other. Does not commit.
+        """
+        stmt = insert(self.model).values(
+            patient_id=patient_id,
+            hospital_id=hospital_id,
+            visit_count=max(visits, 0),
+            last_visit_at=last_visit_at,
+            open_prescriptions=max(open_prescriptions, 0),
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[self.model.patient_id],
+            set_={
+                "visit_count": self.model.visit_count + visits,
+                # greatest() ignores NULLs
+                "last_visit_at": func.greatest(self.model.last_visit_at, stmt.excluded.last_visit_at),
+                "open_prescriptions": func.greatest(self.model.open_prescriptions + open_prescriptions, 0),
+                "updated_at": func.now(),
+            },
+        )
+        await db.execute(stmt)
+
+    async def recompute(self, db: AsyncSession, *, after_id: int = 0, limit: int = 1000) -> Optional[int]:
+        """
+        Rebuild the summary rows of the next `limit` patients with id above
+        `after_id` from appointments and prescriptions, in one statement.
+        Returns the last patient id covered, or None when there are no more.
+        Does not commit.
+        """
+        batch = (
+            select(Patient.id, Patient.hospital_id)
+            .where(Patient.id > after_id)
+            .order_by(Patient.id)
+            .limit(limit)
+            .cte("batch")
+        )
+        visits = (
+            select(
+                Appointment.patient_id,
+                func.count().label("visit_count"),
+                func.max(Appointment.appointment_time).label("last_visit_at"),
+            )
+            .where(
+                Appointment.status == AppointmentStatus.COMPLETED,
+                Appointment.patient_id.in_(select(batch.c.id)),
+            )
+            .group_by(Appointment.patient_id)
+            .subquery()
+        )
+        open_rx = (
+            select(Prescription.patient_id, func.count().label("open_prescriptions"))
+            .where(
+                Prescription.status.in_(OPEN_PRESCRIPTION_STATUSES),
+                Prescription.patient_id.in_(select(batch.c.id)),
+            )
+            .group_by(Prescription.patient_id)
+            .subquery()
+        )
+        rows = (
+            select(
+                batch.c.id,
+                batch.c.hospital_id,
+                func.coalesce(visits.c.visit_count, 0),
+                visits.c.last_visit_at,
+                func.coalesce(open_rx.c.open_prescriptions, 0),
+            )
+            .select_from(batch)
+            .outerjoin(visits, visits.c.patient_id == batch.c.id)
+            .outerjoin(open_rx, open_rx.c.patient_id == batch.c.id)
+        )
+        stmt = insert(self.model).from_select(
+            ["patient_id", "hospital_id", "visit_count", "last_visit_at", "open_prescriptions"], rows
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[self.model.patient_id],
+            set_={
+                "visit_count": stmt.excluded.visit_count,
+                "last_visit_at": stmt.excluded.last_visit_at,
+                "open_prescriptions": stmt.excluded.open_prescriptions,
+                "updated_at": func.now(),
+            },
+        ).returning(self.model.patient_id)
+        patient_ids = (await db.execute(stmt)).scalars().all()
+        return max(patient_ids) if patient_ids else None
+
+
+patient_stats = CRUDPatientStats(PatientStats)
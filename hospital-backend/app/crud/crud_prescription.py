@@ -1,9 +1,358 @@
+from collections import defaultdict
+from datetime import timedelta
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import select, update, or_, func, case, literal, values, column, cast, Integer, String
+from sqlalchemy.engine import Row
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from sqlalchemy.orm.exc import StaleDataError
+
 from app.crud.base import CRUDBase
-from app.db.models import Prescription, PrescriptionLineItem
-from app.schemas.prescription import PrescriptionCreate # Note: using custom schema for create
+from app.crud.crud_analytics import analytics, line_counts
+from app.crud.crud_patient_stats import patient_stats, OPEN_PRESCRIPTION_STATUSES
+from app.crud.crud_stock import stock, InsufficientStockError
+from app.db.models import Appointment, Prescription, PrescriptionLineItem, Visit
+from app.db.models.prescription import PrescriptionStatus, DispenseLineStatus
+from app.schemas.prescription import PrescriptionCreate, DispenseUpdate, BatchDispenseItem # Note: using custom schema for create
+
+# Statuses that still need work at the pharmacy counter
+QUEUE_STATUSES = OPEN_PRESCRIPTION_STATUSES
+# Line statuses whose dispensed quantity comes out of the prescribed medicine's stock
+STOCK_CONSUMING_STATUSES = [DispenseLineStatus.GIVEN, DispenseLineStatus.PARTIALLY_GIVEN]
+
 
 class CRUDPrescription(CRUDBase[Prescription, PrescriptionCreate, None]):
     # Creation is custom because it involves line items, handled in API logic
-    pass
 
-prescription = CRUDPrescription(Prescription)
\ No newline at end of file
+    async def claim_next(
+        self,
+        db: AsyncSession,
+        *,
+        hospital_id: int,
+        user_id: int,
+        limit: int,
+        lease_seconds: int,
+    ) -> List[Prescription]:
+        """
+        Atomically assign up to `limit` unclaimed queue prescriptions to `user_id`.
+
+        Rows locked by a concurrent claim are skipped rather than waited on, so
+        several pharmacists can claim in parallel without ever receiving the same
+        prescription. Prescriptions the caller already holds are included and have
+        their lease renewed; leases that have expired are up for grabs again.
+        """
+        claimable = (
+            select(self.model.id)
+            .filter(
+                self.model.hospital_id == hospital_id,
+                self.model.status.in_(QUEUE_STATUSES),
+                or_(
+                    self.model.claimed_by_id.is_(None),
+                    self.model.claimed_by_id == user_id,
+                    self.model.claim_expires_at < func.now(),
+                ),
+            )
+            .order_by(self.model.id)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        ids = (await db.execute(claimable)).scalars().all()
+
+        if ids:
+            await db.execute(
+                update(self.model)
+                .where(self.model.id.in_(ids))
+                .values(
+                    claimed_by_id=user_id,
+                    claim_expires_at=func.now() + timedelta(seconds=lease_seconds),
+                )
+                .execution_options(synchronize_session=False)
+            )
+        await db.commit()
+
+        if not ids:
+            return []
+        result = await db.execute(
+            select(self.model)
+            .options(
+                selectinload(self.model.line_items),
+                selectinload(self.model.patient),
+            )
+            .filter(self.model.id.in_(ids))
+            .order_by(self.model.id)
+        )
+        return result.scalars().all()
+
+    async def dispense_many(
+        self,
+        db: AsyncSession,
+        *,
+        hospital_id: int,
+        items: List[BatchDispenseItem],
+        user_id: Optional[int] = None,
+    ) -> Tuple[Dict[int, Row], Dict[int, Exception], List[dict]]:
+        """
+        Apply dispense updates to many prescriptions with set-based statements,
+        without loading the object graph: the prescriptions and their lines are
+        locked and version-checked up front, then every line update goes out as
+        one UPDATE ... FROM (VALUES ...), stock as one guarded UPDATE, and the
+        new statuses as one aggregate UPDATE over the affected prescriptions.
+
+        A prescription whose `version` (or a sent line `version`) doesn't match
+        fails with `StaleDataError`, one that stock can't cover with
+        `InsufficientStockError`, and one that doesn't exist in the hospital
+        with `LookupError`; the others still apply. Prescription ids must be
+        unique within `items`. Patient open-prescription counts and the medicine
+        rollup are adjusted along the way.
+
+        Does not commit; returns the updated (id, status, version, doctor_id)
+        rows and the errors, both by prescription id, and any low-stock alerts.
+        """
+        errors: Dict[int, Exception] = {}
+        ids = [item.prescription_id for item in items]
+        heads = {
+            row.id: row
+            for row in (await db.execute(
+                select(
+                    self.model.id,
+                    self.model.version,
+                    self.model.status,
+                    self.model.patient_id,
+                    Appointment.appointment_time,
+                )
+                .select_from(self.model)
+                .outerjoin(Visit, Visit.id == self.model.visit_id)
+                .outerjoin(Appointment, Appointment.id == Visit.appointment_id)
+                .where(self.model.id.in_(ids), self.model.hospital_id == hospital_id)
+                .order_by(self.model.id)
+                .with_for_update(of=self.model)
+            )).all()
+        }
+        for item in items:
+            head = heads.get(item.prescription_id)
+            if head is None:
+                errors[item.prescription_id] = LookupError(f"Prescription {item.prescription_id} not found.")
+            elif head.version != item.version:
+                errors[item.prescription_id] = StaleDataError(
+                    f"Prescription {item.prescription_id} was modified concurrently."
+                )
+        items = [item for item in items if item.prescription_id not in errors]
+
+        line = PrescriptionLineItem
+        # Current lines, locked too, for the version checks and rollup deltas
+        lines = {
+            row.id: row
+            for row in (await db.execute(
+                select(
+                    line.id, line.prescription_id, line.version, line.status,
+                    line.medicine_name, line.medicine_id, line.dispensed_quantity,
+                )
+                .where(line.prescription_id.in_([item.prescription_id for item in items]))
+                .order_by(line.id)
+                .with_for_update()
+            )).all()
+        } if items else {}
+
+        # Per prescription, the last update per line wins, as if applied in order.
+        # Lines sent without a version skip the per-line check; lines that don't
+        # belong to the prescription are ignored.
+        changes_by_prescription: Dict[int, Dict[int, DispenseUpdate]] = {}
+        for item in items:
+            by_line = {}
+            for update_in in item.updates:
+                current = lines.get(update_in.line_item_id)
+                if current is None or current.prescription_id != item.prescription_id:
+                    if update_in.version is not None:
+                        errors[item.prescription_id] = StaleDataError(
+                            f"Line item {update_in.line_item_id} was modified concurrently."
+                        )
+                    continue
+                if update_in.version is not None and update_in.version != current.version:
+                    errors[item.prescription_id] = StaleDataError(
+                        f"Line item {update_in.line_item_id} was modified concurrently."
+                    )
+                by_line[update_in.line_item_id] = update_in
+            if item.prescription_id not in errors:
+                changes_by_prescription[item.prescription_id] = by_line
+
+        # `quantity` is the line's running total, so only the increase over what
+        # was already dispensed comes out of stock; a re-sent update takes nothing
+        dispensed_totals = {
+            line_id: max(lines[line_id].dispensed_quantity, update_in.quantity)
+            for by_line in changes_by_prescription.values()
+            for line_id, update_in in by_line.items()
+            if update_in.quantity and update_in.status in STOCK_CONSUMING_STATUSES
+        }
+
+        # Stock: check each prescription's needs against the locked balances in
+        # request order, so one that can't be covered fails on its own
+        needs_by_prescription = {
+            prescription_id: [
+                {
+                    "medicine_id": lines[line_id].medicine_id,
+                    "quantity": dispensed_totals[line_id] - lines[line_id].dispensed_quantity,
+                    "line_item_id": line_id,
+                }
+                for line_id in by_line
+                if line_id in dispensed_totals
+                and dispensed_totals[line_id] > lines[line_id].dispensed_quantity
+                and lines[line_id].medicine_id
+            ]
+            for prescription_id, by_line in changes_by_prescription.items()
+        }
+        available = await stock.lock_quantities(
+            db,
+            hospital_id=hospital_id,
+            medicine_ids=[need["medicine_id"] for needs in needs_by_prescription.values() for need in needs],
+        )
+        movements = []
+        for prescription_id, needs in needs_by_prescription.items():
+            totals = defaultdict(int)
+            for need in needs:
+                if need["medicine_id"] in available:
+                    totals[need["medicine_id"]] += need["quantity"]
+            short = next((m for m, quantity in totals.items() if quantity > available[m]), None)
+            if short is not None:
+                errors[prescription_id] = InsufficientStockError(short, totals[short], available[short])
+                del changes_by_prescription[prescription_id]
+                continue
+            for medicine_id, quantity in totals.items():
+                available[medicine_id] -= quantity
+            movements.extend(need for need in needs if need["medicine_id"] in available)
+
+        changes = [
+            (line_id, prescription_id, update_in)
+            for prescription_id, by_line in changes_by_prescription.items()
+            for line_id, update_in in by_line.items()
+        ]
+        if changes:
+            line_changes = values(
+                column("id", Integer),
+                column("prescription_id", Integer),
+                column("status", line.status.type),
+                column("substitution_info", String),
+                column("dispensed_quantity", Integer),
+                column("version", Integer),
+                name="changes",
+            ).data([
+                (
+                    line_id, prescription_id, update_in.status, update_in.substitution_info,
+                    dispensed_totals.get(line_id, lines[line_id].dispensed_quantity), lines[line_id].version,
+                )
+                for line_id, prescription_id, update_in in changes
+            ])
+            touched = (await db.execute(
+                update(line)
+                .where(
+                    line.id == line_changes.c.id,
+                    line.prescription_id == line_changes.c.prescription_id,
+                    line.version == line_changes.c.version,
+                )
+                .values(
+                    status=cast(line_changes.c.status, line.status.type),
+                    substitution_info=line_changes.c.substitution_info,
+                    dispensed_quantity=line_changes.c.dispensed_quantity,
+                    version=line.version + 1,
+                )
+                .returning(line.id)
+                .execution_options(synchronize_session=False)
+            )).scalars().all()
+            if len(touched) != len(changes):
+                # Can't happen while the lines are locked; don't half-apply
+                raise StaleDataError("Line items were modified concurrently.")
+
+        low_stock = await stock.decrement_many(db, hospital_id=hospital_id, movements=movements, user_id=user_id)
+
+        # Overall status of every affected prescription as one aggregate over its
+        # line items, folded into the version-checked UPDATE of the prescriptions
+        updated: Dict[int, Row] = {}
+        if changes_by_prescription:
+            expected = values(column("id", Integer), column("version", Integer), name="expected").data([
+                (prescription_id, heads[prescription_id].version) for prescription_id in changes_by_prescription
+            ])
+            all_given = (
+                select(func.bool_and(line.status.in_([DispenseLineStatus.GIVEN, DispenseLineStatus.SUBSTITUTED])))
+                .where(line.prescription_id == self.model.id)
+                .scalar_subquery()
+            )
+            any_touched = (
+                select(func.bool_or(line.status != DispenseLineStatus.NOT_GIVEN))
+                .where(line.prescription_id == self.model.id)
+                .scalar_subquery()
+            )
+            status_type = self.model.status.type
+            new_status = case(
+                (all_given, literal(PrescriptionStatus.FULLY_DISPENSED, status_type)),
+                (any_touched, literal(PrescriptionStatus.PARTIALLY_DISPENSED, status_type)),
+                else_=self.model.status,
+            )
+            result = await db.execute(
+                update(self.model)
+                .where(self.model.id == expected.c.id, self.model.version == expected.c.version)
+                .values(
+                    status=new_status,
+                    version=self.model.version + 1,
+                    # A fully dispensed prescription no longer needs its claim
+                    claimed_by_id=case((all_given, None), else_=self.model.claimed_by_id),
+                    claim_expires_at=case((all_given, None), else_=self.model.claim_expires_at),
+                )
+                .returning(self.model.id, self.model.status, self.model.version, self.model.doctor_id)
+                .execution_options(synchronize_session=False)
+            )
+            updated = {row.id: row for row in result.all()}
+            if len(updated) != len(changes_by_prescription):
+                raise StaleDataError("Prescriptions were modified concurrently.")
+
+        for prescription_id, row in updated.items():
+            previous = heads[prescription_id]
+            open_delta = (row.status in QUEUE_STATUSES) - (previous.status in QUEUE_STATUSES)
+            if open_delta and previous.patient_id:
+                await patient_stats.apply(
+                    db, patient_id=previous.patient_id, hospital_id=hospital_id, open_prescriptions=open_delta
+                )
+            if previous.appointment_time is None:
+                continue
+            medicine_deltas = defaultdict(lambda: (0, 0, 0))
+            for line_id, update_in in changes_by_prescription[prescription_id].items():
+                old_line = lines[line_id]
+                (old_dispensed, old_substituted), (new_dispensed, new_substituted) = (
+                    line_counts(old_line.status), line_counts(update_in.status)
+                )
+                prescribed, dispensed, substituted = medicine_deltas[old_line.medicine_name]
+                medicine_deltas[old_line.medicine_name] = (
+                    prescribed,
+                    dispensed + new_dispensed - old_dispensed,
+                    substituted + new_substituted - old_substituted,
+                )
+            await analytics.apply_medicines(
+                db, hospital_id=hospital_id, appointment_time=previous.appointment_time, deltas=medicine_deltas
+            )
+        return updated, errors, low_stock
+
+    async def dispense(
+        self,
+        db: AsyncSession,
+        *,
+        prescription_id: int,
+        hospital_id: int,
+        expected_version: int,
+        updates: List[DispenseUpdate],
+        user_id: Optional[int] = None,
+    ) -> Tuple[Row, List[dict]]:
+        """
+        `dispense_many` for one prescription. Raises its error (`StaleDataError`,
+        `InsufficientStockError` or `LookupError`) instead of returning it.
+        Does not commit; returns the updated row and any low-stock alerts.
+        """
+        updated, errors, low_stock = await self.dispense_many(
+            db,
+            hospital_id=hospital_id,
+            items=[BatchDispenseItem(prescription_id=prescription_id, version=expected_version, updates=updates)],
+            user_id=user_id,
+        )
+        if prescription_id in errors:
+            raise errors[prescription_id]
+        return updated[prescription_id], low_stock
+
+prescription = CRUDPrescription(Prescription)
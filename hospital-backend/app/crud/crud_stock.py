@@ -0,0 +1,197 @@
+from typing import Dict, Iterable, List, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, update, values, column, Integer
+from sqlalchemy.dialects.postgresql import insert
+
+from app.crud.base import CRUDBase
+from app.db.models import Medicine, MedicineStock, StockMovement
+from app.schemas.stock import StockAdjustment
+
+
+class InsufficientStockError(Exception):
+    def __init__(self, medicine_id: int, requested: int, available: int):
+        self.medicine_id = medicine_id
+        self.requested = requested
+        self.available = available
+        super().__init__(
+            f"Only {available} units of medicine {medicine_id} in stock, {requested} requested."
+        )
+
+
+class CRUDStock(CRUDBase[MedicineStock, StockAdjustment, StockAdjustment]):
+    async def lock_quantities(
+        self, db: AsyncSession, *, hospital_id: int, medicine_ids: Iterable[int]
+    ) -> Dict[int, int]:
+        """
+        On-hand quantity for many medicines, with their stock rows locked until
+        the transaction ends (in medicine id order, so concurrent callers don't
+        deadlock). Untracked medicines are absent.
+        """
+        ids = sorted({medicine_id for medicine_id in medicine_ids if medicine_id is not None})
+        if not ids:
+            return {}
+        result = await db.execute(
+            select(self.model.medicine_id, self.model.quantity)
+            .filter(self.model.hospital_id == hospital_id, self.model.medicine_id.in_(ids))
+            .order_by(self.model.medicine_id)
+            .with_for_update()
+        )
+        return dict(result.all())
+
+    async def decrement_many(
+        self,
+        db: AsyncSession,
+        *,
+        hospital_id: int,
+        movements: List[dict],
+        user_id: Optional[int] = None,
+    ) -> List[dict]:
+        """
+        Take dispensed units out of stock for many lines at once: one guarded
+        UPDATE ... FROM (VALUES ...) for the per-medicine totals and one
+        multi-row INSERT into the ledger. `movements` are dicts with
+        `medicine_id`, `quantity` and `line_item_id`, for tracked medicines only.
+
+        Callers check availability first under `lock_quantities`; a total the
+        balance can't cover still raises `InsufficientStockError`. Returns a
+        low-stock alert per medicine that crossed its threshold. Does not commit.
+        """
+        totals: Dict[int, int] = {}
+        for movement in movements:
+            totals[movement["medicine_id"]] = totals.get(movement["medicine_id"], 0) + movement["quantity"]
+        if not totals:
+            return []
+
+        taken = values(column("medicine_id", Integer), column("quantity", Integer), name="taken").data(
+            list(totals.items())
+        )
+        rows = (await db.execute(
+            update(self.model)
+            .where(
+                self.model.hospital_id == hospital_id,
+                self.model.medicine_id == taken.c.medicine_id,
+                self.model.quantity >= taken.c.quantity,
+            )
+            .values(quantity=self.model.quantity - taken.c.quantity)
+            .returning(self.model.medicine_id, self.model.quantity, self.model.low_stock_threshold)
+            .execution_options(synchronize_session=False)
+        )).all()
+        if len(rows) != len(totals):
+            short = next(medicine_id for medicine_id in totals if medicine_id not in {r.medicine_id for r in rows})
+            available = await db.scalar(
+                select(self.model.quantity).filter(
+                    self.model.hospital_id == hospital_id, self.model.medicine_id == short
+                )
+            )
+            raise InsufficientStockError(short, totals[short], available or 0)
+
+        await db.execute(insert(StockMovement).values([
+            {
+                "hospital_id": hospital_id,
+                "medicine_id": movement["medicine_id"],
+                "delta": -movement["quantity"],
+                "reason": "dispense",
+                "line_item_id": movement["line_item_id"],
+                "user_id": user_id,
+            }
+            for movement in movements
+        ]))
+        return [
+            {
+                "medicine_id": row.medicine_id,
+                "quantity": row.quantity,
+                "low_stock_threshold": row.low_stock_threshold,
+            }
+            for row in rows
+            if row.quantity <= row.low_stock_threshold < row.quantity + totals[row.medicine_id]
+        ]
+
+    async def adjust(
+        self,
+        db: AsyncSession,
+        *,
+        hospital_id: int,
+        medicine_id: int,
+        adjustment: StockAdjustment,
+        user_id: Optional[int] = None,
+    ) -> Optional[MedicineStock]:
+        """
+        Restock or write off, creating the stock row on first use. Returns None
+        (and changes nothing) if the adjustment would take the balance below zero.
+        Does not commit.
+        """
+        set_ = {"quantity": self.model.quantity + adjustment.delta}
+        if adjustment.low_stock_threshold is not None:
+            set_["low_stock_threshold"] = adjustment.low_stock_threshold
+
+        if adjustment.delta < 0:
+            # Write-offs only apply to existing rows with enough on hand
+            stmt = (
+                update(self.model)
+                .where(
+                    self.model.hospital_id == hospital_id,
+                    self.model.medicine_id == medicine_id,
+                    self.model.quantity + adjustment.delta >= 0,
+                )
+                .values(**set_)
+                .execution_options(synchronize_session=False)
+            )
+        else:
+            values = {"hospital_id": hospital_id, "medicine_id": medicine_id, "quantity": adjustment.delta}
+            if adjustment.low_stock_threshold is not None:
+                values["low_stock_threshold"] = adjustment.low_stock_threshold
+            stmt = insert(self.model).values(**values).on_conflict_do_update(
+                index_elements=["hospital_id", "medicine_id"], set_=set_
+            )
+        stock = (await db.execute(stmt.returning(self.model))).scalars().first()
+        if stock is None:
+            return None
+
+        if adjustment.delta:
+            db.add(StockMovement(
+                hospital_id=hospital_id,
+                medicine_id=medicine_id,
+                delta=adjustment.delta,
+                reason=adjustment.reason,
+                user_id=user_id,
+            ))
+        return stock
+
+    async def get_levels(
+        self, db: AsyncSession, *, hospital_id: int, low_only: bool = False
+    ) -> List[dict]:
+        query = (
+            select(self.model, Medicine.name)
+            .join(Medicine, Medicine.id == self.model.medicine_id)
+            .filter(self.model.hospital_id == hospital_id)
+        )
+        if low_only:
+            query = query.filter(self.model.quantity <= self.model.low_stock_threshold)
+        result = await db.execute(query.order_by(Medicine.name))
+        return [
+            {
+                "medicine_id": stock.medicine_id,
+                "medicine_name": name,
+                "quantity": stock.quantity,
+                "low_stock_threshold": stock.low_stock_threshold,
+                "is_low": stock.quantity <= stock.low_stock_threshold,
+            }
+            for stock, name in result.all()
+        ]
+
+    async def get_quantities(
+        self, db: AsyncSession, *, hospital_id: int, medicine_ids: Iterable[int]
+    ) -> Dict[int, int]:
+        """ On-hand quantity for many medicines in one query; untracked medicines are absent. """
+        ids = {medicine_id for medicine_id in medicine_ids if medicine_id is not None}
+        if not ids:
+            return {}
+        result = await db.execute(
+            select(self.model.medicine_id, self.model.quantity).filter(
+                self.model.hospital_id == hospital_id,
+                self.model.medicine_id.in_(ids),
+            )
+        )
+        return dict(result.all())
+
+stock = CRUDStock(MedicineStock)
@@ -4,8 +4,14 @@ from .user import User, UserRole
 
 from .user import User
 from .patient import Patient
+from .patient_stats import PatientStats
 from .appointment import Appointment
 from .visit import Visit, ClinicalNote
 from .prescription import Prescription, PrescriptionLineItem
 from .hospital import Hospital
-from .audit_log import AuditLog
\ No newline at end of file
+from .medicine import Medicine
+from .stock import MedicineStock, StockMovement
+from .audit_log import AuditLog
+from .socket_message import SocketMessage
+from .patient_duplicate import PatientDuplicate, DuplicateStatus
+from .analytics import DoctorDailyStats, MedicineDailyStats
@@ -0,0 +1,39 @@
+from sqlalchemy import Column, Integer, String, Date, DateTime, ForeignKey, func
+from app.db.base_class import Base
+
+
+class DoctorDailyStats(Base):
+    """
+    Appointments per (hospital, day, doctor), by the day of the appointment.
+    Kept up to date by delta in the same transaction as each booking, status
+    change and prescription (see crud.analytics); scripts/rebuild_analytics_rollups.py
+    recomputes it from the source tables.
+    """
+    __tablename__ = "doctor_daily_stats"
+
+    hospital_id = Column(Integer, ForeignKey("hospitals.id", ondelete="CASCADE"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    doctor_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    appointments = Column(Integer, nullable=False, default=0, server_default="0")
+    completed = Column(Integer, nullable=False, default=0, server_default="0")
+    no_shows = Column(Integer, nullable=False, default=0, server_default="0")
+    cancelled = Column(Integer, nullable=False, default=0, server_default="0")
+    prescriptions = Column(Integer, nullable=False, default=0, server_default="0")
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
+
+
+class MedicineDailyStats(Base):
+    """
+    Prescription line items per (hospital, day, medicine), by the day of the
+    consultation they were written in. `medicine_name` is the normalized name
+    (crud_medicine.normalize_medicine_name).
+    """
+    __tablename__ = "medicine_daily_stats"
+
+    hospital_id = Column(Integer, ForeignKey("hospitals.id", ondelete="CASCADE"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    medicine_name = Column(String, primary_key=True)
+    prescribed = Column(Integer, nullable=False, default=0, server_default="0")
+    dispensed = Column(Integer, nullable=False, default=0, server_default="0")
+    substituted = Column(Integer, nullable=False, default=0, server_default="0")
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
@@ -1,5 +1,5 @@
 import enum
-from sqlalchemy import Column, Integer, String, DateTime, Enum as PyEnum, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, Enum as PyEnum, ForeignKey, Index, func
 from sqlalchemy.orm import relationship
 from app.db.base_class import Base
 
@@ -19,8 +19,17 @@ class Appointment(Base):
     appointment_time = Column(DateTime(timezone=True), nullable=False, index=True)
     status = Column(PyEnum(AppointmentStatus), default=AppointmentStatus.SCHEDULED, nullable=False)
     visit_purpose = Column(String, nullable=True)
+    # Bumped by every change (status, reassignment); drives incremental exports
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False, index=True)
 
     patient = relationship("Patient", back_populates="appointments")
     doctor = relationship("User", foreign_keys=[doctor_id], back_populates="doctor_appointments")
     created_by = relationship("User", foreign_keys=[created_by_id])
-    visit = relationship("Visit", back_populates="appointment", uselist=False, cascade="all, delete-orphan")
\ No newline at end of file
+    visit = relationship("Visit", back_populates="appointment", uselist=False, cascade="all, delete-orphan")
+
+    __table_args__ = (
+        # Serves a patient's visit timeline, newest first
+        Index("ix_appointments_patient_status_time", patient_id, status, appointment_time.desc()),
+        # Serves a doctor's calendar range scans
+        Index("ix_appointments_doctor_time", doctor_id, appointment_time),
+    )
@@ -0,0 +1,15 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, UniqueConstraint, func
+from app.db.base_class import Base
+
+class Medicine(Base):
+    """ Per-hospital medicine catalog. Line items link here by id. """
+    id = Column(Integer, primary_key=True, index=True)
+    hospital_id = Column(Integer, ForeignKey("hospitals.id", ondelete="CASCADE"), nullable=False)
+    name = Column(String, nullable=False)
+    # Lower-cased, whitespace-collapsed name used for matching and uniqueness
+    name_normalized = Column(String, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint('hospital_id', 'name_normalized', name='_medicine_hospital_name_uc'),
+    )
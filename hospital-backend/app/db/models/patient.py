@@ -1,11 +1,15 @@
-from sqlalchemy import Column, Integer, String, Date, ForeignKey, UniqueConstraint
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, Date, DateTime, ForeignKey, Index, UniqueConstraint, func
+from sqlalchemy.orm import relationship, validates
+from app.core.phone import normalize_phone
 from app.db.base_class import Base
 
 class Patient(Base):
     id = Column(Integer, primary_key=True, index=True)
     full_name = Column(String, nullable=False, index=True)
     phone_number = Column(String, nullable=False, index=True)
+    # E.164 form of phone_number, kept in step by `_normalize_phone`. NULL for
+    # numbers that can't be normalized and for pre-existing duplicates.
+    phone_normalized = Column(String, nullable=True)
     
     # Optional demographics
     date_of_birth = Column(Date, nullable=True)
@@ -14,13 +18,33 @@ class Patient(Base):
     # --- NEW: Link each patient to a hospital ---
     hospital_id = Column(Integer, ForeignKey("hospitals.id", ondelete="CASCADE"), nullable=False)
     hospital = relationship("Hospital", back_populates="patients")
+    # Start time of the registering transaction; the patient picker index
+    # refreshes by it (app/patient_index.py)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     
     # Relationships
     appointments = relationship("Appointment", back_populates="patient", cascade="all, delete-orphan")
     prescriptions = relationship("Prescription", back_populates="patient")
+    # Only loaded where asked for (contains_eager in the patient list)
+    stats = relationship("PatientStats", back_populates="patient", uselist=False, lazy="raise", passive_deletes=True)
     # --- ADD THIS AT THE BOTTOM OF THE CLASS ---
     # This tells the database that the combination of phone_number and hospital_id
     # must be unique. A single phone number can now exist in multiple hospitals.
     __table_args__ = (
         UniqueConstraint('phone_number', 'hospital_id', name='_phone_hospital_uc'),
+        # Duplicate checks and exact phone lookups are one probe of this index
+        Index('ix_patients_hospital_phone_normalized', 'hospital_id', 'phone_normalized', unique=True),
+        # Trigram index for patient search (needs pg_trgm and btree_gin). The
+        # matching index on the phone digits is an expression index created in
+        # migration 8f1edc18c936.
+        Index(
+            'ix_patients_hospital_full_name_trgm', 'hospital_id', 'full_name',
+            postgresql_using='gin', postgresql_ops={'full_name': 'gin_trgm_ops'},
+        ),
+        Index('ix_patients_hospital_created_at', 'hospital_id', 'created_at'),
     )
+
+    @validates('phone_number')
+    def _normalize_phone(self, key, value):
+        self.phone_normalized = normalize_phone(value)
+        return value
@@ -0,0 +1,38 @@
+import enum
+from sqlalchemy import Column, Integer, Float, Boolean, DateTime, Enum, ForeignKey, Index, UniqueConstraint, func
+from sqlalchemy.orm import relationship
+from app.db.base_class import Base
+
+
+class DuplicateStatus(str, enum.Enum):
+    PENDING = "Pending"
+    DISMISSED = "Dismissed"
+
+
+class PatientDuplicate(Base):
+    """
+    A pair of patients in one hospital that may be the same person, found by
+    crud.patient_duplicate.scan. patient_a_id < patient_b_id, so each pair is
+    stored once. Rows go away with either patient (e.g. when they are merged).
+    """
+    __tablename__ = "patient_duplicates"
+
+    id = Column(Integer, primary_key=True, index=True)
+    hospital_id = Column(Integer, ForeignKey("hospitals.id", ondelete="CASCADE"), nullable=False)
+    patient_a_id = Column(Integer, ForeignKey("patients.id", ondelete="CASCADE"), nullable=False)
+    patient_b_id = Column(Integer, ForeignKey("patients.id", ondelete="CASCADE"), nullable=False, index=True)
+    # 0..1: name similarity, same phone and same date of birth, weighted
+    score = Column(Float, nullable=False)
+    same_phone = Column(Boolean, nullable=False, default=False)
+    status = Column(Enum(DuplicateStatus), default=DuplicateStatus.PENDING, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
+
+    patient_a = relationship("Patient", foreign_keys=[patient_a_id])
+    patient_b = relationship("Patient", foreign_keys=[patient_b_id])
+
+    __table_args__ = (
+        UniqueConstraint("patient_a_id", "patient_b_id", name="_patient_duplicate_pair_uc"),
+        # The review queue: a hospital's pending pairs, best first
+        Index("ix_patient_duplicates_hospital_status_score", hospital_id, status, score.desc()),
+    )
@@ -0,0 +1,32 @@
+from sqlalchemy import Column, Integer, DateTime, ForeignKey, Index, text, func
+from sqlalchemy.orm import relationship
+from app.db.base_class import Base
+
+class PatientStats(Base):
+    """
+    Per-patient summary for list views: completed visits, latest visit and
+    prescriptions still waiting at the pharmacy. Updated by delta in the same
+    transaction as the visit or dispense that changes it (see
+    crud.patient_stats); scripts/repair_patient_stats.py recomputes it from
+    the source tables.
+    """
+    __tablename__ = "patient_stats"
+
+    patient_id = Column(Integer, ForeignKey("patients.id", ondelete="CASCADE"), primary_key=True)
+    hospital_id = Column(Integer, ForeignKey("hospitals.id", ondelete="CASCADE"), nullable=False)
+    last_visit_at = Column(DateTime(timezone=True), nullable=True)
+    visit_count = Column(Integer, nullable=False, default=0, server_default="0")
+    open_prescriptions = Column(Integer, nullable=False, default=0, server_default="0")
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
+
+    patient = relationship("Patient", back_populates="stats")
+
+    __table_args__ = (
+        Index("ix_patient_stats_hospital_last_visit", hospital_id, last_visit_at.desc().nullslast()),
+        Index("ix_patient_stats_hospital_visit_count", hospital_id, visit_count),
+        Index(
+            "ix_patient_stats_hospital_open", hospital_id,
+            postgresql_where=text("open_prescriptions > 0"),
+        ),
+        Index("ix_patient_stats_updated_at", updated_at),
+    )
@@ -6,6 +6,7 @@ from sqlalchemy import (
     DateTime,
     Enum,
     ForeignKey,
+    Index,
     func
 )
 from sqlalchemy.orm import relationship
@@ -34,6 +35,8 @@ class Prescription(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     status = Column(Enum(PrescriptionStatus), default=PrescriptionStatus.CREATED, nullable=False)
+    # Optimistic concurrency: bumped by every dispense, checked by conditional updates
+    version = Column(Integer, nullable=False, default=1, server_default="1")
 
     visit_id = Column(Integer, ForeignKey("visits.id"))
     patient_id = Column(Integer, ForeignKey("patients.id"))
@@ -43,7 +46,12 @@ class Prescription(Base):
     hospital_id = Column(Integer, ForeignKey("hospitals.id", ondelete="CASCADE"), nullable=False)
 
     created_at = Column(DateTime, default=func.now(), nullable=False)
-    updated_at = Column(DateTime, default=func.now(), onupdate=func.now(), nullable=False)
+    updated_at = Column(DateTime, default=func.now(), onupdate=func.now(), nullable=False, index=True)
+
+    # Pharmacy work-claiming: the pharmacist currently working this prescription
+    # and when their lease runs out. An expired lease can be claimed by anyone.
+    claimed_by_id = Column(Integer, ForeignKey("users.id", ondelete="SET NULL"), nullable=True)
+    claim_expires_at = Column(DateTime(timezone=True), nullable=True)
 
     # Relationships
     line_items = relationship(
@@ -54,9 +62,15 @@ class Prescription(Base):
 
     patient = relationship("Patient", back_populates="prescriptions")
     visit = relationship("Visit", back_populates="prescription")
-    doctor = relationship("User")
+    doctor = relationship("User", foreign_keys=[doctor_id])
+    claimed_by = relationship("User", foreign_keys=[claimed_by_id])
     hospital = relationship("Hospital", back_populates="prescriptions")  # <--- add relationship
 
+    __table_args__ = (
+        # Serves the pharmacy queue and the SKIP LOCKED claim scan
+        Index("ix_prescriptions_hospital_status_id", "hospital_id", "status", "id"),
+    )
+
 
 # Define the child PrescriptionLineItem table
 class PrescriptionLineItem(Base):
@@ -65,13 +79,18 @@ class PrescriptionLineItem(Base):
     id = Column(Integer, primary_key=True, index=True)
 
     medicine_name = Column(String, nullable=False)
+    medicine_id = Column(Integer, ForeignKey("medicines.id", ondelete="SET NULL"), nullable=True, index=True)
     dose = Column(String, nullable=True)
     frequency = Column(String, nullable=True)
     duration_days = Column(Integer, nullable=True)
     instructions = Column(String, nullable=True)
     status = Column(Enum(DispenseLineStatus), default=DispenseLineStatus.NOT_GIVEN, nullable=False)
     substitution_info = Column(String, nullable=True)
+    # Units handed out so far; dispenses take only the increase out of stock
+    dispensed_quantity = Column(Integer, nullable=False, default=0, server_default="0")
+    version = Column(Integer, nullable=False, default=1, server_default="1")
 
-    prescription_id = Column(Integer, ForeignKey("prescriptions.id"))
+    prescription_id = Column(Integer, ForeignKey("prescriptions.id"), index=True)
 
     prescription = relationship("Prescription", back_populates="line_items")
+    medicine = relationship("Medicine")
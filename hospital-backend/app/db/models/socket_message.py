@@ -0,0 +1,15 @@
+from sqlalchemy import Column, BigInteger, Text, DateTime, func
+from app.db.base_class import Base
+
+class SocketMessage(Base):
+    """
+    Overflow store for Socket.IO messages too large for a Postgres NOTIFY
+    payload (see app/socket_backends.py). Rows are short-lived, so the table
+    is UNLOGGED.
+    """
+    __tablename__ = "socketio_messages"
+    __table_args__ = {"prefixes": ["UNLOGGED"]}
+
+    id = Column(BigInteger, primary_key=True)
+    payload = Column(Text, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False, index=True)
@@ -0,0 +1,38 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, UniqueConstraint, CheckConstraint, func
+from sqlalchemy.orm import relationship
+from app.db.base_class import Base
+
+class MedicineStock(Base):
+    """
+    Current on-hand quantity per hospital and medicine. This is the
+    materialized balance of the StockMovement ledger, maintained in the same
+    transaction as every movement so readers never have to sum the ledger.
+    """
+    __tablename__ = "medicinestocks"
+
+    id = Column(Integer, primary_key=True, index=True)
+    hospital_id = Column(Integer, ForeignKey("hospitals.id", ondelete="CASCADE"), nullable=False)
+    medicine_id = Column(Integer, ForeignKey("medicines.id", ondelete="CASCADE"), nullable=False)
+    quantity = Column(Integer, nullable=False, default=0, server_default="0")
+    low_stock_threshold = Column(Integer, nullable=False, default=0, server_default="0")
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
+
+    medicine = relationship("Medicine")
+
+    __table_args__ = (
+        UniqueConstraint('hospital_id', 'medicine_id', name='_stock_hospital_medicine_uc'),
+        CheckConstraint('quantity >= 0', name='ck_medicinestocks_quantity_non_negative'),
+    )
+
+class StockMovement(Base):
+    """ Append-only stock ledger: one row per restock, adjustment or dispense. """
+    __tablename__ = "stockmovements"
+
+    id = Column(Integer, primary_key=True, index=True)
+    hospital_id = Column(Integer, ForeignKey("hospitals.id", ondelete="CASCADE"), nullable=False)
+    medicine_id = Column(Integer, ForeignKey("medicines.id", ondelete="CASCADE"), nullable=False, index=True)
+    delta = Column(Integer, nullable=False)
+    reason = Column(String, nullable=False) # e.g. "dispense", "restock", "adjustment"
+    line_item_id = Column(Integer, ForeignKey("prescriptionlineitems.id", ondelete="SET NULL"), nullable=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="SET NULL"), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
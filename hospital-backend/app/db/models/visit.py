@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, func
 from sqlalchemy.orm import relationship
 from app.db.base_class import Base
 from pydantic import BaseModel
@@ -15,6 +15,7 @@ class Visit(Base):
     objective = Column(Text, nullable=True)
     assessment = Column(Text, nullable=True)
     plan = Column(Text, nullable=True)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False, index=True)
     
     # Relationships
     appointment = relationship("Appointment", back_populates="visit")
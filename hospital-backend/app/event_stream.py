@@ -0,0 +1,113 @@
+import asyncio
+import json
+from collections import defaultdict, deque
+from typing import Deque, Dict, Iterable, List, Optional, Set, Tuple
+
+# (room, seq, event, serialized data)
+StreamEvent = Tuple[str, int, str, str]
+
+
+def format_event_id(epoch: str, cursor: Dict[str, int]) -> str:
+    """ `epoch|room:seq|room:seq` - the stream's position in every room it follows. """
+    return "|".join([epoch] + [f"{room}:{seq}" for room, seq in sorted(cursor.items())])
+
+
+def parse_event_id(value: Optional[str]) -> Tuple[Optional[str], Dict[str, int]]:
+    if not value:
+        return None, {}
+    epoch, *parts = value.split("|")
+    cursor = {}
+    for part in parts:
+        room, _, seq = part.rpartition(":")
+        if room and seq.isdigit():
+            cursor[room] = int(seq)
+    return epoch, cursor
+
+
+def format_sse(event: str, data: str, event_id: Optional[str] = None) -> str:
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event}")
+    lines.append(f"data: {data}")
+    return "\n".join(lines) + "\n\n"
+
+
+class StreamSubscriber:
+    """
+    One Server-Sent Events connection. Events wait in a deque of at most
+    `max_events`; a subscriber that falls further behind is marked
+    `overflowed`, its backlog is dropped and the stream is ended with a
+    `resync_required` event, so a stalled client can't grow server memory.
+    """
+
+    def __init__(self, rooms: List[str], cursor: Dict[str, int], max_events: int):
+        self.rooms = rooms
+        self.cursor = cursor
+        self.max_events = max_events
+        self.overflowed = False
+        self._events: Deque[StreamEvent] = deque()
+        self._ready = asyncio.Event()
+
+    def push(self, item: StreamEvent):
+        if self.overflowed:
+            return
+        if len(self._events) >= self.max_events:
+            self.overflowed = True
+            self._events.clear()
+        else:
+            self._events.append(item)
+        self._ready.set()
+
+    async def get(self, timeout: float) -> Optional[StreamEvent]:
+        """ The next event, or None if nothing arrived within `timeout` (or the subscriber overflowed). """
+        if not self._events and not self.overflowed:
+            self._ready.clear()
+            try:
+                await asyncio.wait_for(self._ready.wait(), timeout)
+            except asyncio.TimeoutError:
+                return None
+        if self.overflowed or not self._events:
+            return None
+        return self._events.popleft()
+
+
+class StreamHub:
+    """
+    Fans room events out to Server-Sent Events subscribers in this process.
+    It is fed from the Socket.IO delivery hook, so SSE clients see exactly
+    the events (and sequence numbers) that socket clients in the same rooms
+    do. Each event is serialized once, however many subscribers it has.
+    """
+
+    def __init__(self):
+        self._by_room: Dict[str, Set[StreamSubscriber]] = defaultdict(set)
+        self._count = 0
+
+    @property
+    def subscriber_count(self) -> int:
+        return self._count
+
+    def subscribe(self, rooms: Iterable[str], cursor: Dict[str, int], max_events: int) -> StreamSubscriber:
+        subscriber = StreamSubscriber(list(rooms), cursor, max_events)
+        for room in subscriber.rooms:
+            self._by_room[room].add(subscriber)
+        self._count += 1
+        return subscriber
+
+    def unsubscribe(self, subscriber: StreamSubscriber):
+        for room in subscriber.rooms:
+            subscribers = self._by_room.get(room)
+            if subscribers is not None:
+                subscribers.discard(subscriber)
+                if not subscribers:
+                    del self._by_room[room]
+        self._count -= 1
+
+    def publish(self, room: str, event: str, payload: dict):
+        subscribers = self._by_room.get(room)
+        if not subscribers:
+            return
+        item = (room, payload["seq"], event, json.dumps(payload, separators=(",", ":"), default=str))
+        for subscriber in subscribers:
+            subscriber.push(item)
@@ -0,0 +1,77 @@
+import csv
+import enum
+import io
+import json
+import zlib
+from datetime import date, datetime
+from typing import AsyncIterator, Sequence
+
+from sqlalchemy.sql import Select
+
+from app.core.config import settings
+from app.db.session import AsyncSessionLocal
+
+# Rows are written out in pieces of roughly this many bytes
+EXPORT_CHUNK_BYTES = 64 * 1024
+
+
+def _value(value):
+    if isinstance(value, enum.Enum):
+        return value.value
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def _encode_ndjson(columns: Sequence[str], rows) -> str:
+    return "".join(
+        json.dumps(dict(zip(columns, map(_value, row))), ensure_ascii=False) + "\n" for row in rows
+    )
+
+
+def _encode_csv(rows) -> str:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows([[_value(v) for v in row] for row in rows])
+    return buffer.getvalue()
+
+
+async def stream_rows(query: Select, *, format: str = "ndjson", gzip: bool = False) -> AsyncIterator[bytes]:
+    """
+    Run `query` on a server-side cursor and yield it as NDJSON or CSV (with a
+    header row of the selected column names), optionally gzipped, fetching
+    EXPORT_YIELD_PER rows at a time. Memory holds one batch and up to
+    EXPORT_CHUNK_BYTES of output, whatever the size of the result.
+
+    Uses its own session: a StreamingResponse body runs after the request's
+    dependencies (and their session) have been closed.
+    """
+    columns = list(query.selected_columns.keys())
+    compressor = zlib.compressobj(wbits=16 + zlib.MAX_WBITS) if gzip else None
+    pending: list = []
+    size = 0
+
+    def drain(final: bool = False) -> bytes:
+        nonlocal pending, size
+        data = "".join(pending).encode("utf-8")
+        pending, size = [], 0
+        if compressor is not None:
+            data = compressor.compress(data) + (compressor.flush() if final else b"")
+        return data
+
+    if format == "csv":
+        pending.append(_encode_csv([columns]))
+
+    async with AsyncSessionLocal() as db:
+        result = await db.stream(query.execution_options(yield_per=settings.EXPORT_YIELD_PER))
+        async for rows in result.partitions():
+            text = _encode_csv(rows) if format == "csv" else _encode_ndjson(columns, rows)
+            pending.append(text)
+            size += len(text)
+            if size >= EXPORT_CHUNK_BYTES:
+                data = drain()
+                if data:
+                    yield data
+
+    data = drain(final=True)
+    if data:
+        yield data
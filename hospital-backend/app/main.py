@@ -2,8 +2,10 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 import socketio
 
-from app.api.endpoints import login, users, patients, appointments, prescriptions, hospitals
-from app.socket_manager import sio
+from app.api.endpoints import login, users, patients, appointments, prescriptions, hospitals, medicines, metrics, stream, exports
+from app.audit import audit_writer
+from app.core.log import setup_logging, stop_logging
+from app.socket_manager import sio, emit_scheduler, shared_presence
 
 app = FastAPI(title="Hospital Management API")
 
@@ -27,6 +29,35 @@ app.include_router(patients.router, tags=["Patients"], prefix="/api/patients")
 app.include_router(appointments.router, tags=["Appointments"], prefix="/api/appointments")
 app.include_router(prescriptions.router, tags=["Prescriptions"], prefix="/api/prescriptions")
 app.include_router(hospitals.router, tags=["Hospitals (Admin)"], prefix="/api/hospitals") # <-- ADD THIS LINE
+app.include_router(medicines.router, tags=["Medicines"], prefix="/api/medicines")
+app.include_router(metrics.router, tags=["Metrics (Admin)"], prefix="/api/metrics")
+app.include_router(stream.router, tags=["Event Stream"], prefix="/api/stream")
+app.include_router(exports.router, tags=["Exports (Admin)"], prefix="/api/exports")
+
+
+@app.on_event("startup")
+async def start_logging():
+    setup_logging()
+
+
+@app.on_event("startup")
+async def start_shared_presence():
+    if shared_presence is not None:
+        await shared_presence.start()
+
+
+@app.on_event("startup")
+async def start_audit_writer():
+    audit_writer.start()
+
+
+@app.on_event("shutdown")
+async def flush_socket_events():
+    await emit_scheduler.drain()
+    if shared_presence is not None:
+        await shared_presence.stop()
+    await audit_writer.drain()
+    stop_logging()
 
 
 @app.get("/")
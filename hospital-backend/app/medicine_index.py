@@ -0,0 +1,81 @@
+import asyncio
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import crud
+from app.core.config import settings
+from app.crud.crud_medicine import normalize_medicine_name
+from app.search_index import PrefixIndex
+
+
+class _HospitalCatalog:
+    def __init__(self):
+        self.index = PrefixIndex()
+        # Newest created_at loaded so far
+        self.seen_until: Optional[datetime] = None
+        self.refreshed_at = 0.0
+        self.lock = asyncio.Lock()
+
+
+class MedicineIndex:
+    """
+    Per-hospital medicine suggest index, held in process memory.
+
+    A hospital's catalog is loaded on its first suggest request. After that it
+    is kept current in two ways: medicines created by this process are added
+    as soon as their transaction commits, and every MEDICINE_INDEX_REFRESH_SECONDS
+    the next request pulls in rows created by other workers. That refresh goes
+    by `created_at` (a transaction's start time) and re-reads the last
+    MEDICINE_INDEX_REFRESH_OVERLAP_SECONDS, since a transaction that started
+    earlier can commit after one that started later; rows already in the index
+    are skipped.
+    """
+
+    def __init__(self):
+        self._catalogs: Dict[int, _HospitalCatalog] = {}
+
+    def _catalog(self, hospital_id: int) -> _HospitalCatalog:
+        catalog = self._catalogs.get(hospital_id)
+        if catalog is None:
+            catalog = self._catalogs[hospital_id] = _HospitalCatalog()
+        return catalog
+
+    async def _refresh(self, db: AsyncSession, hospital_id: int) -> _HospitalCatalog:
+        catalog = self._catalog(hospital_id)
+        if time.monotonic() - catalog.refreshed_at < settings.MEDICINE_INDEX_REFRESH_SECONDS:
+            return catalog
+        async with catalog.lock:
+            if time.monotonic() - catalog.refreshed_at < settings.MEDICINE_INDEX_REFRESH_SECONDS:
+                return catalog
+            since = None
+            if catalog.seen_until is not None:
+                since = catalog.seen_until - timedelta(seconds=settings.MEDICINE_INDEX_REFRESH_OVERLAP_SECONDS)
+            rows = await crud.medicine.get_multi_by_hospital(db, hospital_id=hospital_id, created_since=since)
+            if since is None:
+                catalog.index.bulk_load([(m.id, m.name_normalized, {"id": m.id, "name": m.name}) for m in rows])
+            else:
+                for m in rows:
+                    if m.id not in catalog.index:
+                        catalog.index.add(m.id, m.name_normalized, {"id": m.id, "name": m.name})
+            if rows:
+                newest = max(m.created_at for m in rows)
+                catalog.seen_until = newest if catalog.seen_until is None else max(catalog.seen_until, newest)
+            catalog.refreshed_at = time.monotonic()
+        return catalog
+
+    async def suggest(self, db: AsyncSession, *, hospital_id: int, q: str, limit: int = 10) -> List[dict]:
+        catalog = await self._refresh(db, hospital_id)
+        return catalog.index.search(normalize_medicine_name(q), limit=limit)
+
+    def add(self, hospital_id: int, medicine_id: int, name: str) -> None:
+        """ Add a committed catalog entry. Hospitals not loaded yet pick it up on first load. """
+        catalog = self._catalogs.get(hospital_id)
+        if catalog is None or catalog.refreshed_at == 0.0:
+            return
+        catalog.index.add(medicine_id, normalize_medicine_name(name), {"id": medicine_id, "name": name})
+
+
+medicine_index = MedicineIndex()
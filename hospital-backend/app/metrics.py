@@ -0,0 +1,56 @@
+import threading
+from collections import defaultdict
+from typing import Callable, Dict, Tuple
+
+LabelKey = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+
+def _key(name: str, labels: dict) -> LabelKey:
+    return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+class Metrics:
+    """
+    In-process counters and gauges for this worker.
+
+    Counters only go up; gauges are either set directly or computed from a
+    callback when a snapshot is taken (e.g. current socket queue depths).
+    Values are per process, so with several uvicorn workers each one reports
+    its own numbers.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[LabelKey, float] = defaultdict(float)
+        self._gauges: Dict[LabelKey, float] = {}
+        self._gauge_callbacks: Dict[str, Callable[[], float]] = {}
+
+    def inc(self, name: str, value: float = 1, **labels):
+        with self._lock:
+            self._counters[_key(name, labels)] += value
+
+    def set_gauge(self, name: str, value: float, **labels):
+        with self._lock:
+            self._gauges[_key(name, labels)] = value
+
+    def register_gauge(self, name: str, callback: Callable[[], float]):
+        """ Compute `name` by calling `callback` each time metrics are read. """
+        self._gauge_callbacks[name] = callback
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            counters = dict(self._counters)
+            gauges = dict(self._gauges)
+        for name, callback in self._gauge_callbacks.items():
+            gauges[_key(name, {})] = callback()
+
+        def render(values):
+            return [
+                {"name": name, "labels": dict(labels), "value": value}
+                for (name, labels), value in sorted(values.items())
+            ]
+
+        return {"counters": render(counters), "gauges": render(gauges)}
+
+
+metrics = Metrics()
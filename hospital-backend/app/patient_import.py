@@ -0,0 +1,211 @@
+import codecs
+import csv
+import json
+import os
+from typing import AsyncIterator, Dict, List, Optional, Set, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.phone import normalize_phone
+from app.db import models
+from app.schemas.patient import PatientCreate
+
+IMPORT_FIELDS = ("full_name", "phone_number", "date_of_birth", "sex")
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """ Decode a byte stream into lines as it arrives, holding only the current partial line. """
+    decoder = codecs.getincrementaldecoder("utf-8-sig")(errors="replace")
+    pending = ""
+    async for chunk in chunks:
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line.rstrip("\r")
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending.rstrip("\r")
+
+
+async def iter_csv_rows(lines: AsyncIterator[str]) -> AsyncIterator[Tuple[int, Optional[dict], str]]:
+    """
+    (line number, row dict keyed by the header, raw text) for each CSV record.
+    Quoted fields may span lines; a record is complete once its quotes balance.
+    """
+    header: Optional[List[str]] = None
+    pending: List[str] = []
+    quotes, start, line_no = 0, 0, 0
+    async for line in lines:
+        line_no += 1
+        if not pending:
+            start = line_no
+        pending.append(line)
+        quotes += line.count('"')
+        if quotes % 2:
+            continue
+        raw = "\n".join(pending)
+        pending, quotes = [], 0
+        if not raw.strip():
+            continue
+        values = next(csv.reader([raw]))
+        if header is None:
+            header = [name.strip().lower() for name in values]
+            continue
+        yield start, dict(zip(header, values)), raw
+    if pending:
+        yield start, None, "\n".join(pending)
+
+
+async def iter_ndjson_rows(lines: AsyncIterator[str]) -> AsyncIterator[Tuple[int, Optional[dict], str]]:
+    line_no = 0
+    async for line in lines:
+        line_no += 1
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            row = None
+        yield line_no, row if isinstance(row, dict) else None, line
+
+
+class PatientImport:
+    """
+    Bulk patient import for one hospital.
+
+    Rows are validated with PatientCreate and collected into chunks of
+    PATIENT_IMPORT_CHUNK_SIZE. Each chunk is checked against the hospital's
+    existing patients with a single query on (hospital_id, phone_normalized),
+    inserted with one multi-row INSERT ... ON CONFLICT DO NOTHING, and
+    committed. Rejected rows, duplicates included, go to a CSV error file
+    (line, error, row).
+    """
+
+    def __init__(self, db: AsyncSession, *, hospital_id: int, import_id: str):
+        self.db = db
+        self.hospital_id = hospital_id
+        self.import_id = import_id
+        self.processed = 0
+        self.inserted = 0
+        self.duplicates = 0
+        self.errors = 0
+        self._chunk: List[Tuple[int, str, dict]] = []
+        self._seen: Set[str] = set()
+        self._error_file = None
+        self._error_writer = None
+
+    @staticmethod
+    def error_file_path(hospital_id: int, import_id: str) -> str:
+        return os.path.join(settings.PATIENT_IMPORT_ERROR_DIR, f"{hospital_id}_{import_id}.csv")
+
+    @property
+    def summary(self) -> dict:
+        return {
+            "import_id": self.import_id,
+            "processed": self.processed,
+            "inserted": self.inserted,
+            "duplicates": self.duplicates,
+            "errors": self.errors,
+            "has_error_file": self._error_file is not None,
+        }
+
+    def _reject(self, line_no: int, error: str, raw: str, duplicate: bool = False):
+        if duplicate:
+            self.duplicates += 1
+        else:
+            self.errors += 1
+        if self._error_writer is None:
+            os.makedirs(settings.PATIENT_IMPORT_ERROR_DIR, exist_ok=True)
+            self._error_file = open(
+                self.error_file_path(self.hospital_id, self.import_id), "w", newline="", encoding="utf-8"
+            )
+            self._error_writer = csv.writer(self._error_file)
+            self._error_writer.writerow(["line", "error", "row"])
+        self._error_writer.writerow([line_no, error, raw])
+
+    async def add(self, line_no: int, row: Optional[dict], raw: str) -> bool:
+        """ Queue one parsed row; returns True when a chunk was written. """
+        self.processed += 1
+        if row is None:
+            self._reject(line_no, "Could not parse row", raw)
+            return False
+        fields = {
+            name: (row.get(name).strip() if isinstance(row.get(name), str) else row.get(name)) or None
+            for name in IMPORT_FIELDS
+        }
+        try:
+            patient = PatientCreate(**fields)
+        except ValidationError as e:
+            error = "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors())
+            self._reject(line_no, error, raw)
+            return False
+        normalized = normalize_phone(patient.phone_number)
+        if normalized is None:
+            self._reject(line_no, "Invalid phone number", raw)
+            return False
+        if normalized in self._seen:
+            self._reject(line_no, "Duplicate phone number earlier in this file", raw, duplicate=True)
+            return False
+        self._seen.add(normalized)
+        self._chunk.append((line_no, raw, {**patient.model_dump(), "phone_normalized": normalized}))
+        if len(self._chunk) >= settings.PATIENT_IMPORT_CHUNK_SIZE:
+            await self.flush()
+            return True
+        return False
+
+    async def flush(self):
+        chunk, self._chunk = self._chunk, []
+        if not chunk:
+            return
+        phones = [values["phone_normalized"] for _, _, values in chunk]
+        existing = set((await self.db.execute(
+            select(models.Patient.phone_normalized).filter(
+                models.Patient.hospital_id == self.hospital_id,
+                models.Patient.phone_normalized.in_(phones),
+            )
+        )).scalars().all())
+
+        new_rows = []
+        for line_no, raw, values in chunk:
+            if values["phone_normalized"] in existing:
+                self._reject(
+                    line_no, "A patient with this phone number already exists in this hospital", raw,
+                    duplicate=True,
+                )
+            else:
+                new_rows.append((line_no, raw, {**values, "hospital_id": self.hospital_id}))
+
+        if new_rows:
+            # ON CONFLICT covers patients registered concurrently since the check above
+            result = await self.db.execute(
+                insert(models.Patient)
+                .values([values for _, _, values in new_rows])
+                .on_conflict_do_nothing()
+                .returning(models.Patient.id, models.Patient.phone_normalized)
+            )
+            inserted: Dict[str, int] = {phone: patient_id for patient_id, phone in result.all()}
+            for line_no, raw, values in new_rows:
+                if values["phone_normalized"] not in inserted:
+                    self._reject(
+                        line_no, "A patient with this phone number already exists in this hospital", raw,
+                        duplicate=True,
+                    )
+            if inserted:
+                await self.db.execute(
+                    insert(models.PatientStats)
+                    .values([
+                        {"patient_id": patient_id, "hospital_id": self.hospital_id}
+                        for patient_id in inserted.values()
+                    ])
+                    .on_conflict_do_nothing()
+                )
+            self.inserted += len(inserted)
+        await self.db.commit()
+
+    def close(self):
+        if self._error_file is not None:
+            self._error_file.close()
@@ -0,0 +1,206 @@
+import asyncio
+import re
+import time
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.db import models
+from app.search_index import PrefixIndex
+
+
+def normalize_patient_name(name: str) -> str:
+    return " ".join(name.lower().split())
+
+
+def phone_key(phone_number: str) -> str:
+    """ The phone digits, plus the national number when a country code is present, so either prefix matches. """
+    digits = re.sub(r"\D", "", phone_number)
+    if len(digits) > 10:
+        return f"{digits} {digits[-10:]}"
+    return digits
+
+
+def _age(date_of_birth: Optional[date], today: date) -> Optional[int]:
+    if date_of_birth is None:
+        return None
+    return today.year - date_of_birth.year - ((today.month, today.day) < (date_of_birth.month, date_of_birth.day))
+
+
+class _HospitalPatients:
+    def __init__(self):
+        self.names = PrefixIndex()
+        self.phones = PrefixIndex()
+        self.patients: Dict[int, dict] = {}
+        # Newest created_at read from the database so far
+        self.seen_until: Optional[datetime] = None
+        self.refreshed_at = 0.0
+        self.visits_checked_at: Optional[datetime] = None
+        self.lock = asyncio.Lock()
+
+    def put(self, entry: dict):
+        self.patients[entry["id"]] = entry
+        self.names.add(entry["id"], normalize_patient_name(entry["full_name"]), entry)
+        self.phones.add(entry["id"], phone_key(entry["phone_number"]), entry)
+
+    def saw(self, rows: list):
+        if rows:
+            newest = max(r.created_at for r in rows)
+            self.seen_until = newest if self.seen_until is None else max(self.seen_until, newest)
+
+
+class PatientIndex:
+    """
+    Per-hospital patient picker index, held in process memory.
+
+    Names (normalized) and phone digits each get a PrefixIndex, so typeahead
+    lookups never touch the database. A hospital is loaded (only the columns
+    the picker shows) on its first lookup in this process; after that,
+    patients registered and visits completed by this process are applied as
+    soon as they commit, and every PATIENT_INDEX_REFRESH_SECONDS the next
+    lookup pulls in patients and completed visits written by other workers.
+
+    That refresh goes by `created_at` and `patient_stats.updated_at`, both
+    transaction start times, and re-reads the last
+    PATIENT_INDEX_REFRESH_OVERLAP_SECONDS, since a transaction that started
+    earlier can commit after one that started later. Patients already in the
+    index are skipped.
+    """
+
+    # Patient columns the picker needs; full ORM rows are never loaded
+    COLUMNS = (
+        models.Patient.id,
+        models.Patient.full_name,
+        models.Patient.phone_number,
+        models.Patient.date_of_birth,
+        models.Patient.sex,
+        models.Patient.created_at,
+    )
+
+    def __init__(self):
+        self._hospitals: Dict[int, _HospitalPatients] = {}
+
+    def _hospital(self, hospital_id: int) -> _HospitalPatients:
+        hospital = self._hospitals.get(hospital_id)
+        if hospital is None:
+            hospital = self._hospitals[hospital_id] = _HospitalPatients()
+        return hospital
+
+    @staticmethod
+    def _last_visits_query(since: Optional[datetime] = None):
+        query = select(models.PatientStats.patient_id, models.PatientStats.last_visit_at).filter(
+            models.PatientStats.last_visit_at.isnot(None)
+        )
+        if since is not None:
+            query = query.filter(models.PatientStats.updated_at >= since)
+        return query
+
+    def _bulk_load(self, hospital: _HospitalPatients, patients: list, last_visits: dict):
+        entries = [self._entry(p, last_visits.get(p.id)) for p in patients]
+        hospital.patients = {e["id"]: e for e in entries}
+        hospital.names.bulk_load([(e["id"], normalize_patient_name(e["full_name"]), e) for e in entries])
+        hospital.phones.bulk_load([(e["id"], phone_key(e["phone_number"]), e) for e in entries])
+        hospital.seen_until = None
+        hospital.saw(patients)
+        hospital.refreshed_at = time.monotonic()
+        hospital.visits_checked_at = datetime.now().astimezone()
+
+    @staticmethod
+    def _entry(patient, last_visit: Optional[datetime]) -> dict:
+        return {
+            "id": patient.id,
+            "full_name": patient.full_name,
+            "phone_number": patient.phone_number,
+            "date_of_birth": patient.date_of_birth,
+            "sex": patient.sex,
+            "last_visit_date": last_visit.date() if last_visit else None,
+        }
+
+    async def _refresh(self, db: AsyncSession, hospital_id: int) -> _HospitalPatients:
+        hospital = self._hospital(hospital_id)
+        if time.monotonic() - hospital.refreshed_at < settings.PATIENT_INDEX_REFRESH_SECONDS:
+            return hospital
+        async with hospital.lock:
+            if time.monotonic() - hospital.refreshed_at < settings.PATIENT_INDEX_REFRESH_SECONDS:
+                return hospital
+            if hospital.refreshed_at == 0.0:
+                last_visits = dict((await db.execute(
+                    self._last_visits_query().filter(models.PatientStats.hospital_id == hospital_id)
+                )).all())
+                patients = (await db.execute(
+                    select(*self.COLUMNS).filter(models.Patient.hospital_id == hospital_id)
+                )).all()
+                self._bulk_load(hospital, patients, last_visits)
+                return hospital
+
+            overlap = timedelta(seconds=settings.PATIENT_INDEX_REFRESH_OVERLAP_SECONDS)
+            checked_at = datetime.now().astimezone()
+            query = select(*self.COLUMNS).filter(models.Patient.hospital_id == hospital_id)
+            if hospital.seen_until is not None:
+                query = query.filter(models.Patient.created_at >= hospital.seen_until - overlap)
+            new_patients = (await db.execute(query)).all()
+            recent_visits = (await db.execute(
+                self._last_visits_query(hospital.visits_checked_at - overlap)
+                .filter(models.PatientStats.hospital_id == hospital_id)
+            )).all()
+            for p in new_patients:
+                if p.id not in hospital.patients:
+                    hospital.put(self._entry(p, None))
+            hospital.saw(new_patients)
+            for patient_id, last_visit in recent_visits:
+                self._touch(hospital, patient_id, last_visit.date())
+            hospital.refreshed_at = time.monotonic()
+            hospital.visits_checked_at = checked_at
+        return hospital
+
+    async def lookup(self, db: AsyncSession, *, hospital_id: int, q: str, limit: int = 10) -> List[dict]:
+        """ Patients matching a name or phone prefix (typo-tolerant), as PatientLookup fields. """
+        hospital = await self._refresh(db, hospital_id)
+        q = q.strip()
+        if re.sub(r"\D", "", q) and not re.sub(r"[\d\s()+-]", "", q):
+            entries = hospital.phones.search(re.sub(r"\D", "", q), limit=limit)
+        else:
+            entries = hospital.names.search(normalize_patient_name(q), limit=limit)
+        today = date.today()
+        return [
+            {
+                "id": e["id"],
+                "full_name": e["full_name"],
+                "phone_number": e["phone_number"],
+                "age": _age(e["date_of_birth"], today),
+                "sex": e["sex"],
+                "last_visit_date": e["last_visit_date"],
+            }
+            for e in entries
+        ]
+
+    def add(self, hospital_id: int, patient) -> None:
+        """ Add a committed patient. Hospitals not loaded yet pick it up on first load. """
+        hospital = self._hospitals.get(hospital_id)
+        if hospital is None or hospital.refreshed_at == 0.0:
+            return
+        hospital.put(self._entry(patient, None))
+
+    def invalidate(self, hospital_id: int) -> None:
+        """ Reload the hospital on its next lookup, e.g. after a bulk import (cheaper than many inserts). """
+        hospital = self._hospitals.get(hospital_id)
+        if hospital is not None:
+            hospital.refreshed_at = 0.0
+
+    @staticmethod
+    def _touch(hospital: _HospitalPatients, patient_id: int, visit_date: date):
+        entry = hospital.patients.get(patient_id)
+        if entry is not None and (entry["last_visit_date"] is None or visit_date > entry["last_visit_date"]):
+            entry["last_visit_date"] = visit_date
+
+    def record_visit(self, hospital_id: int, patient_id: int, visit_date: date) -> None:
+        """ Update a patient's last visit date once their consultation is completed. """
+        hospital = self._hospitals.get(hospital_id)
+        if hospital is not None:
+            self._touch(hospital, patient_id, visit_date)
+
+
+patient_index = PatientIndex()
@@ -4,7 +4,7 @@
 # This makes them easy to access from other parts of the application (e.g., schemas.User, schemas.Visit).
 
 from .user import User, UserCreate, UserUpdate
-from .patient import Patient, PatientCreate, PatientUpdate
+from .patient import Patient, PatientCreate, PatientUpdate, PatientStats, PatientWithStats, PatientLookup, PatientImportResult, PatientDuplicate, PatientMergeRequest
 from .token import Token, TokenPayload
 from .msg import Msg
 from .hospital import Hospital, HospitalCreate, HospitalUpdate, HospitalWithAdminCreate
@@ -15,5 +15,9 @@ from .hospital import Hospital, HospitalCreate, HospitalUpdate, HospitalWithAdmi
 from .visit import Visit, VisitCreate, VisitUpdate, ClinicalNote
 
 # Continue with the other standardized imports
-from .prescription import Prescription, PrescriptionCreate, PrescriptionUpdate, DispenseUpdate, PharmacyStats
-from .appointment import Appointment, AppointmentCreate, AppointmentUpdate, CompleteVisitPayload
\ No newline at end of file
+from .prescription import Prescription, PrescriptionCreate, PrescriptionUpdate, DispenseUpdate, PharmacyStats, PrescriptionClaimRequest, BatchDispenseItem, BatchDispenseResult
+from .appointment import Appointment, AppointmentCreate, AppointmentUpdate, CompleteVisitPayload, AppointmentTimelineEntry, AppointmentTimelinePage, FacetCount, DoctorFacetCount, AppointmentFacets, CalendarEntry, CalendarSlot, CalendarDay, AppointmentCalendar
+from .medicine import Medicine, MedicineCreate
+from .stock import StockAdjustment, StockLevel
+from .audit import AuditLog, AuditLogCreate
+from .analytics import DoctorDayStats, DoctorSummary, MedicineSummary, HospitalAnalytics
@@ -0,0 +1,42 @@
+from pydantic import BaseModel
+from typing import List, Optional
+from datetime import date
+
+# One row of doctor_daily_stats
+class DoctorDayStats(BaseModel):
+    day: date
+    doctor_id: int
+    appointments: int
+    completed: int
+    no_shows: int
+    cancelled: int
+    prescriptions: int
+
+    class Config:
+        from_attributes = True
+
+# A doctor's totals over the requested range
+class DoctorSummary(BaseModel):
+    doctor_id: int
+    appointments: int
+    completed: int
+    no_shows: int
+    cancelled: int
+    prescriptions: int
+    no_show_rate: Optional[float]
+    # Completed consultations per day with at least one appointment
+    avg_consultations_per_day: Optional[float]
+
+# A medicine's totals over the requested range
+class MedicineSummary(BaseModel):
+    medicine_name: str
+    prescribed: int
+    dispensed: int
+    substituted: int
+
+class HospitalAnalytics(BaseModel):
+    start: date
+    end: date
+    doctors: List[DoctorSummary]
+    doctor_days: List[DoctorDayStats]
+    medicines: List[MedicineSummary]
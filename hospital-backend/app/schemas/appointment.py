@@ -1,6 +1,6 @@
 from pydantic import BaseModel
-from typing import Optional
-from datetime import datetime
+from typing import Dict, List, Optional
+from datetime import date, datetime
 
 # Import other necessary schemas
 from .patient import Patient
@@ -39,4 +39,61 @@ class Appointment(AppointmentBase):
 # Schema for the "complete visit" payload
 class CompleteVisitPayload(BaseModel):
     visit_details: VisitCreate
-    prescription_details: Optional[PrescriptionCreate] = None
\ No newline at end of file
+    prescription_details: Optional[PrescriptionCreate] = None
+
+# Compact entries for a patient's visit timeline; expand one with the detail endpoint
+class AppointmentTimelineEntry(BaseModel):
+    id: int
+    appointment_time: datetime
+    visit_purpose: Optional[str] = None
+    doctor_id: int
+    doctor_name: str
+    diagnosis_summary: Optional[str] = None
+    has_prescription: bool = False
+
+class AppointmentTimelinePage(BaseModel):
+    items: List[AppointmentTimelineEntry]
+    # Pass back as `cursor` for the next (older) page; None on the last page
+    next_cursor: Optional[str] = None
+
+# Counts for one value of a facet (status, patient sex)
+class FacetCount(BaseModel):
+    value: Optional[str] = None
+    count: int
+
+class DoctorFacetCount(BaseModel):
+    doctor_id: int
+    doctor_name: str
+    count: int
+
+# GET /appointments/facets: counts for the nurses' list under the same filters
+class AppointmentFacets(BaseModel):
+    total: int
+    status: List[FacetCount]
+    doctor: List[DoctorFacetCount]
+    sex: List[FacetCount]
+
+# Slim calendar entry (no visit tree)
+class CalendarEntry(BaseModel):
+    id: int
+    appointment_time: datetime
+    status: str
+    visit_purpose: Optional[str] = None
+    patient_id: int
+    patient_name: str
+
+class CalendarSlot(BaseModel):
+    start: datetime
+    count: int
+
+class CalendarDay(BaseModel):
+    day: date
+    total: int
+    by_status: Dict[str, int]
+    slots: List[CalendarSlot]
+
+class AppointmentCalendar(BaseModel):
+    doctor_id: int
+    days: List[CalendarDay]
+    # Only with include_entries=true
+    entries: Optional[List[CalendarEntry]] = None
@@ -0,0 +1,13 @@
+from pydantic import BaseModel
+
+class MedicineBase(BaseModel):
+    name: str
+
+class MedicineCreate(MedicineBase):
+    pass
+
+class Medicine(MedicineBase):
+    id: int
+
+    class Config:
+        from_attributes = True
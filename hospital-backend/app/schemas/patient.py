@@ -1,6 +1,6 @@
 from pydantic import BaseModel
 from typing import Optional
-from datetime import date
+from datetime import date, datetime
 
 class PatientBase(BaseModel):
     full_name: str
@@ -20,6 +20,19 @@ class Patient(PatientBase):
     class Config:
         from_attributes  = True
 
+# Denormalized summary kept in patient_stats
+class PatientStats(BaseModel):
+    last_visit_at: Optional[datetime] = None
+    visit_count: int = 0
+    open_prescriptions: int = 0
+
+    class Config:
+        from_attributes  = True
+
+# Patient list rows
+class PatientWithStats(Patient):
+    stats: Optional[PatientStats] = None
+
 # Schema for the patient-picker dropdown
 class PatientLookup(BaseModel):
     id: int
@@ -30,4 +43,28 @@ class PatientLookup(BaseModel):
     last_visit_date: Optional[date]
 
     class Config:
-        from_attributes  = True
\ No newline at end of file
+        from_attributes  = True
+
+# Result of a bulk import (POST /patients/import)
+class PatientImportResult(BaseModel):
+    import_id: str
+    processed: int
+    inserted: int
+    duplicates: int
+    errors: int
+    has_error_file: bool
+
+# A possible duplicate pair awaiting review
+class PatientDuplicate(BaseModel):
+    id: int
+    score: float
+    same_phone: bool
+    patient_a: Patient
+    patient_b: Patient
+
+    class Config:
+        from_attributes  = True
+
+# Fold `duplicate_id` into the patient in the path
+class PatientMergeRequest(BaseModel):
+    duplicate_id: int
@@ -1,5 +1,6 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, PositiveInt
 from typing import Optional, List
+from datetime import datetime
 from .patient import Patient
 from ..db.models.prescription import PrescriptionStatus, DispenseLineStatus
 
@@ -18,6 +19,11 @@ class PrescriptionLineItemCreate(PrescriptionLineItemBase):
 class PrescriptionLineItem(PrescriptionLineItemBase):
     id: int
     status: DispenseLineStatus
+    version: int = 1
+    dispensed_quantity: int = 0
+    medicine_id: Optional[int] = None
+    # On-hand stock for the linked medicine; only filled in for the pharmacy queue
+    stock_quantity: Optional[int] = None
 
     class Config:
         from_attributes = True
@@ -40,8 +46,11 @@ class PrescriptionUpdate(PrescriptionBase):
 class Prescription(PrescriptionBase):
     id: int
     status: PrescriptionStatus
+    version: int = 1
     patient: Patient
     line_items: List[PrescriptionLineItem] = []
+    claimed_by_id: Optional[int] = None
+    claim_expires_at: Optional[datetime] = None
 
     class Config:
         from_attributes = True
@@ -52,6 +61,28 @@ class DispenseUpdate(BaseModel):
     line_item_id: int
     status: DispenseLineStatus
     substitution_info: Optional[str] = None
+    # Line item version the client last saw; omit to skip the per-line check
+    version: Optional[int] = None
+    # Total units handed out for this line so far (Given/Partially Given). Only the
+    # increase over the line's dispensed_quantity comes out of stock, so re-sending
+    # an update doesn't deduct twice.
+    quantity: Optional[PositiveInt] = None
+
+class BatchDispenseItem(BaseModel):
+    prescription_id: int
+    # Prescription version the client last loaded; required for the conflict check
+    version: int
+    updates: List[DispenseUpdate]
+
+class BatchDispenseResult(BaseModel):
+    prescription_id: int
+    ok: bool
+    status: Optional[PrescriptionStatus] = None
+    version: Optional[int] = None
+    error: Optional[str] = None
+
+class PrescriptionClaimRequest(BaseModel):
+    limit: int = 5
 
 class PharmacyStats(BaseModel):
     new_prescriptions: int
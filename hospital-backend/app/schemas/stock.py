@@ -0,0 +1,15 @@
+from pydantic import BaseModel
+from typing import Optional
+
+class StockAdjustment(BaseModel):
+    # Positive to restock, negative to write off
+    delta: int
+    reason: str = "restock"
+    low_stock_threshold: Optional[int] = None
+
+class StockLevel(BaseModel):
+    medicine_id: int
+    medicine_name: str
+    quantity: int
+    low_stock_threshold: int
+    is_low: bool
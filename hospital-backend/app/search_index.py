@@ -0,0 +1,150 @@
+import math
+from bisect import bisect_left, insort
+from collections import defaultdict
+from itertools import islice
+from typing import Any, Dict, List, Set, Tuple
+
+
+def trigrams(text: str) -> Set[str]:
+    """ pg_trgm-style trigrams: each word padded with two leading spaces and one trailing. """
+    grams = set()
+    for word in text.split():
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+class PrefixIndex:
+    """
+    In-memory typeahead index.
+
+    Every word suffix of a key ("tab paracetamol" is stored as "tab paracetamol"
+    and "paracetamol") lives in one sorted array, so a prefix lookup is a single
+    bisect followed by a short scan. Queries that find too few prefix matches
+    fall back to trigram similarity, which tolerates typos and infixes.
+    Keys must already be normalized by the caller.
+
+    The fallback only gathers candidates from the query's rarest trigrams
+    (any entry similar enough must contain one of them) and stops gathering
+    at `max_candidates`; the more common trigrams are only checked against
+    those candidates. Its cost therefore doesn't grow with the index.
+    """
+
+    def __init__(self, min_similarity: float = 0.3, max_candidates: int = 1000):
+        self.min_similarity = min_similarity
+        self.max_candidates = max_candidates
+        self._entries: List[Tuple[str, int]] = []
+        self._values: Dict[int, Any] = {}
+        self._keys: Dict[int, str] = {}
+        self._trigrams: Dict[str, Set[int]] = defaultdict(set)
+        self._gram_counts: Dict[int, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def __contains__(self, item_id: int) -> bool:
+        return item_id in self._values
+
+    @staticmethod
+    def _suffixes(key: str) -> List[str]:
+        words = key.split()
+        return [" ".join(words[i:]) for i in range(len(words))] or [key]
+
+    def add(self, item_id: int, key: str, value: Any) -> None:
+        """ Insert or replace an entry. """
+        if item_id in self._values:
+            self.remove(item_id)
+        self._values[item_id] = value
+        self._keys[item_id] = key
+        for suffix in self._suffixes(key):
+            insort(self._entries, (suffix, item_id))
+        grams = trigrams(key)
+        self._gram_counts[item_id] = len(grams)
+        for gram in grams:
+            self._trigrams[gram].add(item_id)
+
+    def bulk_load(self, items: List[Tuple[int, str, Any]]) -> None:
+        """ Replace the whole index; sorting once is much cheaper than repeated insort. """
+        self._values = {item_id: value for item_id, _, value in items}
+        self._keys = {item_id: key for item_id, key, _ in items}
+        self._entries = sorted(
+            (suffix, item_id) for item_id, key, _ in items for suffix in self._suffixes(key)
+        )
+        self._trigrams = defaultdict(set)
+        self._gram_counts = {}
+        for item_id, key, _ in items:
+            grams = trigrams(key)
+            self._gram_counts[item_id] = len(grams)
+            for gram in grams:
+                self._trigrams[gram].add(item_id)
+
+    def update_value(self, item_id: int, value: Any) -> None:
+        if item_id in self._values:
+            self._values[item_id] = value
+
+    def remove(self, item_id: int) -> None:
+        key = self._keys.pop(item_id, None)
+        if key is None:
+            return
+        self._values.pop(item_id, None)
+        self._gram_counts.pop(item_id, None)
+        for suffix in self._suffixes(key):
+            pos = bisect_left(self._entries, (suffix, item_id))
+            if pos < len(self._entries) and self._entries[pos] == (suffix, item_id):
+                del self._entries[pos]
+        for gram in trigrams(key):
+            self._trigrams[gram].discard(item_id)
+
+    def search(self, query: str, limit: int = 10) -> List[Any]:
+        if not query:
+            return []
+        matches: List[int] = []
+        seen: Set[int] = set()
+        pos = bisect_left(self._entries, (query, -1))
+        while pos < len(self._entries) and len(matches) < limit:
+            suffix, item_id = self._entries[pos]
+            if not suffix.startswith(query):
+                break
+            if item_id not in seen:
+                seen.add(item_id)
+                matches.append(item_id)
+            pos += 1
+
+        if len(matches) < limit and len(query) >= 3:
+            matches.extend(self._similar(query, seen, limit - len(matches)))
+
+        return [self._values[item_id] for item_id in matches]
+
+    def _similar(self, query: str, exclude: Set[int], limit: int) -> List[int]:
+        """ Up to `limit` ids by trigram similarity to `query`, best first. """
+        query_grams = sorted(trigrams(query), key=lambda gram: len(self._trigrams.get(gram, ())))
+        # similarity = shared / (|query| + |item| - shared) <= shared / |query|, so a
+        # match shares at least `needed` grams and therefore contains one of any
+        # len(query_grams) - needed + 1 of them; probe with the rarest
+        needed = max(math.ceil(self.min_similarity * len(query_grams) - 1e-9), 1)
+        probe = len(query_grams) - needed + 1
+
+        shared: Dict[int, int] = {}
+        for index, gram in enumerate(query_grams):
+            posting = self._trigrams.get(gram, ())
+            if index < probe and len(shared) + len(posting) <= self.max_candidates:
+                for item_id in posting:
+                    if item_id not in exclude:
+                        shared[item_id] = shared.get(item_id, 0) + 1
+            elif index < probe and not shared:
+                # Even the rarest gram is too common to walk: take a bounded sample
+                for item_id in islice(posting, self.max_candidates):
+                    if item_id not in exclude:
+                        shared[item_id] = 1
+            else:
+                for item_id in shared:
+                    if item_id in posting:
+                        shared[item_id] += 1
+
+        scored = []
+        for item_id, count in shared.items():
+            similarity = count / (len(query_grams) + self._gram_counts[item_id] - count)
+            if similarity >= self.min_similarity:
+                scored.append((-similarity, self._keys[item_id], item_id))
+        scored.sort()
+        return [item_id for _, _, item_id in scored[:limit]]
@@ -0,0 +1,209 @@
+import asyncio
+import json
+import logging
+from typing import Awaitable, Callable, List, Optional
+
+import socketio
+from socketio.async_pubsub_manager import AsyncPubSubManager
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Postgres rejects NOTIFY payloads of 8000 bytes or more
+NOTIFY_PAYLOAD_LIMIT = 7900
+
+
+class DeliveryHookMixin:
+    """
+    Lets the application see every room emit at the point where it is
+    delivered to this process's sockets, and rewrite its payload.
+
+    `on_deliver(event, data, room)` returns the data to send. With a pub/sub
+    manager this runs on every worker as the message arrives, which is where
+    per-process state such as the replay buffer has to be kept.
+
+    With `send_queue_limit` set, room emits also skip any socket whose
+    Engine.IO send queue already holds that many packets, and report it to
+    `on_lagging(sid, room, depth)` so the application can tell it to resync or drop
+    it. Emits addressed to a single sid are never skipped.
+    """
+    on_deliver: Optional[Callable[[str, object, Optional[str]], object]] = None
+    on_lagging: Optional[Callable[[str, str, int], Awaitable[None]]] = None
+    send_queue_limit: int = 0
+
+    def _deliver(self, event, data, room):
+        if self.on_deliver is None or not isinstance(room, str):
+            return data
+        return self.on_deliver(event, data, room)
+
+    def send_queue_depth(self, eio_sid: str) -> int:
+        socket = self.server.eio.sockets.get(eio_sid)
+        return socket.queue.qsize() if socket is not None else 0
+
+    async def _lagging(self, namespace, room) -> List[str]:
+        if not self.send_queue_limit or not isinstance(room, str) or self.is_connected(room, namespace):
+            return []
+        lagging = []
+        for sid, eio_sid in list(self.get_participants(namespace, room)):
+            depth = self.send_queue_depth(eio_sid)
+            if depth >= self.send_queue_limit:
+                lagging.append(sid)
+                if self.on_lagging is not None:
+                    await self.on_lagging(sid, room, depth)
+        return lagging
+
+    @staticmethod
+    def _merge_skip(skip_sid, lagging: List[str]):
+        if not lagging:
+            return skip_sid
+        if skip_sid is None:
+            return lagging
+        return list(skip_sid if isinstance(skip_sid, list) else [skip_sid]) + lagging
+
+
+class LocalManager(DeliveryHookMixin, socketio.AsyncManager):
+    """ Single-process manager (the python-socketio default) with the delivery hook. """
+
+    async def emit(self, event, data, namespace, room=None, skip_sid=None, **kwargs):
+        data = self._deliver(event, data, room)
+        skip_sid = self._merge_skip(skip_sid, await self._lagging(namespace or '/', room))
+        return await super().emit(event, data, namespace, room=room, skip_sid=skip_sid, **kwargs)
+
+
+class PubSubDeliveryMixin(DeliveryHookMixin):
+    async def _handle_emit(self, message):
+        room = message.get('room')
+        lagging = await self._lagging(message.get('namespace') or '/', room)
+        data = message.get('data')
+        # AsyncPubSubManager.emit publishes the payload as the argument list
+        # [payload]; the hook sees the payload itself, as with LocalManager
+        if isinstance(data, list) and len(data) == 1 and not message.get('binary'):
+            data = [self._deliver(message['event'], data[0], room)]
+        else:
+            data = self._deliver(message['event'], data, room)
+        message = dict(
+            message,
+            data=data,
+            skip_sid=self._merge_skip(message.get('skip_sid'), lagging),
+        )
+        return await super()._handle_emit(message)
+
+
+class RedisManager(PubSubDeliveryMixin, socketio.AsyncRedisManager):
+    pass
+
+
+class AsyncPostgresManager(PubSubDeliveryMixin, AsyncPubSubManager):
+    """
+    Socket.IO client manager that fans emits out to every worker through
+    Postgres LISTEN/NOTIFY, so no extra infrastructure is needed beyond the
+    application database.
+
+    Messages too large for a NOTIFY payload are written to the unlogged
+    `socketio_messages` table and only their id is sent on the channel.
+    """
+    name = 'asyncpg'
+
+    def __init__(self, url: str, channel: str = 'socketio', write_only: bool = False, logger=None):
+        super().__init__(channel=channel, write_only=write_only, logger=logger)
+        # asyncpg wants a plain libpq URL, not the SQLAlchemy dialect form
+        self.dsn = url.replace('postgresql+asyncpg://', 'postgresql://')
+        self._publish_conn = None
+        self._publish_lock = asyncio.Lock()
+
+    async def _connection(self):
+        import asyncpg
+
+        if self._publish_conn is None or self._publish_conn.is_closed():
+            self._publish_conn = await asyncpg.connect(self.dsn)
+        return self._publish_conn
+
+    async def _publish(self, data):
+        # No `default=`: a payload that isn't plain JSON raises here, as it would
+        # for a local emit, instead of reaching other workers with changed types
+        payload = json.dumps(data, separators=(',', ':'))
+        async with self._publish_lock:
+            for attempt in range(2):
+                try:
+                    conn = await self._connection()
+                    if len(payload.encode()) > NOTIFY_PAYLOAD_LIMIT:
+                        ref = await conn.fetchval(
+                            "INSERT INTO socketio_messages (payload) VALUES ($1) RETURNING id", payload
+                        )
+                        await conn.execute(
+                            "DELETE FROM socketio_messages WHERE created_at < now() - interval '5 minutes'"
+                        )
+                        message = json.dumps({'ref': ref})
+                    else:
+                        message = payload
+                    await conn.execute("SELECT pg_notify($1, $2)", self.channel, message)
+                    return
+                except Exception:
+                    self._publish_conn = None
+                    if attempt:
+                        raise
+                    logger.warning("Postgres publish failed, reconnecting", exc_info=True)
+
+    async def _listen(self):
+        import asyncpg
+
+        retry_sleep = 1
+        while True:
+            queue: asyncio.Queue = asyncio.Queue()
+            conn = None
+            try:
+                conn = await asyncpg.connect(self.dsn)
+                await conn.add_listener(
+                    self.channel, lambda _conn, _pid, _channel, payload: queue.put_nowait(payload)
+                )
+                conn.add_termination_listener(lambda _conn: queue.put_nowait(None))
+                retry_sleep = 1
+                while True:
+                    payload = await queue.get()
+                    if payload is None:
+                        break
+                    message = json.loads(payload)
+                    if set(message) == {'ref'}:
+                        payload = await conn.fetchval(
+                            "SELECT payload FROM socketio_messages WHERE id = $1", message['ref']
+                        )
+                        if payload is None:
+                            continue
+                        message = json.loads(payload)
+                    yield message
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.warning("Postgres listener lost, retrying in %ss", retry_sleep, exc_info=True)
+            finally:
+                if conn is not None and not conn.is_closed():
+                    await conn.close()
+            await asyncio.sleep(retry_sleep)
+            retry_sleep = min(retry_sleep * 2, 60)
+
+
+def create_client_manager(
+    backend: Optional[str] = None, url: Optional[str] = None, channel: Optional[str] = None
+) -> socketio.AsyncManager:
+    """
+    Build the Socket.IO client manager selected by SOCKETIO_MANAGER:
+
+    * ``memory``   - rooms live in this process only (single worker)
+    * ``postgres`` - LISTEN/NOTIFY on the application database
+    * ``redis``    - any Redis-protocol server (Redis, Valkey, or the local
+      stand-in in scripts/resp_pubsub_standin.py)
+
+    All of them expose the `on_deliver` hook from DeliveryHookMixin.
+    """
+    backend = (backend or settings.SOCKETIO_MANAGER).lower()
+    channel = channel or settings.SOCKETIO_CHANNEL
+    if backend == 'memory':
+        return LocalManager()
+    if backend == 'postgres':
+        return AsyncPostgresManager(url or settings.SOCKETIO_MANAGER_URL or settings.DATABASE_URL, channel=channel)
+    if backend == 'redis':
+        return RedisManager(
+            url or settings.SOCKETIO_MANAGER_URL or 'redis://localhost:6379/0', channel=channel
+        )
+    raise ValueError(f"Unknown SOCKETIO_MANAGER '{backend}'")
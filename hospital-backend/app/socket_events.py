@@ -0,0 +1,97 @@
+import time
+import uuid
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+# Only application rooms are sequenced; per-socket rooms (the sid) are not.
+TRACKED_ROOM_PREFIXES = ('user_', 'hospital_')
+
+Event = Tuple[int, str, dict]
+
+
+class _RoomLog:
+    __slots__ = ('seq', 'events', 'touched')
+
+    def __init__(self, seq: int, size: int):
+        self.seq = seq
+        self.events: Deque[Event] = deque(maxlen=size)
+        self.touched = time.monotonic()
+
+
+class RoomEventBuffer:
+    """
+    Per-room event sequence numbers and a bounded ring buffer of recent events.
+
+    Every event delivered to a tracked room gets the next sequence number for
+    that room, stamped into its payload as `seq` together with `room` and this
+    process's `epoch`. A reconnecting client sends back the last `seq` it saw
+    per room and is replayed only what it missed.
+
+    Rooms without an event for `idle_seconds` are evicted, least recently used
+    first, as are the oldest rooms beyond `max_rooms`. A room that comes back
+    continues from the highest sequence number this process has handed out,
+    so an older `seq` never matches a different event; clients that were
+    behind when it was evicted have to resync.
+
+    Sequence numbers and the epoch are per process. With a cross-worker
+    client manager (SOCKETIO_MANAGER=postgres/redis) every worker numbers the
+    events it delivers on its own, so replay only works when a client
+    reconnects to the same worker (sticky sessions). A client whose `epoch`
+    does not match (another worker, or a restart) has to resync.
+    """
+
+    def __init__(self, size: int, idle_seconds: float = 3600, max_rooms: int = 10000):
+        self.size = size
+        self.idle_seconds = idle_seconds
+        self.max_rooms = max_rooms
+        self.epoch = uuid.uuid4().hex[:12]
+        # Least recently used first
+        self._rooms: Dict[str, _RoomLog] = {}
+        self._high_water = 0
+
+    def __len__(self) -> int:
+        return len(self._rooms)
+
+    @staticmethod
+    def is_tracked(room: Optional[str]) -> bool:
+        return isinstance(room, str) and room.startswith(TRACKED_ROOM_PREFIXES)
+
+    def _evict(self, now: float) -> None:
+        while self._rooms:
+            oldest = next(iter(self._rooms))
+            if len(self._rooms) <= self.max_rooms and now - self._rooms[oldest].touched < self.idle_seconds:
+                break
+            del self._rooms[oldest]
+
+    def record(self, room: str, event: str, data: dict) -> dict:
+        """ Sequence an event and keep it for replay. Returns the stamped payload. """
+        log = self._rooms.pop(room, None)
+        if log is None:
+            log = _RoomLog(self._high_water, self.size)
+        self._rooms[room] = log
+        log.seq += 1
+        log.touched = time.monotonic()
+        self._high_water = max(self._high_water, log.seq)
+        payload = {**data, 'seq': log.seq, 'room': room, 'epoch': self.epoch}
+        log.events.append((log.seq, event, payload))
+        self._evict(log.touched)
+        return payload
+
+    def last_seq(self, room: str) -> int:
+        log = self._rooms.get(room)
+        return log.seq if log is not None else 0
+
+    def since(self, room: str, last_seq: int) -> Optional[List[Event]]:
+        """
+        Events in `room` after `last_seq`, oldest first. None means the buffer
+        has already dropped some of them and the client must do a full resync.
+        """
+        current = self.last_seq(room)
+        if last_seq > current:
+            return None
+        if last_seq == current:
+            return []
+        events = self._rooms[room].events
+        if not events or events[0][0] > last_seq + 1:
+            return None
+        return [e for e in events if e[0] > last_seq]
@@ -1,36 +1,342 @@
+import asyncio
+import json
+import logging
+import time
+from typing import Dict, List, Optional, Tuple, Type
+from urllib.parse import parse_qs
+
 import socketio
+from jose import jwt, JWTError
+from pydantic import BaseModel, ValidationError
+
+from app.core import security
+from app.core.config import settings
+from app.crud import crud_user
+from app.db.models.user import User, UserRole
+from app.db.session import AsyncSessionLocal
+from app.metrics import metrics
+from app.schemas import token as token_schema
+from app.socket_backends import create_client_manager
+from app.event_stream import StreamHub
+from app.socket_events import RoomEventBuffer
+from app.socket_presence import PresenceRegistry, SharedPresence
+
+# With more than one uvicorn worker, set SOCKETIO_MANAGER so emits reach
+# sockets connected to every worker, not just the emitting one.
+sio = socketio.AsyncServer(
+    async_mode="asgi",
+    cors_allowed_origins="*",
+    client_manager=create_client_manager(),
+    # Compresses long-polling responses; websocket frames are compressed by
+    # the ASGI server's permessage-deflate support.
+    http_compression=settings.SOCKET_COMPRESSION,
+    compression_threshold=settings.SOCKET_COMPRESSION_THRESHOLD,
+)
+
+# Recent events per room so reconnecting clients can catch up (see `resume`)
+event_buffer = RoomEventBuffer(
+    settings.SOCKET_REPLAY_BUFFER_SIZE,
+    idle_seconds=settings.SOCKET_REPLAY_ROOM_IDLE_SECONDS,
+    max_rooms=settings.SOCKET_REPLAY_MAX_ROOMS,
+)
+# Server-Sent Events subscribers receive the same room events (see api/endpoints/stream.py)
+stream_hub = StreamHub()
+
+def _on_deliver(event, data, room):
+    metrics.inc("socket_events_delivered_total", event=event)
+    if not event_buffer.is_tracked(room) or not isinstance(data, dict):
+        return data
+    payload = event_buffer.record(room, event, data)
+    stream_hub.publish(room, event, payload)
+    return payload
+
+sio.manager.on_deliver = _on_deliver
+
+logger = logging.getLogger(__name__)
+
+# Sockets already told to resync because their send queue backed up
+_lagging_sids = set()
+
+async def _on_lagging(sid, room, depth):
+    metrics.inc("socket_lagging_skips_total")
+    if settings.SOCKET_SEND_QUEUE_DISCONNECT and depth >= settings.SOCKET_SEND_QUEUE_DISCONNECT:
+        metrics.inc("socket_lagging_disconnects_total")
+        _lagging_sids.discard(sid)
+        await sio.disconnect(sid)
+        return
+    if sid not in _lagging_sids:
+        _lagging_sids.add(sid)
+        await sio.emit('resync_required', {'room': room, 'reason': 'slow_consumer'}, to=sid)
+
+sio.manager.send_queue_limit = settings.SOCKET_SEND_QUEUE_LIMIT
+sio.manager.on_lagging = _on_lagging
+
+
+def _send_queue_depths() -> List[int]:
+    return [socket.queue.qsize() for socket in list(sio.eio.sockets.values())]
+
+# Who is connected to this worker, for online-staff queries
+presence = PresenceRegistry()
+# Cluster-wide presence for /api/users/online when emits are shared across workers
+shared_presence = (
+    SharedPresence(AsyncSessionLocal, presence, settings.SOCKET_PRESENCE_HEARTBEAT_SECONDS)
+    if settings.SOCKETIO_MANAGER.lower() != 'memory' else None
+)
+
+# Like every metric these are per worker (sockets connected to this process);
+# /api/users/online reads the cluster-wide view from shared_presence
+metrics.register_gauge("socket_connections", lambda: len(sio.eio.sockets))
+metrics.register_gauge("socket_sessions", lambda: presence.socket_count)
+metrics.register_gauge("socket_users_online", lambda: presence.user_count)
+metrics.register_gauge("sse_connections", lambda: stream_hub.subscriber_count)
+metrics.register_gauge("socket_send_queue_depth_max", lambda: max(_send_queue_depths(), default=0))
+metrics.register_gauge("socket_send_queue_depth_total", lambda: sum(_send_queue_depths()))
+metrics.register_gauge("socket_lagging_sockets", lambda: len(_lagging_sids))
+metrics.register_gauge("socket_replay_rooms", lambda: len(event_buffer))
+
+
+class EmitScheduler:
+    """
+    Coalesces room emits over a short window. The first event for a room
+    starts a SOCKET_EMIT_COALESCE_MS timer; everything emitted to that room
+    before it fires goes out as one message. A lone event is sent unchanged;
+    two or more are sent as `event_batch` with `{"events": [{"event", "data"}, ...]}`
+    in emit order. A room is flushed early once SOCKET_EMIT_BATCH_MAX events
+    are waiting. A window of 0 sends every event immediately.
+    """
+
+    def __init__(self, server: socketio.AsyncServer, window_ms: int, batch_max: int):
+        self.server = server
+        self.window = window_ms / 1000
+        self.batch_max = max(batch_max, 1)
+        self._pending: Dict[str, List[Tuple[str, dict]]] = {}
+        self._timers: Dict[str, asyncio.Task] = {}
+
+    @property
+    def pending(self) -> int:
+        return sum(len(events) for events in self._pending.values())
+
+    async def emit(self, event: str, data: dict, room: str):
+        if self.window <= 0:
+            await self.server.emit(event, data, room=room)
+            return
+        events = self._pending.setdefault(room, [])
+        events.append((event, data))
+        if len(events) >= self.batch_max:
+            await self.flush(room)
+        elif room not in self._timers:
+            self._timers[room] = asyncio.create_task(self._flush_later(room))
+
+    async def _flush_later(self, room: str):
+        await asyncio.sleep(self.window)
+        self._timers.pop(room, None)
+        try:
+            await self.flush(room)
+        except Exception:
+            logger.exception("Failed to flush socket events for %s", room)
+
+    async def flush(self, room: str):
+        timer = self._timers.pop(room, None)
+        if timer is not None and timer is not asyncio.current_task():
+            timer.cancel()
+        events = self._pending.pop(room, None)
+        if not events:
+            return
+        if len(events) == 1:
+            await self.server.emit(events[0][0], events[0][1], room=room)
+            return
+        metrics.inc("socket_event_batches_total")
+        metrics.inc("socket_events_coalesced_total", len(events))
+        await self.server.emit(
+            'event_batch',
+            {'events': [{'event': event, 'data': data} for event, data in events]},
+            room=room,
+        )
+
+    async def drain(self):
+        """ Send everything still waiting; called on shutdown. """
+        for room in list(self._pending):
+            await self.flush(room)
+
+
+emit_scheduler = EmitScheduler(sio, settings.SOCKET_EMIT_COALESCE_MS, settings.SOCKET_EMIT_BATCH_MAX)
+metrics.register_gauge("socket_emit_pending", lambda: emit_scheduler.pending)
+
+
+# Rooms are always derived server-side from the authenticated user
+def user_room(user_id: int) -> str:
+    return f'user_{user_id}'
+
+def pharmacy_room(hospital_id: int) -> str:
+    return f'hospital_{hospital_id}_pharmacy'
+
+def nurses_room(hospital_id: int) -> str:
+    return f'hospital_{hospital_id}_nurses'
+
+
+def rooms_for(user_id: int, hospital_id: Optional[int], role: str) -> List[str]:
+    rooms = [user_room(user_id)]
+    if hospital_id is not None:
+        if role == UserRole.MEDICAL_SHOP.value:
+            rooms.append(pharmacy_room(hospital_id))
+        elif role == UserRole.NURSE.value:
+            rooms.append(nurses_room(hospital_id))
+    return rooms
+
+
+async def authenticate(environ: dict, auth: Optional[dict]) -> Optional[User]:
+    """
+    Resolve the user from the access token, sent either in the Socket.IO
+    `auth` payload (`{"token": ...}`) or as a `token` query parameter.
+    """
+    token = (auth or {}).get('token')
+    if not token:
+        token = parse_qs(environ.get('QUERY_STRING', '')).get('token', [None])[0]
+    return await authenticate_token(token)
+
+
+async def authenticate_token(token: Optional[str]) -> Optional[User]:
+    """ The active user for an access token, using a short-lived session of its own. """
+    if not token:
+        return None
+    try:
+        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[security.ALGORITHM])
+        token_data = token_schema.TokenPayload(**payload)
+    except (JWTError, ValidationError):
+        return None
+    async with AsyncSessionLocal() as db:
+        user = await crud_user.user.get_by_email(db, email=token_data.sub)
+    if not user or not user.is_active:
+        return None
+    return user
+
+
+async def _enter_rooms(sid: str) -> List[str]:
+    session = await sio.get_session(sid)
+    rooms = rooms_for(session['user_id'], session['hospital_id'], session['role'])
+    for room in rooms:
+        await sio.enter_room(sid, room)
+    return rooms
 
-sio = socketio.AsyncServer(async_mode="asgi", cors_allowed_origins="*")
 
 @sio.event
-async def connect(sid, environ):
-    print(f"Socket connected: {sid}")
+async def connect(sid, environ, auth=None):
+    user = await authenticate(environ, auth)
+    if user is None:
+        metrics.inc("socket_connects_refused_total")
+        raise socketio.exceptions.ConnectionRefusedError('Could not validate credentials')
+    await sio.save_session(sid, {
+        'user_id': user.id,
+        'hospital_id': user.hospital_id,
+        'role': user.role.value,
+    })
+    rooms = await _enter_rooms(sid)
+    presence.add(sid, user.id, user.hospital_id, user.role.value)
+    if shared_presence is not None:
+        await shared_presence.add(sid, user.id, user.hospital_id, user.role.value)
+    metrics.inc("socket_connects_total", role=user.role.value)
+    logger.info(
+        "socket connected",
+        extra={"sid": sid, "user_id": user.id, "hospital_id": user.hospital_id, "rooms": rooms},
+    )
 
 @sio.event
-async def join_user_room(sid, data):
+async def join_user_room(sid, data=None):
     """
-    Client joins a room specific to their user ID to receive targeted notifications.
-    Frontend should call this after user logs in.
+    Kept for older clients. Rooms are joined on connect from the token, so any
+    `user_id` sent here is ignored.
     """
-    user_id = data.get('user_id')
-    if user_id:
-        sio.enter_room(sid, f'user_{user_id}')
-        print(f"SID {sid} joined room for user {user_id}")
+    await _enter_rooms(sid)
+
+@sio.event
+async def join_pharmacy_room(sid, data=None):
+    """ Kept for older clients; pharmacy users are placed in their hospital's room on connect. """
+    await _enter_rooms(sid)
+
 
 @sio.event
-async def join_pharmacy_room(sid, data):
-    """ A pharmacy user joins a common room to get all new prescriptions """
-    sio.enter_room(sid, 'pharmacy_queue')
-    print(f"SID {sid} joined pharmacy queue room")
+async def resume(sid, data=None):
+    """
+    Replay events missed while disconnected. The client sends
+    `{"epoch": ..., "last_seq": {room: seq}}` from the last events it saw;
+    missed events are re-sent to this socket in order, and rooms that can't
+    be replayed get a `resync_required` event. Call with no data after a
+    fresh connect to learn the current epoch and sequence numbers.
+    """
+    data = data or {}
+    _lagging_sids.discard(sid)
+    last_seqs = data.get('last_seq') or {}
+    same_epoch = data.get('epoch') == event_buffer.epoch
+    rooms = await _enter_rooms(sid)
+
+    resync = []
+    for room in rooms:
+        if room not in last_seqs:
+            continue
+        missed = event_buffer.since(room, int(last_seqs[room])) if same_epoch else None
+        if missed is None:
+            resync.append(room)
+            await sio.emit('resync_required', {'room': room}, to=sid)
+            continue
+        for _, event, payload in missed:
+            await sio.emit(event, payload, to=sid)
+
+    return {
+        'epoch': event_buffer.epoch,
+        'seq': {room: event_buffer.last_seq(room) for room in rooms},
+        'resync': resync,
+    }
 
 
 @sio.event
 async def disconnect(sid):
-    print(f"Socket disconnected: {sid}")
+    _lagging_sids.discard(sid)
+    session = presence.remove(sid)
+    if shared_presence is not None and session is not None:
+        await shared_presence.remove(sid)
+    metrics.inc("socket_disconnects_total")
+    if session is not None:
+        logger.info(
+            "socket disconnected",
+            extra={
+                "sid": sid,
+                "user_id": session.user_id,
+                "connected_seconds": round(time.time() - session.connected_at, 1),
+            },
+        )
+
+def event_payload(key: str, schema: Type[BaseModel], obj, **summary) -> dict:
+    """
+    Build an event payload carrying the full serialized `obj` under `key`, so
+    clients can update their state without refetching. Serialize once per
+    event and emit the result to a room; never serialize per recipient.
+    If the entity is larger than SOCKET_EVENT_MAX_PAYLOAD_BYTES only the
+    `summary` fields are sent, with `truncated: true` so the client knows to fetch.
+    """
+    entity = schema.model_validate(obj).model_dump(mode="json")
+    limit = settings.SOCKET_EVENT_MAX_PAYLOAD_BYTES
+    if limit and len(json.dumps(entity, separators=(",", ":"))) > limit:
+        return {**summary, "truncated": True}
+    return {**summary, key: entity}
+
 
-# Helper to emit notifications
+async def online_user_ids(hospital_id: int, role: Optional[UserRole] = None) -> List[int]:
+    """
+    Users of `hospital_id` (optionally of one role) with a socket open on any
+    worker. With the in-memory manager there is only one worker to ask.
+    """
+    role_value = role.value if role is not None else None
+    if shared_presence is not None:
+        return await shared_presence.online_user_ids(hospital_id, role_value)
+    return presence.online_user_ids(hospital_id, role_value)
+
+
+# Helpers to emit notifications; delivery is coalesced per room by emit_scheduler
 async def notify_user(user_id: int, event: str, data: dict):
-    await sio.emit(event, data, room=f'user_{user_id}')
+    await emit_scheduler.emit(event, data, user_room(user_id))
+
+async def notify_pharmacy(hospital_id: int, event: str, data: dict):
+    await emit_scheduler.emit(event, data, pharmacy_room(hospital_id))
 
-async def notify_pharmacy(event: str, data: dict):
-    await sio.emit(event, data, room='pharmacy_queue')
\ No newline at end of file
+async def notify_nurses(hospital_id: int, event: str, data: dict):
+    await emit_scheduler.emit(event, data, nurses_room(hospital_id))
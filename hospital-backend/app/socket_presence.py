@@ -0,0 +1,192 @@
+import asyncio
+import logging
+import time
+import uuid
+from collections import defaultdict
+from typing import Dict, List, NamedTuple, Optional, Set
+
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+
+class SocketSession(NamedTuple):
+    user_id: int
+    hospital_id: Optional[int]
+    role: str
+    connected_at: float
+
+
+class PresenceRegistry:
+    """
+    Which users have a socket open on this process, indexed by user and by
+    (hospital, role), e.g. "which pharmacists of hospital 3 are online".
+
+    A user with several tabs open has several sockets and stays online until
+    the last one disconnects. This registry is per process: with more than
+    one worker each one only knows about the sockets connected to it, so
+    cross-worker questions go to SharedPresence.
+    """
+
+    def __init__(self):
+        self._sessions: Dict[str, SocketSession] = {}
+        self._by_user: Dict[int, Set[str]] = defaultdict(set)
+        self._by_group: Dict[tuple, Set[int]] = defaultdict(set)
+
+    def add(self, sid: str, user_id: int, hospital_id: Optional[int], role: str):
+        self._sessions[sid] = SocketSession(user_id, hospital_id, role, time.time())
+        self._by_user[user_id].add(sid)
+        self._by_group[(hospital_id, role)].add(user_id)
+
+    def remove(self, sid: str) -> Optional[SocketSession]:
+        session = self._sessions.pop(sid, None)
+        if session is None:
+            return None
+        sids = self._by_user[session.user_id]
+        sids.discard(sid)
+        if not sids:
+            del self._by_user[session.user_id]
+            group = self._by_group[(session.hospital_id, session.role)]
+            group.discard(session.user_id)
+            if not group:
+                del self._by_group[(session.hospital_id, session.role)]
+        return session
+
+    def sessions(self) -> Dict[str, SocketSession]:
+        return dict(self._sessions)
+
+    def is_online(self, user_id: int) -> bool:
+        return user_id in self._by_user
+
+    def online_user_ids(self, hospital_id: int, role: Optional[str] = None) -> List[int]:
+        if role is not None:
+            return sorted(self._by_group.get((hospital_id, role), ()))
+        return sorted({
+            user_id
+            for (group_hospital, _), user_ids in self._by_group.items()
+            if group_hospital == hospital_id
+            for user_id in user_ids
+        })
+
+    @property
+    def socket_count(self) -> int:
+        return len(self._sessions)
+
+    @property
+    def user_count(self) -> int:
+        return len(self._by_user)
+
+
+class SharedPresence:
+    """
+    Presence across all workers, for the cross-worker client managers. Kept in
+    two unlogged tables of the application database: `socket_workers` (one
+    row per worker, heartbeated every `heartbeat_seconds`) and
+    `socket_sessions` (one row per open socket, deleted with its worker).
+
+    Readers only count sockets of workers seen within three heartbeats, and
+    every heartbeat deletes workers that have been silent longer than that, so
+    the sockets of a crashed worker disappear on their own. A worker that
+    finds it was reaped (e.g. after a long stall) registers again with the
+    sockets it still holds.
+    """
+
+    def __init__(self, session_factory, local: PresenceRegistry, heartbeat_seconds: float):
+        self.session_factory = session_factory
+        self.local = local
+        self.heartbeat_seconds = heartbeat_seconds
+        self.worker_id = uuid.uuid4().hex
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def _stale_after(self) -> str:
+        return f"{int(self.heartbeat_seconds * 3)} seconds"
+
+    async def _register(self, db) -> None:
+        await db.execute(
+            text("INSERT INTO socket_workers (worker_id) VALUES (:worker_id) ON CONFLICT (worker_id) "
+                 "DO UPDATE SET last_seen = now()"),
+            {"worker_id": self.worker_id},
+        )
+        sessions = self.local.sessions()
+        if sessions:
+            await db.execute(
+                text("INSERT INTO socket_sessions (sid, worker_id, user_id, hospital_id, role) "
+                     "VALUES (:sid, :worker_id, :user_id, :hospital_id, :role) ON CONFLICT (sid) DO NOTHING"),
+                [
+                    {"sid": sid, "worker_id": self.worker_id, "user_id": s.user_id,
+                     "hospital_id": s.hospital_id, "role": s.role}
+                    for sid, s in sessions.items()
+                ],
+            )
+
+    async def start(self) -> None:
+        async with self.session_factory() as db:
+            await self._register(db)
+            await db.commit()
+        self._task = asyncio.create_task(self._heartbeat())
+
+    async def _heartbeat(self):
+        while True:
+            await asyncio.sleep(self.heartbeat_seconds)
+            try:
+                async with self.session_factory() as db:
+                    result = await db.execute(
+                        text("UPDATE socket_workers SET last_seen = now() WHERE worker_id = :worker_id"),
+                        {"worker_id": self.worker_id},
+                    )
+                    if result.rowcount == 0:
+                        await self._register(db)
+                    await db.execute(
+                        text(f"DELETE FROM socket_workers WHERE last_seen < now() - interval '{self._stale_after}'")
+                    )
+                    await db.commit()
+            except Exception:
+                logger.exception("Socket presence heartbeat failed")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        async with self.session_factory() as db:
+            await db.execute(
+                text("DELETE FROM socket_workers WHERE worker_id = :worker_id"), {"worker_id": self.worker_id}
+            )
+            await db.commit()
+
+    async def add(self, sid: str, user_id: int, hospital_id: Optional[int], role: str) -> None:
+        try:
+            async with self.session_factory() as db:
+                await db.execute(
+                    text("INSERT INTO socket_sessions (sid, worker_id, user_id, hospital_id, role) "
+                         "VALUES (:sid, :worker_id, :user_id, :hospital_id, :role) ON CONFLICT (sid) DO NOTHING"),
+                    {"sid": sid, "worker_id": self.worker_id, "user_id": user_id,
+                     "hospital_id": hospital_id, "role": role},
+                )
+                await db.commit()
+        except Exception:
+            # The heartbeat re-registers this worker's sockets if it was reaped;
+            # a failed insert here only hides one socket until then
+            logger.exception("Failed to record socket presence for %s", sid)
+
+    async def remove(self, sid: str) -> None:
+        try:
+            async with self.session_factory() as db:
+                await db.execute(text("DELETE FROM socket_sessions WHERE sid = :sid"), {"sid": sid})
+                await db.commit()
+        except Exception:
+            logger.exception("Failed to clear socket presence for %s", sid)
+
+    async def online_user_ids(self, hospital_id: int, role: Optional[str] = None) -> List[int]:
+        query = (
+            "SELECT DISTINCT s.user_id FROM socket_sessions AS s "
+            "JOIN socket_workers AS w ON w.worker_id = s.worker_id "
+            f"WHERE s.hospital_id = :hospital_id AND w.last_seen > now() - interval '{self._stale_after}'"
+        )
+        params = {"hospital_id": hospital_id}
+        if role is not None:
+            query += " AND s.role = :role"
+            params["role"] = role
+        async with self.session_factory() as db:
+            result = await db.execute(text(query + " ORDER BY s.user_id"), params)
+            return list(result.scalars().all())
@@ -0,0 +1,116 @@
+# scripts/bench_patient_search.py
+#
+# Compares patient-search latency before and after the trigram indexes:
+# the old `ilike '%term%'` on name OR phone ordered by name, against
+# `crud.patient.apply_search`. Seeds a synthetic patient population into a
+# scratch hospital of the database in .env, then times both query forms for
+# a mix of name fragments, misspellings and phone fragments.
+#
+#   alembic upgrade head
+#   python scripts/bench_patient_search.py --hospital-id 99 --seed 1000000
+#
+# Seeded patients are deleted at the end unless --keep is given; the run
+# refuses to seed into a hospital that already has patients.
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import select, or_, func, delete, text
+
+from app import crud
+from app.db import models
+from app.db.session import AsyncSessionLocal, engine
+
+FIRST_NAMES = ['Aarav', 'Vivaan', 'Aditya', 'Priya', 'Ananya', 'Diya', 'Rahul', 'Sneha', 'Karthik',
+               'Lakshmi', 'Vasanth', 'Meena', 'Arjun', 'Kavya', 'Suresh', 'Divya', 'Ravi', 'Pooja']
+LAST_NAMES = ['Sharma', 'Iyer', 'Reddy', 'Nair', 'Kumar', 'Patel', 'Menon', 'Rao', 'Pillai',
+              'Gupta', 'Krishnan', 'Subramanian', 'Das', 'Mehta', 'Joshi', 'Verma']
+TERMS = ['priya', 'kumar', 'lakshmi nai', 'subramaniam', 'vasnth', 'arj', '98765', '0001234', '+91 90000']
+
+
+async def seed(hospital_id: int, count: int):
+    async with AsyncSessionLocal() as db:
+        await db.execute(
+            text(
+                """
+                INSERT INTO patients (full_name, phone_number, hospital_id)
+                SELECT ((:first)::text[])[1 + (i * 7919) % cardinality((:first)::text[])]
+                       || ' ' || ((:last)::text[])[1 + (i * 104729) % cardinality((:last)::text[])]
+                       || ' ' || substr(md5(i::text), 1, 4),
+                       '9' || lpad(i::text, 9, '0'),
+                       :hospital_id
+                FROM generate_series(1, :count) AS i
+                """
+            ),
+            {'first': FIRST_NAMES, 'last': LAST_NAMES, 'hospital_id': hospital_id, 'count': count},
+        )
+        await db.commit()
+        await db.execute(text('ANALYZE patients'))
+
+
+def old_query(hospital_id: int, term: str):
+    pattern = f'%{term}%'
+    return (
+        select(models.Patient)
+        .filter(models.Patient.hospital_id == hospital_id)
+        .filter(or_(models.Patient.full_name.ilike(pattern), models.Patient.phone_number.ilike(pattern)))
+        .order_by(models.Patient.full_name)
+        .limit(100)
+    )
+
+
+def new_query(hospital_id: int, term: str):
+    query = select(models.Patient).filter(models.Patient.hospital_id == hospital_id)
+    return crud.patient.apply_search(query, term).limit(100)
+
+
+async def time_query(build, hospital_id: int, runs: int):
+    timings = []
+    async with AsyncSessionLocal() as db:
+        for term in TERMS:
+            await db.execute(build(hospital_id, term))  # warm up
+            for _ in range(runs):
+                started = time.perf_counter()
+                (await db.execute(build(hospital_id, term))).scalars().all()
+                timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return statistics.median(timings), timings[int(len(timings) * 0.95) - 1]
+
+
+async def main(args):
+    async with AsyncSessionLocal() as db:
+        existing = await db.scalar(
+            select(func.count(models.Patient.id)).filter(models.Patient.hospital_id == args.hospital_id)
+        )
+    if args.seed and existing:
+        sys.exit(f"Hospital {args.hospital_id} already has {existing} patients; use a scratch hospital.")
+
+    try:
+        if args.seed:
+            started = time.perf_counter()
+            await seed(args.hospital_id, args.seed)
+            print(f"seeded {args.seed} patients in {time.perf_counter() - started:.1f}s")
+
+        for label, build in (('before (ilike, seq scan)', old_query), ('after (trigram GIN)', new_query)):
+            p50, p95 = await time_query(build, args.hospital_id, args.runs)
+            print(f"{label:26} p50={p50:7.1f}ms p95={p95:7.1f}ms over {len(TERMS) * args.runs} queries")
+    finally:
+        if args.seed and not args.keep:
+            async with AsyncSessionLocal() as db:
+                await db.execute(delete(models.Patient).filter(models.Patient.hospital_id == args.hospital_id))
+                await db.commit()
+        await engine.dispose()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Patient search latency, before and after trigram indexes')
+    parser.add_argument('--hospital-id', type=int, required=True)
+    parser.add_argument('--seed', type=int, default=1000000, help='Synthetic patients to create (0 = use existing)')
+    parser.add_argument('--runs', type=int, default=10, help='Runs per search term')
+    parser.add_argument('--keep', action='store_true', help='Keep the seeded patients')
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,121 @@
+# scripts/bench_socketio_workers.py
+#
+# Measures cross-worker emit throughput and delivery latency for a
+# SOCKETIO_MANAGER backend. Starts N single-process Socket.IO servers (one per
+# port, standing in for uvicorn workers), connects clients spread across all of
+# them, then has worker 0 emit a burst to a shared room.
+#
+#   python scripts/resp_pubsub_standin.py --port 6390 &
+#   python scripts/bench_socketio_workers.py --backend redis --url redis://localhost:6390/0
+#   python scripts/bench_socketio_workers.py --backend postgres
+#
+# Run from the hospital-backend directory so .env is picked up.
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+BENCH_ROOM = 'bench'
+BENCH_CHANNEL = 'socketio_bench'
+
+
+def serve(args):
+    import socketio
+    import uvicorn
+    from app.socket_backends import create_client_manager
+
+    sio = socketio.AsyncServer(
+        async_mode='asgi',
+        client_manager=create_client_manager(args.backend, args.url, BENCH_CHANNEL),
+    )
+
+    @sio.event
+    async def connect(sid, environ, auth=None):
+        await sio.enter_room(sid, BENCH_ROOM)
+
+    @sio.event
+    async def burst(sid, data):
+        started = time.perf_counter()
+        for i in range(data['count']):
+            await sio.emit('tick', {'i': i, 't': time.time(), 'pad': 'x' * data['size']}, room=BENCH_ROOM)
+        return time.perf_counter() - started
+
+    uvicorn.run(socketio.ASGIApp(sio), host='127.0.0.1', port=args.port, log_level='warning')
+
+
+async def drive(args):
+    import socketio
+
+    ports = [args.base_port + i for i in range(args.workers)]
+    workers = [
+        subprocess.Popen([
+            sys.executable, __file__, '--serve', '--port', str(port),
+            '--backend', args.backend, *(['--url', args.url] if args.url else []),
+        ])
+        for port in ports
+    ]
+    try:
+        await asyncio.sleep(3)
+        latencies, done = [], asyncio.Event()
+        expected = args.count * args.workers * args.clients
+
+        clients = []
+        for port in ports:
+            for _ in range(args.clients):
+                client = socketio.AsyncClient()
+
+                @client.on('tick')
+                async def on_tick(data):
+                    latencies.append(time.time() - data['t'])
+                    if len(latencies) >= expected:
+                        done.set()
+
+                await client.connect(f'http://127.0.0.1:{port}', transports=['websocket'])
+                clients.append(client)
+        await asyncio.sleep(1)
+
+        started = time.perf_counter()
+        emit_seconds = await clients[0].call('burst', {'count': args.count, 'size': args.size}, timeout=120)
+        try:
+            await asyncio.wait_for(done.wait(), timeout=60)
+        except asyncio.TimeoutError:
+            pass
+        elapsed = time.perf_counter() - started
+
+        latencies.sort()
+        received = len(latencies)
+        print(f"backend={args.backend} workers={args.workers} clients={len(clients)} "
+              f"emits={args.count} payload={args.size}B")
+        print(f"emit rate on origin: {args.count / emit_seconds:.0f}/s")
+        print(f"delivered {received}/{expected} in {elapsed:.2f}s ({received / elapsed:.0f} msg/s)")
+        if latencies:
+            p = lambda q: latencies[min(int(received * q), received - 1)] * 1000
+            print(f"latency p50={p(0.5):.1f}ms p95={p(0.95):.1f}ms p99={p(0.99):.1f}ms")
+
+        for client in clients:
+            await client.disconnect()
+    finally:
+        for worker in workers:
+            worker.terminate()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Cross-worker Socket.IO emit benchmark')
+    parser.add_argument('--backend', default='postgres', choices=['postgres', 'redis', 'memory'])
+    parser.add_argument('--url', default=None)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--clients', type=int, default=5, help='Clients per worker')
+    parser.add_argument('--count', type=int, default=1000, help='Emits in the burst')
+    parser.add_argument('--size', type=int, default=200, help='Payload padding in bytes')
+    parser.add_argument('--base-port', type=int, default=8100)
+    parser.add_argument('--serve', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--port', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.serve:
+        serve(args)
+    else:
+        asyncio.run(drive(args))
@@ -0,0 +1,102 @@
+# scripts/bench_sse_idle.py
+#
+# Opens many idle Server-Sent Events connections against a running API worker
+# and holds them, to check how many one worker sustains and what each costs.
+# Reports connections established, heartbeats received while idle, and the
+# worker's resident memory before and after (pass its pid with --pid).
+#
+#   uvicorn app.main:app --port 8000 &
+#   ulimit -n 20000
+#   python scripts/bench_sse_idle.py --token <access token> --connections 5000 --pid $!
+#
+# Use SSE_HEARTBEAT_SECONDS=5 on the server for a shorter run.
+import argparse
+import asyncio
+import time
+from urllib.parse import urlencode, urlsplit
+
+
+def rss_kib(pid):
+    if not pid:
+        return None
+    with open(f'/proc/{pid}/status') as status:
+        for line in status:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1])
+    return None
+
+
+async def open_stream(host, port, path):
+    reader, writer = await asyncio.open_connection(host, port)
+    writer.write(
+        f"GET {path} HTTP/1.1\r\nHost: {host}\r\nAccept: text/event-stream\r\n\r\n".encode()
+    )
+    await writer.drain()
+    status_line = await reader.readline()
+    if b' 200 ' not in status_line:
+        writer.close()
+        raise ConnectionError(status_line.decode().strip())
+    while (await reader.readline()) not in (b'\r\n', b''):
+        pass
+    return reader, writer
+
+
+async def hold(reader, deadline, heartbeats):
+    while True:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return
+        try:
+            chunk = await asyncio.wait_for(reader.read(4096), timeout=remaining)
+        except asyncio.TimeoutError:
+            return
+        if not chunk:
+            return
+        heartbeats[0] += chunk.count(b': keepalive')
+
+
+async def main(args):
+    url = urlsplit(args.url)
+    path = f"{url.path or '/'}?{urlencode({'token': args.token})}"
+    before = rss_kib(args.pid)
+
+    semaphore = asyncio.Semaphore(args.concurrency)
+    streams, failures = [], []
+
+    async def connect():
+        async with semaphore:
+            try:
+                streams.append(await open_stream(url.hostname, url.port or 80, path))
+            except (OSError, ConnectionError) as exc:
+                failures.append(str(exc))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(connect() for _ in range(args.connections)))
+    connect_seconds = time.perf_counter() - started
+    print(f"connected {len(streams)}/{args.connections} in {connect_seconds:.1f}s "
+          f"({len(failures)} failed{': ' + failures[0] if failures else ''})")
+
+    heartbeats = [0]
+    deadline = time.monotonic() + args.hold
+    await asyncio.gather(*(hold(reader, deadline, heartbeats) for reader, _ in streams))
+    after = rss_kib(args.pid)
+
+    print(f"held for {args.hold}s, {heartbeats[0]} heartbeats "
+          f"({heartbeats[0] / max(len(streams), 1):.1f} per connection)")
+    if before is not None and after is not None:
+        print(f"worker RSS {before / 1024:.1f} MiB -> {after / 1024:.1f} MiB "
+              f"(~{(after - before) / max(len(streams), 1):.1f} KiB per connection)")
+
+    for _, writer in streams:
+        writer.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Idle SSE connection benchmark')
+    parser.add_argument('--url', default='http://127.0.0.1:8000/api/stream/pharmacy')
+    parser.add_argument('--token', required=True, help='Access token of a medical shop (or doctor) user')
+    parser.add_argument('--connections', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=200, help='Connections opened at once')
+    parser.add_argument('--hold', type=int, default=35, help='Seconds to keep the connections idle')
+    parser.add_argument('--pid', type=int, default=None, help='Worker pid for memory readings')
+    asyncio.run(main(parser.parse_args()))
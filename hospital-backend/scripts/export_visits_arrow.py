@@ -0,0 +1,239 @@
+# scripts/export_visits_arrow.py
+#
+# Exports one hospital's appointments (with their visit) and prescription line
+# items, de-identified, to Parquet or Arrow IPC files for the analytics team,
+# against the database in .env. Needs pyarrow (`pip install pyarrow`), which
+# the API itself does not.
+#
+#   python scripts/export_visits_arrow.py --hospital-id 3 --out exports/
+#   python scripts/export_visits_arrow.py --hospital-id 3 --out exports/ --start 2026-01-01 --end 2026-06-30 --full
+#
+# Layout: <out>/hospital_<id>/<table>/month=YYYY-MM/part-<run>.parquet
+#
+# De-identification: no names, phone numbers or free-text notes are exported.
+# Patients appear as patient_key, a keyed md5 of the patient id that is stable
+# across runs (EXPORT_PSEUDONYM_KEY, else SECRET_KEY), with age at the time of
+# the appointment capped at 90, and sex.
+#
+# Incremental: each run records a watermark in <out>/hospital_<id>/_watermark.json
+# and the next run exports rows whose updated_at is past the watermark minus
+# --overlap-minutes (--full ignores it). updated_at is its transaction's start
+# time, so a write that started before the watermark but committed after the
+# export read its snapshot lands just below it; the overlap picks it up.
+# Rows in the overlap are written again in a later part file, as are changed
+# rows, so readers should keep the latest updated_at per id.
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+except ImportError:  # only this script needs it
+    pa = None
+
+from sqlalchemy import select, func, cast, or_, String, Integer, literal
+from sqlalchemy.orm import aliased
+
+from app.core.config import settings
+from app.db import models
+from app.db.session import AsyncSessionLocal, engine
+
+
+def patient_key(patient_id_column):
+    key = settings.EXPORT_PSEUDONYM_KEY or settings.SECRET_KEY
+    return func.md5(func.concat(literal(key), ':', patient_id_column))
+
+
+def appointments_query(hospital_id, start, end, since, until):
+    a, v, p = models.Appointment, models.Visit, models.Patient
+    updated_at = func.greatest(a.updated_at, v.updated_at)
+    query = (
+        select(
+            a.id.label('appointment_id'),
+            func.to_char(a.appointment_time, 'YYYY-MM').label('month'),
+            a.appointment_time,
+            cast(a.status, String).label('status'),
+            a.doctor_id,
+            patient_key(a.patient_id).label('patient_key'),
+            cast(func.least(func.date_part('year', func.age(a.appointment_time, p.date_of_birth)), 90), Integer)
+            .label('patient_age'),
+            p.sex.label('patient_sex'),
+            v.id.label('visit_id'),
+            updated_at.label('updated_at'),
+        )
+        .join(p, p.id == a.patient_id)
+        .outerjoin(v, v.appointment_id == a.id)
+        .filter(p.hospital_id == hospital_id, updated_at <= until)
+        .order_by('month', a.id)
+    )
+    if start:
+        query = query.filter(a.appointment_time >= start)
+    if end:
+        query = query.filter(a.appointment_time < end + timedelta(days=1))
+    if since:
+        query = query.filter(or_(a.updated_at > since, v.updated_at > since))
+    return query
+
+
+def line_items_query(hospital_id, start, end, since, until):
+    rx, line = models.Prescription, models.PrescriptionLineItem
+    visit = aliased(models.Visit)
+    query = (
+        select(
+            line.id.label('line_item_id'),
+            func.to_char(rx.created_at, 'YYYY-MM').label('month'),
+            rx.id.label('prescription_id'),
+            visit.appointment_id,
+            rx.created_at.label('prescribed_at'),
+            rx.doctor_id,
+            patient_key(rx.patient_id).label('patient_key'),
+            cast(rx.status, String).label('prescription_status'),
+            line.medicine_id,
+            line.medicine_name,
+            line.dose,
+            line.frequency,
+            line.duration_days,
+            cast(line.status, String).label('line_status'),
+            rx.updated_at,
+        )
+        .join(line, line.prescription_id == rx.id)
+        .outerjoin(visit, visit.id == rx.visit_id)
+        .filter(rx.hospital_id == hospital_id, rx.updated_at <= until)
+        .order_by('month', line.id)
+    )
+    if start:
+        query = query.filter(rx.created_at >= start)
+    if end:
+        query = query.filter(rx.created_at < end + timedelta(days=1))
+    if since:
+        query = query.filter(rx.updated_at > since)
+    return query
+
+
+def schemas():
+    utc = pa.timestamp('us', tz='UTC')
+    return {
+        'appointments': pa.schema([
+            ('appointment_id', pa.int64()), ('month', pa.string()), ('appointment_time', utc),
+            ('status', pa.string()), ('doctor_id', pa.int64()), ('patient_key', pa.string()),
+            ('patient_age', pa.int32()), ('patient_sex', pa.string()), ('visit_id', pa.int64()),
+            ('updated_at', utc),
+        ]),
+        'line_items': pa.schema([
+            ('line_item_id', pa.int64()), ('month', pa.string()), ('prescription_id', pa.int64()),
+            ('appointment_id', pa.int64()), ('prescribed_at', pa.timestamp('us')), ('doctor_id', pa.int64()),
+            ('patient_key', pa.string()), ('prescription_status', pa.string()), ('medicine_id', pa.int64()),
+            ('medicine_name', pa.string()), ('dose', pa.string()), ('frequency', pa.string()),
+            ('duration_days', pa.int32()), ('line_status', pa.string()), ('updated_at', pa.timestamp('us')),
+        ]),
+    }
+
+
+class MonthWriters:
+    """ One open file per month partition of a table, created on first write. """
+
+    def __init__(self, root, table, schema, file_format, run_id):
+        self.root, self.table, self.schema = root, table, schema
+        self.file_format, self.run_id = file_format, run_id
+        self.writers = {}
+        self.rows = 0
+
+    def _writer(self, month):
+        if month not in self.writers:
+            directory = os.path.join(self.root, self.table, f'month={month}')
+            os.makedirs(directory, exist_ok=True)
+            path = os.path.join(directory, f'part-{self.run_id}.{self.file_format}')
+            if self.file_format == 'parquet':
+                self.writers[month] = pq.ParquetWriter(path, self.schema, compression='zstd')
+            else:
+                self.writers[month] = pa.ipc.new_file(path, self.schema)
+        return self.writers[month]
+
+    def write(self, rows):
+        # Column-wise: one array per column for the whole cursor batch, then
+        # one filtered slice per month in it
+        columns = list(zip(*rows))
+        batch = pa.RecordBatch.from_arrays(
+            [pa.array(values, type=field.type) for values, field in zip(columns, self.schema)],
+            schema=self.schema,
+        )
+        for month in pc.unique(batch.column('month')).to_pylist():
+            part = batch.filter(pc.equal(batch.column('month'), month))
+            self._writer(month).write_table(pa.Table.from_batches([part]))
+        self.rows += batch.num_rows
+
+    def close(self):
+        for writer in self.writers.values():
+            writer.close()
+
+
+async def export_table(query, writers, chunk_size):
+    async with AsyncSessionLocal() as db:
+        result = await db.stream(query.execution_options(yield_per=chunk_size))
+        async for rows in result.partitions():
+            writers.write(rows)
+
+
+async def main(args):
+    if pa is None:
+        sys.exit('pyarrow is required for this export: pip install pyarrow')
+
+    root = os.path.join(args.out, f'hospital_{args.hospital_id}')
+    watermark_path = os.path.join(root, '_watermark.json')
+    watermark = {}
+    if not args.full and os.path.exists(watermark_path):
+        with open(watermark_path) as f:
+            watermark = json.load(f)
+
+    try:
+        # Upper bounds from the database clock; prescriptions.updated_at has no time zone
+        async with AsyncSessionLocal() as db:
+            until_tz, until_local = (await db.execute(select(func.now(), func.localtimestamp()))).one()
+
+        run_id = until_tz.strftime('%Y%m%dT%H%M%S')
+        tables = {
+            'appointments': (appointments_query, until_tz),
+            'line_items': (line_items_query, until_local),
+        }
+        for table, (build, until) in tables.items():
+            since = None
+            if table in watermark:
+                since = datetime.fromisoformat(watermark[table]) - timedelta(minutes=args.overlap_minutes)
+            writers = MonthWriters(root, table, schemas()[table], args.format, run_id)
+            started = time.perf_counter()
+            try:
+                query = build(args.hospital_id, args.start, args.end, since, until)
+                await export_table(query, writers, args.chunk_size)
+            finally:
+                writers.close()
+            print(f"  {table}: {writers.rows} rows into {len(writers.writers)} month partitions "
+                  f"in {time.perf_counter() - started:.1f}s")
+
+        # Only advanced once everything above was written
+        os.makedirs(root, exist_ok=True)
+        with open(watermark_path, 'w') as f:
+            json.dump({'appointments': until_tz.isoformat(), 'line_items': until_local.isoformat()}, f)
+    finally:
+        await engine.dispose()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='De-identified columnar export of visit data')
+    parser.add_argument('--hospital-id', type=int, required=True)
+    parser.add_argument('--out', required=True, help='Output directory')
+    parser.add_argument('--start', type=date.fromisoformat, default=None, help='First day (YYYY-MM-DD)')
+    parser.add_argument('--end', type=date.fromisoformat, default=None, help='Last day, inclusive')
+    parser.add_argument('--format', choices=['parquet', 'arrow'], default='parquet')
+    parser.add_argument('--full', action='store_true', help='Ignore the watermark and export everything')
+    parser.add_argument('--overlap-minutes', type=float, default=15,
+                        help='Re-export rows updated this long before the watermark (longer than any transaction)')
+    parser.add_argument('--chunk-size', type=int, default=10000, help='Rows per server-side cursor batch')
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,54 @@
+# scripts/find_duplicate_patients.py
+#
+# Scans hospitals for likely duplicate patients (see
+# crud.patient_duplicate.scan) against the database in .env, one transaction
+# per hospital. Pairs are stored as pending for review in
+# GET /api/patients/duplicates; pairs already dismissed stay dismissed.
+#
+#   python scripts/find_duplicate_patients.py
+#   python scripts/find_duplicate_patients.py --hospital-id 3 --min-score 0.7
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import select
+
+from app import crud
+from app.db import models
+from app.db.session import AsyncSessionLocal, engine
+
+
+async def main(args):
+    try:
+        async with AsyncSessionLocal() as db:
+            query = select(models.Hospital.id).order_by(models.Hospital.id)
+            if args.hospital_id:
+                query = query.filter(models.Hospital.id == args.hospital_id)
+            hospital_ids = (await db.execute(query)).scalars().all()
+
+        total = 0
+        for hospital_id in hospital_ids:
+            started = time.perf_counter()
+            async with AsyncSessionLocal() as db:
+                found = await crud.patient_duplicate.scan(
+                    db, hospital_id=hospital_id, min_score=args.min_score, max_block=args.max_block
+                )
+                await db.commit()
+            total += found
+            print(f"  hospital {hospital_id}: {found} candidate pairs in {time.perf_counter() - started:.1f}s")
+    finally:
+        await engine.dispose()
+    print(f"Done: {total} candidate pairs across {len(hospital_ids)} hospitals")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Find likely duplicate patients')
+    parser.add_argument('--hospital-id', type=int, default=None, help='Only scan this hospital')
+    parser.add_argument('--min-score', type=float, default=0.55, help='Lowest score kept as a candidate (0..1)')
+    parser.add_argument('--max-block', type=int, default=50,
+                        help='Skip phone/name blocks larger than this instead of comparing them pairwise')
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,121 @@
+# scripts/load_test_pharmacy_claims.py
+#
+# Simulates several pharmacists draining the same hospital queue concurrently
+# through `crud.prescription.claim_next`, against the database in .env.
+#
+#   python scripts/load_test_pharmacy_claims.py --hospital-id 1 --seed 2000 --workers 8
+#
+# Use a scratch hospital: the run refuses to start if the queue already has
+# work in it, and seeded prescriptions are deleted again at the end.
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import select, update, delete, insert
+
+from app import crud
+from app.db import models
+from app.db.models.prescription import PrescriptionStatus
+from app.db.session import AsyncSessionLocal, engine
+
+
+async def seed_prescriptions(hospital_id: int, count: int) -> list:
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            insert(models.Prescription)
+            .values([{"hospital_id": hospital_id} for _ in range(count)])
+            .returning(models.Prescription.id)
+        )
+        ids = result.scalars().all()
+        await db.commit()
+        return ids
+
+
+async def pharmacist(user_id: int, hospital_id: int, batch: int, lease: int, claimed: list, latencies: list):
+    async with AsyncSessionLocal() as db:
+        while True:
+            started = time.perf_counter()
+            prescriptions = await crud.prescription.claim_next(
+                db, hospital_id=hospital_id, user_id=user_id, limit=batch, lease_seconds=lease
+            )
+            latencies.append(time.perf_counter() - started)
+            if not prescriptions:
+                return
+            ids = [p.id for p in prescriptions]
+            claimed.extend((user_id, pid) for pid in ids)
+            # "Dispense" the claimed work so it leaves the queue
+            await db.execute(
+                update(models.Prescription)
+                .where(models.Prescription.id.in_(ids))
+                .values(
+                    status=PrescriptionStatus.FULLY_DISPENSED,
+                    claimed_by_id=None,
+                    claim_expires_at=None,
+                )
+            )
+            await db.commit()
+
+
+async def main(args):
+    async with AsyncSessionLocal() as db:
+        user_ids = (await db.execute(
+            select(models.User.id).filter(
+                models.User.hospital_id == args.hospital_id,
+                models.User.role == models.UserRole.MEDICAL_SHOP,
+            )
+        )).scalars().all()
+        pending = (await db.execute(
+            select(models.Prescription.id).filter(
+                models.Prescription.hospital_id == args.hospital_id,
+                models.Prescription.status.in_(crud.crud_prescription.QUEUE_STATUSES),
+            ).limit(1)
+        )).first()
+    if not user_ids:
+        print(f"No medical_shop users in hospital {args.hospital_id}. Aborting.")
+        return
+    if pending:
+        print(f"Hospital {args.hospital_id} already has queued prescriptions. Aborting.")
+        return
+
+    # claim_next renews a user's own claims, so each simulated pharmacist needs its own account
+    workers = min(args.workers, len(user_ids))
+    seeded = await seed_prescriptions(args.hospital_id, args.seed) if args.seed else []
+    print(f"Seeded {len(seeded)} prescriptions; running {workers} pharmacists.")
+
+    claimed, latencies = [], []
+    started = time.perf_counter()
+    try:
+        await asyncio.gather(*[
+            pharmacist(user_ids[i], args.hospital_id, args.batch, args.lease, claimed, latencies)
+            for i in range(workers)
+        ])
+    finally:
+        elapsed = time.perf_counter() - started
+        if seeded:
+            async with AsyncSessionLocal() as db:
+                await db.execute(delete(models.Prescription).where(models.Prescription.id.in_(seeded)))
+                await db.commit()
+        await engine.dispose()
+
+    claimed_ids = [pid for _, pid in claimed]
+    duplicates = len(claimed_ids) - len(set(claimed_ids))
+    latencies.sort()
+    p50 = latencies[len(latencies) // 2] * 1000 if latencies else 0
+    p99 = latencies[int(len(latencies) * 0.99)] * 1000 if latencies else 0
+    print(f"Claimed {len(claimed_ids)} prescriptions in {elapsed:.2f}s "
+          f"({len(claimed_ids) / elapsed:.0f}/s), duplicates: {duplicates}")
+    print(f"claim latency p50={p50:.1f}ms p99={p99:.1f}ms over {len(latencies)} calls")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Concurrent pharmacy claim load test")
+    parser.add_argument("--hospital-id", type=int, required=True)
+    parser.add_argument("--seed", type=int, default=0, help="Number of bare prescriptions to create first")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--batch", type=int, default=5)
+    parser.add_argument("--lease", type=int, default=300)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,65 @@
+# scripts/rebuild_analytics_rollups.py
+#
+# Recomputes the daily analytics rollups (doctor_daily_stats and
+# medicine_daily_stats) from appointments and prescriptions, against the
+# database in .env. Works one hospital-month at a time, one transaction each,
+# so it can run while the API is up; an event landing in a month while it is
+# being rebuilt is corrected on the next run.
+#
+#   python scripts/rebuild_analytics_rollups.py --start 2026-01-01 --end 2026-10-31
+#   python scripts/rebuild_analytics_rollups.py --hospital-id 3 --start 2026-10-01 --end 2026-10-31
+import argparse
+import asyncio
+import os
+import sys
+import time
+from datetime import date, timedelta
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import select
+
+from app import crud
+from app.db import models
+from app.db.session import AsyncSessionLocal, engine
+
+
+def months(start: date, end: date):
+    """ (first, last) day pairs covering start..end, split at month boundaries. """
+    first = start
+    while first <= end:
+        next_month = (first.replace(day=1) + timedelta(days=32)).replace(day=1)
+        last = min(next_month - timedelta(days=1), end)
+        yield first, last
+        first = next_month
+
+
+async def main(args):
+    started = time.perf_counter()
+    try:
+        async with AsyncSessionLocal() as db:
+            query = select(models.Hospital.id).order_by(models.Hospital.id)
+            if args.hospital_id:
+                query = query.filter(models.Hospital.id == args.hospital_id)
+            hospital_ids = (await db.execute(query)).scalars().all()
+
+        for hospital_id in hospital_ids:
+            for first, last in months(args.start, args.end):
+                async with AsyncSessionLocal() as db:
+                    doctor_rows, medicine_rows = await crud.analytics.rebuild(
+                        db, hospital_id=hospital_id, start=first, end=last
+                    )
+                    await db.commit()
+                print(f"  hospital {hospital_id} {first:%Y-%m}: "
+                      f"{doctor_rows} doctor-days, {medicine_rows} medicine-days")
+    finally:
+        await engine.dispose()
+    print(f"Done in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Rebuild the daily analytics rollups')
+    parser.add_argument('--start', type=date.fromisoformat, required=True, help='First day (YYYY-MM-DD)')
+    parser.add_argument('--end', type=date.fromisoformat, required=True, help='Last day, inclusive')
+    parser.add_argument('--hospital-id', type=int, default=None, help='Only rebuild this hospital')
+    asyncio.run(main(parser.parse_args()))
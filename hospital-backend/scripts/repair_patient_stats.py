@@ -0,0 +1,47 @@
+# scripts/repair_patient_stats.py
+#
+# Recomputes patient_stats (visit count, last visit, open prescriptions) from
+# appointments and prescriptions, in patient-id batches with one transaction
+# per batch, against the database in .env. Safe to run while the API is up;
+# a visit or dispense landing on a patient mid-batch is corrected on the next run.
+#
+#   python scripts/repair_patient_stats.py
+#   python scripts/repair_patient_stats.py --batch-size 5000 --start-after 120000
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import crud
+from app.db.session import AsyncSessionLocal, engine
+
+
+async def main(batch_size: int, start_after: int, pause: float):
+    last_id, patients, started = start_after, 0, time.perf_counter()
+    try:
+        while True:
+            async with AsyncSessionLocal() as db:
+                batch_last_id = await crud.patient_stats.recompute(db, after_id=last_id, limit=batch_size)
+                await db.commit()
+            if batch_last_id is None:
+                break
+            patients += batch_size
+            last_id = batch_last_id
+            print(f"  recomputed through patient {last_id}")
+            if pause:
+                await asyncio.sleep(pause)
+    finally:
+        await engine.dispose()
+    print(f"Done: ~{patients} patients in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Recompute patient_stats in batches')
+    parser.add_argument('--batch-size', type=int, default=1000)
+    parser.add_argument('--start-after', type=int, default=0, help='Resume after this patient id')
+    parser.add_argument('--pause', type=float, default=0.0, help='Seconds to sleep between batches')
+    args = parser.parse_args()
+    asyncio.run(main(args.batch_size, args.start_after, args.pause))
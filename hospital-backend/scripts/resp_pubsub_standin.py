@@ -0,0 +1,93 @@
+# scripts/resp_pubsub_standin.py
+#
+# A minimal Redis-protocol (RESP2) pub/sub server for exercising the
+# SOCKETIO_MANAGER=redis backend locally without installing Redis.
+# Supports PING, SUBSCRIBE, UNSUBSCRIBE and PUBLISH; everything else gets an
+# error reply, which redis-py ignores for its connection-setup commands.
+#
+#   python scripts/resp_pubsub_standin.py --port 6390
+#   SOCKETIO_MANAGER=redis SOCKETIO_MANAGER_URL=redis://localhost:6390/0 uvicorn app.main:app --workers 4
+import argparse
+import asyncio
+from collections import defaultdict
+
+subscribers = defaultdict(set)  # channel -> set of StreamWriter
+
+
+def encode(value) -> bytes:
+    if value is None:
+        return b"$-1\r\n"
+    if isinstance(value, int):
+        return b":%d\r\n" % value
+    if isinstance(value, str):
+        value = value.encode()
+    if isinstance(value, bytes):
+        return b"$%d\r\n%s\r\n" % (len(value), value)
+    return b"*%d\r\n" % len(value) + b"".join(encode(v) for v in value)
+
+
+async def read_command(reader: asyncio.StreamReader):
+    line = await reader.readline()
+    if not line:
+        return None
+    if not line.startswith(b"*"):
+        return line.strip().split()  # inline command, e.g. from telnet
+    args = []
+    for _ in range(int(line[1:])):
+        length = int((await reader.readline())[1:])
+        args.append((await reader.readexactly(length + 2))[:-2])
+    return args
+
+
+async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    channels = set()
+    try:
+        while True:
+            args = await read_command(reader)
+            if args is None:
+                break
+            if not args:
+                continue
+            command = args[0].upper()
+            if command == b"PING":
+                writer.write(b"+PONG\r\n")
+            elif command == b"SUBSCRIBE":
+                for channel in args[1:]:
+                    channels.add(channel)
+                    subscribers[channel].add(writer)
+                    writer.write(encode([b"subscribe", channel, len(channels)]))
+            elif command == b"UNSUBSCRIBE":
+                for channel in args[1:] or list(channels):
+                    channels.discard(channel)
+                    subscribers[channel].discard(writer)
+                    writer.write(encode([b"unsubscribe", channel, len(channels)]))
+            elif command == b"PUBLISH":
+                channel, message = args[1], args[2]
+                targets = list(subscribers.get(channel, ()))
+                for target in targets:
+                    target.write(encode([b"message", channel, message]))
+                writer.write(encode(len(targets)))
+            else:
+                writer.write(b"-ERR unknown command '%s'\r\n" % command)
+            await writer.drain()
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        for channel in channels:
+            subscribers[channel].discard(writer)
+        writer.close()
+
+
+async def main(host: str, port: int):
+    server = await asyncio.start_server(handle, host, port)
+    print(f"RESP pub/sub stand-in listening on {host}:{port}")
+    async with server:
+        await server.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Minimal Redis-protocol pub/sub server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=6390)
+    args = parser.parse_args()
+    asyncio.run(main(args.host, args.port))
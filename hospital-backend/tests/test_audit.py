@@ -0,0 +1,117 @@
+import asyncio
+
+import pytest
+
+from app import audit
+from app.audit import AuditWriter
+from app.metrics import metrics
+
+
+def dropped():
+    return metrics._counters[("audit_log_dropped_total", (("reason", "write_error"),))]
+
+
+class FailingSession:
+    """ Stands in for AsyncSessionLocal; the first `failures` INSERTs raise. """
+
+    def __init__(self, failures):
+        self.failures = failures
+        self.written = []
+
+    def __call__(self):
+        return self
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def commit(self):
+        pass
+
+
+@pytest.fixture
+def session(monkeypatch):
+    def install(failures):
+        fake = FailingSession(failures)
+
+        async def insert_many(db, *, rows):
+            if fake.failures:
+                fake.failures -= 1
+                raise RuntimeError("database unavailable")
+            fake.written.extend(rows)
+
+        monkeypatch.setattr(audit, "AsyncSessionLocal", fake)
+        monkeypatch.setattr(audit.crud.audit_log, "insert_many", insert_many)
+        return fake
+    return install
+
+
+def make_writer(queue_size=10, batch_max=3, entries=0):
+    writer = AuditWriter(queue_size, batch_max, interval_ms=1)
+    for i in range(entries):
+        writer.record(user_id=i, action=f"action_{i}")
+    return writer
+
+
+def actions(entries):
+    return [e["action"] for e in entries]
+
+
+def test_failed_batch_goes_back_to_the_front(session):
+    fake = session(failures=1)
+    writer = make_writer(entries=5)
+
+    assert asyncio.run(writer.flush()) == 0
+    assert actions(writer._queue) == [f"action_{i}" for i in range(5)]
+
+    assert asyncio.run(writer.flush()) == 3
+    assert actions(fake.written) == ["action_0", "action_1", "action_2"]
+
+
+def test_requeue_drops_only_what_does_not_fit(session):
+    session(failures=1)
+    writer = make_writer(queue_size=4, batch_max=3, entries=4)
+    dropped_before = dropped()
+
+    async def flush_while_recording():
+        original = audit.crud.audit_log.insert_many
+
+        async def slow_insert(db, *, rows):
+            # Two new entries arrive while the INSERT is in flight
+            writer.record(user_id=None, action="late_1")
+            writer.record(user_id=None, action="late_2")
+            await original(db, rows=rows)
+
+        audit.crud.audit_log.insert_many = slow_insert
+        try:
+            return await writer.flush()
+        finally:
+            audit.crud.audit_log.insert_many = original
+
+    assert asyncio.run(flush_while_recording()) == 0
+    # One free slot: the oldest entry of the batch goes back, the other two are dropped
+    assert actions(writer._queue) == ["action_0", "action_3", "late_1", "late_2"]
+    assert dropped() - dropped_before == 2
+
+
+def test_drain_retries_then_gives_up(session, monkeypatch):
+    fake = session(failures=100)
+    writer = make_writer(entries=5)
+    monkeypatch.setattr(writer, "max_backoff", 0)
+
+    dropped_before = dropped()
+    asyncio.run(writer.drain())
+    assert writer.depth == 0
+    assert fake.written == []
+    assert dropped() - dropped_before == 5
+
+
+def test_drain_writes_everything_after_a_transient_failure(session, monkeypatch):
+    fake = session(failures=1)
+    writer = make_writer(entries=5)
+    monkeypatch.setattr(writer, "max_backoff", 0)
+
+    asyncio.run(writer.drain())
+    assert actions(fake.written) == [f"action_{i}" for i in range(5)]
@@ -0,0 +1,73 @@
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+from app.core.config import settings
+from app.patient_index import PatientIndex
+
+T0 = datetime(2026, 10, 19, 9, 0, tzinfo=timezone.utc)
+
+
+def patient(id, name, created_at):
+    return SimpleNamespace(
+        id=id, full_name=name, phone_number=f"98765{id:05d}", date_of_birth=None, sex=None, created_at=created_at,
+    )
+
+
+class Result:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def all(self):
+        return self.rows
+
+
+class FakeDB:
+    """ Answers the index's queries from `patients`, honouring the created_at lower bound. """
+
+    def __init__(self, patients):
+        self.patients = patients
+
+    async def execute(self, stmt):
+        if "patient_stats" in str(stmt):
+            return Result([])
+        params = stmt.compile().params
+        since = next((v for k, v in params.items() if k.startswith("created_at")), None)
+        return Result([p for p in self.patients if since is None or p.created_at >= since])
+
+
+def refresh(index, db):
+    """ Run the periodic refresh now instead of waiting PATIENT_INDEX_REFRESH_SECONDS. """
+    index._hospital(1).refreshed_at = time.monotonic() - settings.PATIENT_INDEX_REFRESH_SECONDS - 1
+    return asyncio.run(index._refresh(db, 1))
+
+
+def test_late_commit_with_a_lower_id_is_picked_up():
+    db = FakeDB([patient(1, "asha rao", T0)])
+    index = PatientIndex()
+    asyncio.run(index._refresh(db, 1))
+
+    # Patient 3 commits first; patient 2 started earlier but commits after the refresh
+    db.patients.append(patient(3, "ravi kumar", T0 + timedelta(seconds=20)))
+    hospital = refresh(index, db)
+    assert set(hospital.patients) == {1, 3}
+
+    db.patients.append(patient(2, "meena iyer", T0 + timedelta(seconds=10)))
+    hospital = refresh(index, db)
+    assert set(hospital.patients) == {1, 2, 3}
+    assert [e["id"] for e in hospital.names.search("meena")] == [2]
+
+
+def test_refresh_reads_only_the_overlap_window():
+    old = patient(1, "asha rao", T0 - timedelta(days=30))
+    db = FakeDB([old])
+    index = PatientIndex()
+    hospital = asyncio.run(index._refresh(db, 1))
+    assert hospital.seen_until == old.created_at
+
+    # Patient 1 is older than the window, so it is no longer read
+    db.patients = [patient(5, "kiran das", T0)]
+    hospital = refresh(index, db)
+    assert set(hospital.patients) == {1, 5}
+    assert hospital.seen_until == T0
@@ -0,0 +1,80 @@
+from app.search_index import PrefixIndex, trigrams
+
+
+def make_index(names, **kwargs):
+    index = PrefixIndex(**kwargs)
+    index.bulk_load([(i, name, {"id": i, "name": name}) for i, name in enumerate(names, start=1)])
+    return index
+
+
+def ids(results):
+    return [r["id"] for r in results]
+
+
+def test_trigrams_pad_each_word():
+    assert trigrams("ab") == {"  a", " ab", "ab "}
+    assert trigrams("ab cd") == {"  a", " ab", "ab ", "  c", " cd", "cd "}
+
+
+def test_prefix_matches_any_word_of_the_key():
+    index = make_index(["tab paracetamol", "paracetamol syrup", "ibuprofen"])
+    assert sorted(ids(index.search("para"))) == [1, 2]
+    assert ids(index.search("tab")) == [1]
+    assert index.search("") == []
+
+
+def test_prefix_respects_limit_and_returns_each_item_once():
+    index = make_index(["amox amox", "amoxicillin", "amoxil"])
+    assert ids(index.search("amox", limit=2)) == [1, 2]
+    assert ids(index.search("amox")) == [1, 2, 3]
+
+
+def test_typo_falls_back_to_trigram_similarity():
+    index = make_index(["paracetamol", "pantoprazole", "ibuprofen"])
+    assert ids(index.search("paracetmol")) == [1]
+
+
+def test_short_queries_do_not_use_the_fallback():
+    index = make_index(["paracetamol"])
+    assert index.search("pz") == []
+
+
+def test_fallback_does_not_repeat_prefix_matches():
+    index = make_index(["metformin", "metformin xr", "metoprolol"])
+    assert ids(index.search("metformin")) == [1, 2]
+
+
+def test_fallback_candidates_are_capped():
+    names = [f"patient{n:05d}" for n in range(5000)] + ["zyxwvut"]
+    index = make_index(names, max_candidates=50)
+    # Every entry shares trigrams with the query; only the cap's worth are scored
+    assert len(index.search("patientx", limit=100)) <= 50
+    # A rare gram still finds its entry among thousands of common ones
+    assert ids(index.search("zyxwvvt")) == [5001]
+
+
+def test_add_replaces_and_remove_forgets():
+    index = make_index(["aspirin"])
+    index.add(1, "asprin", {"id": 1, "name": "asprin"})
+    assert len(index) == 1
+    assert [r["name"] for r in index.search("aspr")] == ["asprin"]
+
+    index.add(2, "atenolol", {"id": 2, "name": "atenolol"})
+    index.remove(1)
+    assert 1 not in index and 2 in index
+    assert index.search("aspr") == []
+    assert index.search("asprin") == []
+    assert ids(index.search("aten")) == [2]
+
+
+def test_remove_unknown_id_is_a_no_op():
+    index = make_index(["aspirin"])
+    index.remove(42)
+    assert ids(index.search("asp")) == [1]
+
+
+def test_update_value_keeps_the_key():
+    index = make_index(["aspirin"])
+    index.update_value(1, {"id": 1, "name": "Aspirin 75"})
+    index.update_value(99, {"id": 99})
+    assert index.search("asp") == [{"id": 1, "name": "Aspirin 75"}]
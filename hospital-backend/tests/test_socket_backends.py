@@ -0,0 +1,58 @@
+import asyncio
+
+import socketio
+
+from app import socket_manager
+from app.socket_backends import AsyncPostgresManager
+
+
+def make_manager(monkeypatch):
+    manager = AsyncPostgresManager("postgresql+asyncpg://localhost/test")
+    manager.on_deliver = socket_manager._on_deliver
+    delivered, published = [], []
+
+    async def local_emit(self, event, data, namespace=None, room=None, **kwargs):
+        delivered.append((event, data, room))
+
+    async def publish(data):
+        published.append(data)
+
+    monkeypatch.setattr(socketio.AsyncManager, "emit", local_emit)
+    monkeypatch.setattr(manager, "_publish", publish)
+    return manager, delivered, published
+
+
+def test_pubsub_emit_is_stamped_recorded_and_streamed(monkeypatch):
+    manager, delivered, published = make_manager(monkeypatch)
+    room = "hospital_901_pharmacy"
+    subscriber = socket_manager.stream_hub.subscribe([room], {}, max_events=10)
+    try:
+        asyncio.run(manager.emit("new_prescription", {"id": 7}, namespace="/", room=room))
+    finally:
+        socket_manager.stream_hub.unsubscribe(subscriber)
+
+    (event, data, to), = delivered
+    assert (event, to) == ("new_prescription", room)
+    seq = socket_manager.event_buffer.last_seq(room)
+    assert data == {"id": 7, "seq": seq, "room": room, "epoch": socket_manager.event_buffer.epoch}
+    assert socket_manager.event_buffer.since(room, seq - 1) == [(seq, "new_prescription", data)]
+
+    streamed = subscriber._events.popleft()
+    assert streamed[:3] == (room, seq, "new_prescription")
+
+    # Other workers receive the original payload and stamp it themselves
+    assert published[0]["data"] == [{"id": 7}]
+
+
+def test_message_from_another_worker_is_stamped(monkeypatch):
+    manager, delivered, _ = make_manager(monkeypatch)
+    room = "user_902"
+    message = {
+        "method": "emit", "event": "appointment_updated", "data": [{"id": 3}], "binary": False,
+        "namespace": "/", "room": room, "skip_sid": None, "callback": None, "host_id": "other",
+    }
+    asyncio.run(manager._handle_emit(message))
+
+    (_, data, _), = delivered
+    assert data["id"] == 3 and data["room"] == room
+    assert data["seq"] == socket_manager.event_buffer.last_seq(room)
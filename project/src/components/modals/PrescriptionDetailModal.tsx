@@ -8,6 +8,7 @@ interface DispenseUpdate {
   line_item_id: number;
   status: 'Given' | 'Partially Given' | 'Not Given' | 'Substituted';
   substitution_info?: string | null;
+  version: number;
 }
 
 interface PrescriptionDetailModalProps {
@@ -35,7 +36,8 @@ export default function PrescriptionDetailModal({ prescriptionId, onClose }: Pre
           const initialUpdates = response.data.line_items.map(item => ({
               line_item_id: item.id,
               status: item.status,
-              substitution_info: item.substitution_info
+              substitution_info: item.substitution_info,
+              version: item.version
           }));
           setUpdates(initialUpdates);
         } catch (error) {
@@ -63,7 +65,10 @@ export default function PrescriptionDetailModal({ prescriptionId, onClose }: Pre
     try {
         // --- THE FIX IS HERE ---
         // Send the 'updates' array directly as the request body
-        await apiClient.put(`/api/prescriptions/${prescriptionId}/dispense`, updates);
+        // Send back the versions we loaded so a concurrent dispense is rejected (409)
+        await apiClient.put(`/api/prescriptions/${prescriptionId}/dispense`, updates, {
+          params: { version: prescription?.version },
+        });
         toast.success("Dispense status updated successfully.");
         onClose(true);
     } catch(error) {
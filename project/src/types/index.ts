@@ -39,6 +39,7 @@ export interface PrescriptionMedicine {
   instructions?: string;
   status: DispenseLineStatus;
   substitution_info?: string;
+  version: number;
 }
 
 export interface ClinicalNote {
@@ -50,6 +51,7 @@ export interface ClinicalNote {
 export interface PrescriptionRecord {
   id: number;
   status: PrescriptionRecordStatus;
+  version: number;
   patient_id: number;
   doctor_id: number;
   visit_id: number;